@@ -1,36 +1,148 @@
-from flask import Blueprint
-from flask_restx import Api
+import threading
+from http import HTTPStatus
+from importlib import import_module
+
+from flask import Blueprint, current_app
+from flask.views import http_method_funcs
+from flask_restx import Api, Namespace, marshal_with
+from flask_restx.namespace import handle_deprecations, unshortcut_params_description
+
+from utils.openapi import apply_openapi_spec, merge_doc, serve_openapi_spec
+
+
+class GarageApi(Api):
+    """
+    Flask-RESTx Api that serves a prebuilt, ETagged OpenAPI spec instead of
+    assembling the Swagger JSON at runtime, and renders the docs UI only on demand.
+    """
+
+    def _register_specs(self, app_or_blueprint):
+        endpoint = "specs"
+        app_or_blueprint.add_url_rule(
+            "/" + self.default_swagger_filename, endpoint, lambda: serve_openapi_spec(self)
+        )
+        self.endpoints.add(endpoint)
+
+    def render_doc(self):
+        if not current_app.config.get("SWAGGER_UI_ENABLED", True):
+            self.abort(404)
+        return super().render_doc()
+
+
+class GarageNamespace(Namespace):
+    """
+    Flask-RESTx Namespace whose route decorators merge their documentation without
+    deep copying the models it references (see utils.openapi.merge_doc).
+    """
+
+    def marshal_with(self, fields, as_list=False, code=HTTPStatus.OK, description=None, **kwargs):
+        # Namespace.marshal_with, with merge_doc instead of flask_restx.utils.merge
+        def wrapper(func):
+            doc = {
+                "responses": {str(code): (description, [fields] if as_list else fields, kwargs)},
+                "__mask__": kwargs.get("mask", True),  # Mask values can't be determined outside app context
+            }
+            func.__apidoc__ = merge_doc(getattr(func, "__apidoc__", {}), doc)
+            return marshal_with(fields, ordered=self.ordered, **kwargs)(func)
+        return wrapper
+
+    def _build_doc(self, cls, doc):
+        # Namespace._build_doc, with merge_doc instead of flask_restx.utils.merge
+        if doc is False:
+            return False
+        unshortcut_params_description(doc)
+        handle_deprecations(doc)
+        for http_method in http_method_funcs:
+            if http_method in doc and doc[http_method] is not False:
+                unshortcut_params_description(doc[http_method])
+                handle_deprecations(doc[http_method])
+                if "expect" in doc[http_method] and not isinstance(doc[http_method]["expect"], (list, tuple)):
+                    doc[http_method]["expect"] = [doc[http_method]["expect"]]
+        return merge_doc(getattr(cls, "__apidoc__", {}), doc)
 
 
 # Main Blueprint for all API routes
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 # Flask-RESTx Api instance
-api = Api(
+api = GarageApi(
     api_bp,
     version='1.0',  # API version
     title='Garage API',  # Title displayed in the Swagger documentation
     description='API Swagger documentation',  # Description displayed in the Swagger documentation
-    doc='/docs'  # Documentation URL (http://127.0.0.1:5000/api/docs)
+    doc='/docs',  # Documentation URL (http://127.0.0.1:5000/api/docs)
+    authorizations={'Bearer': {  # Token from POST /api/auth/login (see utils.auth)
+        'type': 'apiKey', 'in': 'header', 'name': 'Authorization',
+        'description': "'Bearer <token>', the token returned by POST /api/auth/login",
+    }},
+    security='Bearer'
 )
 
-# Import and register sub-Blueprints (namespaces)
-from .client import clients_ns
-from .employee import employees_ns
-from .vehicle import vehicles_ns
-from .work import works_ns
-from .task import tasks_ns
-from .invoice import invoices_ns
-from .invoice_item import invoice_items_ns
-from .setting import settings_ns
-
-
-# Add namespaces to the Swagger documentation and API
-api.add_namespace(clients_ns, path='/client')  # Routes for client operations
-api.add_namespace(employees_ns, path='/employee')  # Routes for employee operations
-api.add_namespace(vehicles_ns, path='/vehicle') # Routes for vehicle operations
-api.add_namespace(works_ns, path='/work') # Routes for work operations
-api.add_namespace(tasks_ns, path='/task') # Routes for task operations
-api.add_namespace(invoices_ns, path='/invoice') # Routes for invoice operations
-api.add_namespace(invoice_items_ns, path='/invoice_item') # Routes for invoice item operations
-api.add_namespace(settings_ns, path='/setting') # Routes for settings operations
+# Sub-Blueprints (namespaces): (module, namespace attribute, URL path).
+# They are only imported by register_api(), so importing this package stays cheap.
+NAMESPACES = (
+    ('.auth', 'auth_ns', '/auth'),  # Routes for login and logout
+    ('.client', 'clients_ns', '/client'),  # Routes for client operations
+    ('.employee', 'employees_ns', '/employee'),  # Routes for employee operations
+    ('.vehicle', 'vehicles_ns', '/vehicle'),  # Routes for vehicle operations
+    ('.work', 'works_ns', '/work'),  # Routes for work operations
+    ('.work_order', 'work_orders_ns', '/work-order'),  # Route for creating a work with its tasks
+    ('.task', 'tasks_ns', '/task'),  # Routes for task operations
+    ('.invoice', 'invoices_ns', '/invoice'),  # Routes for invoice operations
+    ('.invoice_item', 'invoice_items_ns', '/invoice_item'),  # Routes for invoice item operations
+    ('.setting', 'settings_ns', '/setting'),  # Routes for settings operations
+    ('.search', 'search_ns', '/search'),  # Routes for full-text search
+    ('.change', 'changes_ns', '/changes'),  # Route for the change feed
+    ('.event', 'events_ns', '/events'),  # Route for the Server-Sent Events stream
+    ('.job', 'jobs_ns', '/jobs'),  # Routes for background jobs
+    ('.batch', 'batch_ns', '/batch'),  # Route for batched requests
+    ('.admin', 'admin_ns', '/admin'),  # Routes for operational state (rate limits, coalescing)
+)
+
+
+def register_namespaces():
+    """
+    Import the namespaces and add them to the Swagger documentation and API.
+    Must run before api_bp is registered on the application; repeated calls are no-ops.
+    """
+    if api.namespaces[1:]:  # The first namespace is Flask-RESTx's default one
+        return
+    for module_name, attribute, path in NAMESPACES:
+        namespace = getattr(import_module(module_name, __name__), attribute)
+        api.add_namespace(namespace, path=path)
+
+
+# Serializes register_api between the warm-up thread and the first requests
+_registration_lock = threading.Lock()
+
+
+def register_api(app):
+    """
+    Import the namespaces, register api_bp on the application and use the prebuilt
+    OpenAPI spec if it still matches them.
+    Runs from the warm-up or before the first request (see init_api), whichever comes
+    first; repeated calls are no-ops.
+    """
+    with _registration_lock:
+        if api_bp.name in app.blueprints:
+            return
+        register_namespaces()
+        app.register_blueprint(api_bp)
+        apply_openapi_spec(app, api)
+
+
+def init_api(app):
+    """
+    Set up the API without importing it: the namespaces, and through them every service
+    and model, are only loaded by register_api, before the application dispatches its
+    first request. Creating the application, and the CLI commands that serve no
+    requests, skip that cost.
+    """
+    dispatch = app.wsgi_app
+
+    def wsgi_app(environ, start_response):
+        if api_bp.name not in app.blueprints:
+            register_api(app)
+        return dispatch(environ, start_response)
+
+    app.wsgi_app = wsgi_app
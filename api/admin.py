@@ -0,0 +1,129 @@
+import logging
+from flask import request
+from flask_restx import Resource, fields
+from api import GarageNamespace
+from werkzeug.exceptions import HTTPException
+from utils.auth import token_auth
+from utils.rate_limit import rate_limiter
+from utils.single_flight import single_flight
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Namespace for operational endpoints
+admin_ns = GarageNamespace('admin', description='Operational state of the API')
+
+rate_limit_rule_model = admin_ns.model('RateLimitRule', {
+    'rule': fields.String(description="'METHOD /route' pattern"),
+    'capacity': fields.Integer(description='Bucket size (burst)'),
+    'per_second': fields.Float(description='Tokens refilled per second'),
+})
+
+rate_limit_bucket_model = admin_ns.model('RateLimitBucket', {
+    'client': fields.String(description='Client: employee of the token, or IP address'),
+    'rule': fields.String(description='Rule the bucket belongs to'),
+    'tokens': fields.Float(description='Tokens currently available'),
+    'capacity': fields.Integer(description='Bucket size'),
+})
+
+rate_limit_state_model = admin_ns.model('RateLimitState', {
+    'enabled': fields.Boolean(description='Whether rate limiting is on'),
+    'limited_requests': fields.Integer(description='Requests rejected with 429 since start'),
+    'bucket_count': fields.Integer(description='Buckets held in memory'),
+    'rules': fields.List(fields.Nested(rate_limit_rule_model)),
+    'buckets': fields.List(fields.Nested(rate_limit_bucket_model), description='Emptiest buckets first'),
+})
+
+coalescing_route_model = admin_ns.model('CoalescingRoute', {
+    'name': fields.String(description='Endpoint'),
+    'executions': fields.Integer(description='Requests that ran the handler'),
+    'coalesced': fields.Integer(description='Requests that shared an in-flight execution'),
+})
+
+coalescing_state_model = admin_ns.model('CoalescingState', {
+    'in_flight': fields.Integer(description='Executions currently running'),
+    'routes': fields.List(fields.Nested(coalescing_route_model)),
+})
+
+auth_state_model = admin_ns.model('AuthState', {
+    'enabled': fields.Boolean(description='Whether the API requires a token'),
+    'signing_keys': fields.Integer(description='Keys accepted for token signatures (the last one signs)'),
+    'token_ttl_seconds': fields.Integer(description='Lifetime of a token'),
+    'verifications': fields.Integer(description='Requests whose token was checked since start'),
+    'rejected': fields.Integer(description='Requests rejected with 401 since start'),
+    'cache_hits': fields.Integer(description='Checks served from the verified-token cache'),
+    'cache_size': fields.Integer(description='Tokens in the verified-token cache'),
+    'average_ms': fields.Float(description='Average time spent checking a token per request'),
+    'revoked_tokens': fields.Integer(description='Logged out tokens in the revocation list'),
+    'revoked_employees': fields.Integer(description='Employees whose earlier tokens are all revoked'),
+})
+
+
+@admin_ns.route('/rate-limits')
+class RateLimits(Resource):
+    """
+    Handles the inspection of rate limits.
+    """
+
+    @admin_ns.doc('get_rate_limits', params={'limit': 'Maximum number of buckets (default 100)'})
+    @admin_ns.marshal_with(rate_limit_state_model)
+    def get(self):
+        """
+        Retrieve the configured rate limits and the current state of the client buckets.
+        :return: The rules and buckets of this process
+        """
+        try:
+            return rate_limiter.snapshot(request.args.get('limit', 100, type=int))
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while retrieving rate limits: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error retrieving rate limits: {e}")
+            admin_ns.abort(500, "An error occurred while retrieving the rate limits.")
+
+
+@admin_ns.route('/coalescing')
+class Coalescing(Resource):
+    """
+    Handles the inspection of request coalescing.
+    """
+
+    @admin_ns.doc('get_coalescing')
+    @admin_ns.marshal_with(coalescing_state_model)
+    def get(self):
+        """
+        Retrieve how many identical concurrent reads were served by a shared execution.
+        :return: Per-endpoint counts of this process
+        """
+        try:
+            return single_flight.snapshot()
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while retrieving coalescing metrics: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error retrieving coalescing metrics: {e}")
+            admin_ns.abort(500, "An error occurred while retrieving the coalescing metrics.")
+
+
+@admin_ns.route('/auth')
+class Auth(Resource):
+    """
+    Handles the inspection of token authentication.
+    """
+
+    @admin_ns.doc('get_auth')
+    @admin_ns.marshal_with(auth_state_model)
+    def get(self):
+        """
+        Retrieve the token settings and how much time checking tokens takes.
+        :return: The counters of this process (each response also has a Server-Timing 'auth' entry)
+        """
+        try:
+            return token_auth.snapshot()
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while retrieving authentication metrics: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error retrieving authentication metrics: {e}")
+            admin_ns.abort(500, "An error occurred while retrieving the authentication metrics.")
@@ -0,0 +1,85 @@
+import logging
+from flask import g
+from flask_restx import Resource, fields
+from api import GarageNamespace
+from werkzeug.exceptions import HTTPException
+from services.auth_service import login, logout
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Namespace for authentication
+auth_ns = GarageNamespace('auth', description='Employee login and logout (bearer tokens)')
+
+login_model = auth_ns.model('Login', {
+    'email': fields.String(required=True, description='Employee email'),
+    'password': fields.String(required=True, description='Employee password (set with flask set-password)'),
+})
+
+token_model = auth_ns.model('Token', {
+    'access_token': fields.String(description="Token to send as 'Authorization: Bearer <token>'"),
+    'token_type': fields.String(description='Always Bearer'),
+    'expires_in': fields.Integer(description='Seconds the token stays valid'),
+    'employee_id': fields.Integer(description='The logged in employee'),
+    'role': fields.String(description='Role of the employee'),
+})
+
+message_model = auth_ns.model('AuthMessage', {
+    'message': fields.String(description='Outcome'),
+})
+
+
+@auth_ns.route('/login')
+class Login(Resource):
+    """
+    Handles logging in.
+    """
+
+    @auth_ns.doc('login', security=[])
+    @auth_ns.expect(login_model, validate=True)
+    @auth_ns.marshal_with(token_model)
+    @auth_ns.response(401, 'Wrong email or password')
+    def post(self):
+        """
+        Check an employee's email and password and issue a token for the other API routes.
+        :return: The token and its lifetime
+        """
+        data = auth_ns.payload
+        try:
+            token = login(data['email'], data['password'])
+            if token is None:
+                auth_ns.abort(401, "Wrong email or password.")
+            return token, 200
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while logging in: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error logging in: {e}")
+            auth_ns.abort(500, "An error occurred while logging in.")
+
+
+@auth_ns.route('/logout')
+class Logout(Resource):
+    """
+    Handles logging out.
+    """
+
+    @auth_ns.doc('logout')
+    @auth_ns.marshal_with(message_model)
+    @auth_ns.response(401, 'Missing, invalid, expired or revoked token')
+    def post(self):
+        """
+        Revoke the token of this request.
+        :return: A confirmation message
+        """
+        try:
+            if g.get('auth') is None:
+                auth_ns.abort(400, "Authentication is disabled: there is no token to revoke.")
+            return logout(g.auth), 200
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while logging out: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error logging out: {e}")
+            auth_ns.abort(500, "An error occurred while logging out.")
@@ -0,0 +1,75 @@
+import logging
+from flask import current_app
+from flask_restx import Resource, fields
+from api import GarageNamespace
+from werkzeug.exceptions import HTTPException
+from utils.batch import run_batch
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Namespace for batched requests
+batch_ns = GarageNamespace('batch', description='Run several API requests in one round trip')
+
+sub_request_model = batch_ns.model('SubRequest', {
+    'method': fields.String(default='GET', enum=['GET', 'POST', 'PUT', 'DELETE'], description='HTTP method'),
+    'path': fields.String(required=True, description='API path, with any query string (e.g. /api/client/3)'),
+    'body': fields.Raw(description='JSON body, for POST and PUT'),
+    'headers': fields.Raw(description='Extra headers (e.g. Idempotency-Key)'),
+})
+
+batch_request_model = batch_ns.model('BatchRequest', {
+    'requests': fields.List(fields.Nested(sub_request_model), required=True, description='The sub-requests'),
+    'parallel': fields.Boolean(default=False, description='Run the sub-requests concurrently'),
+    'transaction': fields.Boolean(
+        default=False, description='Run GET sub-requests in one read transaction (consistent snapshot)'
+    ),
+})
+
+sub_response_model = batch_ns.model('SubResponse', {
+    'status': fields.Integer(description='HTTP status code'),
+    'headers': fields.Raw(description='Response headers'),
+    'body': fields.Raw(description='JSON body (or text)'),
+})
+
+
+@batch_ns.route('')
+class Batch(Resource):
+    """
+    Handles batches of sub-requests.
+    """
+
+    @batch_ns.doc('run_batch')
+    @batch_ns.expect(batch_request_model, validate=True)
+    @batch_ns.response(400, 'Invalid batch')
+    @batch_ns.marshal_list_with(sub_response_model)
+    def post(self):
+        """
+        Run a list of API requests and return their responses in the same order.
+        Credentials of the batch request are passed on to each sub-request.
+        :return: One response per sub-request
+        """
+        data = batch_ns.payload
+        try:
+            sub_requests = data['requests']
+            parallel = data.get('parallel', False)
+            transaction = data.get('transaction', False)
+            if not sub_requests or len(sub_requests) > current_app.config['BATCH_MAX_REQUESTS']:
+                batch_ns.abort(400, f"A batch needs 1 to {current_app.config['BATCH_MAX_REQUESTS']} requests.")
+            if any(not sub_request['path'].startswith('/api/') or sub_request['path'].startswith(('/api/batch', '/api/events'))
+                   for sub_request in sub_requests):
+                batch_ns.abort(400, "Sub-request paths must be API paths other than /api/batch and /api/events.")
+            if transaction and (parallel or any(sub_request.get('method', 'GET').upper() != 'GET'
+                                                for sub_request in sub_requests)):
+                batch_ns.abort(400, "A transaction batch can only hold GET requests and cannot run in parallel.")
+            return run_batch(
+                current_app._get_current_object(), sub_requests, parallel, transaction,
+                current_app.config['BATCH_MAX_WORKERS'],
+            )
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while running batch: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error running batch: {e}")
+            batch_ns.abort(500, "An error occurred while running the batch.")
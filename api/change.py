@@ -0,0 +1,61 @@
+import logging
+from flask import request
+from flask_restx import Resource, fields
+from api import GarageNamespace
+from werkzeug.exceptions import HTTPException
+from services.change_service import get_changes, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Namespace for the change feed
+changes_ns = GarageNamespace('changes', description='Incremental change feed for delta synchronization')
+
+change_model = changes_ns.model('Change', {
+    'seq': fields.Integer(description='Sequence number of the change'),
+    'resource': fields.String(description='Resource of the changed record (e.g. work)'),
+    'record_id': fields.Integer(description='ID of the changed record'),
+    'action': fields.String(description='create, update, delete or archive'),
+    'data': fields.Raw(description='The record after the change; null for deletes and archiving'),
+    'changed_at': fields.DateTime(description='Time of the change'),
+})
+
+change_page_model = changes_ns.model('ChangePage', {
+    'changes': fields.List(fields.Nested(change_model), description='Changes after since, oldest first'),
+    'next_since': fields.Integer(description='Value of since for the next call'),
+    'has_more': fields.Boolean(description='Whether more changes are waiting'),
+    'latest_seq': fields.Integer(description='Sequence number of the newest change'),
+})
+
+
+@changes_ns.route('')
+class Changes(Resource):
+    """
+    Handles reading the change feed.
+    """
+
+    @changes_ns.doc('get_changes', params={
+        'since': 'Last sequence number already applied (default 0: every change)',
+        'limit': f'Maximum number of changes (default {DEFAULT_PAGE_SIZE}, at most {MAX_PAGE_SIZE})',
+    })
+    @changes_ns.marshal_with(change_page_model)
+    @changes_ns.response(400, 'Bad Request')
+    def get(self):
+        """
+        Retrieve the records created, updated or deleted since a sequence number.
+        Call again with since=next_since while has_more is true.
+        :return: A page of changes, in sequence order
+        """
+        try:
+            since = request.args.get('since', 0, type=int)
+            limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+            if since < 0 or not 1 <= limit <= MAX_PAGE_SIZE:
+                changes_ns.abort(400, f"'since' must be >= 0 and 'limit' between 1 and {MAX_PAGE_SIZE}.")
+            return get_changes(since, limit)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while retrieving changes: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error retrieving changes: {e}")
+            changes_ns.abort(500, "An error occurred while retrieving the changes.")
@@ -1,5 +1,7 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask import current_app, request
+from flask_restx import Resource, fields
+from api import GarageNamespace
 from werkzeug.exceptions import HTTPException
 from services.client_service import (
     get_all_clients,
@@ -8,7 +10,15 @@ from services.client_service import (
     update_client,
     delete_client
 )
-from utils.utils import generate_swagger_model
+from services.import_service import import_records, FORMATS
+from utils.utils import generate_swagger_model, import_report_model
+from utils.validation import compile_validator
+from utils.concurrency import IF_MATCH_PARAM, etag_header, if_match_version
+from utils.idempotency import idempotent
+from utils.single_flight import coalesce
+from utils.multi_get import by_ids, lookup
+from services.multi_get_service import MAX_QUERY_IDS, MAX_LOOKUP_IDS
+from utils.include import sideload
 from models.client import Client
 
 
@@ -17,7 +27,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for managing clients
-clients_ns = Namespace('client', description='CRUD operations for managing clients')
+clients_ns = GarageNamespace('client', description='CRUD operations for managing clients')
 
 # Generate the Swagger model for the client resource
 client_model = generate_swagger_model(
@@ -27,6 +37,18 @@ client_model = generate_swagger_model(
     readonly_fields=['client_id']  # Fields that cannot be modified
 )
 
+# Request body validation, compiled once from the model (typed values for the services)
+client_validator = compile_validator(Client, readonly_fields=['client_id', 'created_at'])
+
+# Body of POST /lookup, and response of it and of GET /?ids=
+id_lookup_model = clients_ns.model('IdLookup', {
+    'ids': fields.List(fields.Integer, required=True, description='Ids to fetch, in the order they should be returned'),
+})
+client_lookup_model = clients_ns.model('ClientLookupResult', {
+    'data': fields.List(fields.Nested(client_model), description='Clients found, in the order of the ids'),
+    'missing': fields.List(fields.Integer, description='Requested ids that do not exist'),
+})
+clients_ns.add_model(import_report_model.name, import_report_model)
 
 @clients_ns.route('/')
 class ClientList(Resource):
@@ -35,6 +57,9 @@ class ClientList(Resource):
     Supports retrieving all clients (GET) and creating new clients (POST).
     """
 
+    @coalesce
+    @sideload(Client)
+    @by_ids('client', client_model, MAX_QUERY_IDS)
     @clients_ns.doc('get_all_clients')
     @clients_ns.marshal_list_with(client_model)
     def get(self):
@@ -54,18 +79,20 @@ class ClientList(Resource):
             logger.error(f"Error retrieving clients: {e}")
             clients_ns.abort(500, "An error occurred while retrieving the clients.")
 
+    @idempotent
     @clients_ns.doc('create_client')
-    @clients_ns.expect(client_model, validate=True)
+    @clients_ns.expect(client_model)
     @clients_ns.marshal_with(client_model, code=201)
+    @clients_ns.response(409, 'Another client has the same name')
     def post(self):
         """
         Create a new client.
         :return: The created client with HTTP status code 201
         """
-        data = clients_ns.payload  # Extract JSON payload
+        values = client_validator(clients_ns.payload)  # Typed values of the JSON payload
         try:
             # Call the service to create a new client
-            return create_client(data["name"],data["email"],data["phone"],data["address"]), 201
+            return create_client(**values), 201
         except HTTPException as http_err:
             logger.error(f"HTTP error while creating client: {http_err}")
             raise http_err
@@ -75,6 +102,32 @@ class ClientList(Resource):
             clients_ns.abort(500, "An error occurred while creating the client.")
 
 
+@clients_ns.route('/lookup')
+class ClientLookup(Resource):
+    """
+    Handles fetching several clients by id, for lists too long for GET /?ids=.
+    """
+
+    @sideload(Client)
+    @clients_ns.doc('lookup_clients')
+    @clients_ns.expect(id_lookup_model, validate=True)
+    @clients_ns.marshal_with(client_lookup_model)
+    @clients_ns.response(400, 'Bad Request')
+    def post(self):
+        """
+        Retrieve several clients by id, in the order given.
+        :return: The clients found and the ids that do not exist
+        """
+        try:
+            return lookup('client', clients_ns.payload['ids'], MAX_LOOKUP_IDS)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while looking up clients: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error looking up clients: {e}")
+            clients_ns.abort(500, "An error occurred while retrieving the clients.")
+
+
 @clients_ns.route('/<int:client_id>')
 @clients_ns.param('client_id', 'The ID of the client')
 class Client(Resource):
@@ -83,6 +136,7 @@ class Client(Resource):
     Supports retrieving (GET), updating (PUT), and deleting (DELETE) a client.
     """
 
+    @sideload(Client)
     @clients_ns.doc('get_client')
     @clients_ns.marshal_with(client_model)
     def get(self, client_id):
@@ -97,7 +151,7 @@ class Client(Resource):
             if not client:
                 # Return a 404 error if client does not exist
                 clients_ns.abort(404, f"Client with ID {client_id} not found.")
-            return client
+            return client, 200, etag_header(client)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving client with ID {client_id}: {http_err}")
             raise http_err
@@ -106,8 +160,9 @@ class Client(Resource):
             logger.error(f"Error retrieving client with ID {client_id}: {e}")
             clients_ns.abort(500, "An error occurred while retrieving the client.")
 
-    @clients_ns.doc('update_client')
-    @clients_ns.expect(client_model, validate=True)
+    @clients_ns.doc('update_client', params={'If-Match': IF_MATCH_PARAM})
+    @clients_ns.response(412, 'The record changed since the version named in If-Match')
+    @clients_ns.expect(client_model)
     @clients_ns.marshal_with(client_model)
     def put(self, client_id):
         """
@@ -115,14 +170,14 @@ class Client(Resource):
         :param client_id: The ID of the client
         :return: The updated client details or 404 if not found
         """
-        data = clients_ns.payload  # Extract JSON payload
+        values = client_validator(clients_ns.payload, partial=True)  # Typed values of the fields given
         try:
             # Call the service to update the client
-            client = update_client(client_id, data["name"],data["email"],data["phone"],data["address"])
+            client = update_client(client_id, **values, expected_versions=if_match_version())
             if not client:
                 # Return a 404 error if client does not exist
                 clients_ns.abort(404, f"Client with ID {client_id} not found.")
-            return client
+            return client, 200, etag_header(client)
         except HTTPException as http_err:
             logger.error(f"HTTP error while updating client with ID {client_id}: {http_err}")
             raise http_err
@@ -152,4 +207,35 @@ class Client(Resource):
         except Exception as e:
             # Log error and return a 500 status code
             logger.error(f"Error deleting client with ID {client_id}: {e}")
-            clients_ns.abort(500, "An error occurred while deleting the client.")
\ No newline at end of file
+            clients_ns.abort(500, "An error occurred while deleting the client.")
+
+@clients_ns.route('/import')
+class ClientImport(Resource):
+    """
+    Handles bulk imports of clients.
+    """
+
+    @clients_ns.doc('import_clients', params={
+        'format': 'csv (with a header line) or ndjson; defaults to the Content-Type',
+        'batch_size': 'Rows inserted per transaction (default IMPORT_BATCH_SIZE, max 5000)',
+    })
+    @clients_ns.response(400, 'Invalid format or batch size')
+    @clients_ns.marshal_with(import_report_model)
+    def post(self):
+        """
+        Import clients from a CSV or NDJSON request body, streamed and committed in batches.
+        Rows failing validation are skipped and listed in the report.
+        :return: The import report
+        """
+        try:
+            fmt = request.args.get('format') or ('ndjson' if 'json' in request.mimetype else 'csv')
+            batch_size = request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE'], type=int)
+            if fmt not in FORMATS or not 0 < batch_size <= 5000:
+                clients_ns.abort(400, f"Format must be one of {', '.join(FORMATS)} and batch_size between 1 and 5000.")
+            return import_records('client', request.stream, fmt, batch_size)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while importing clients: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error importing clients: {e}")
+            clients_ns.abort(500, "An error occurred while importing the clients.")
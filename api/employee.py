@@ -1,8 +1,19 @@
 import logging
-from flask_restx import Namespace, Resource, abort
+from datetime import date
+from flask import request
+from flask_restx import Resource, abort, fields
+from api import GarageNamespace
 from models.employee import Employee
-from services.employee_service import get_all_employees, get_employee, create_employee, update_employee, delete_employee
+from services.employee_service import get_all_employees, get_employee, create_employee, update_employee, delete_employee, get_workload
+from services.schedule_service import get_available_employees
 from utils.utils import generate_swagger_model
+from utils.validation import compile_validator
+from utils.concurrency import IF_MATCH_PARAM, etag_header, if_match_version
+from utils.idempotency import idempotent
+from utils.single_flight import coalesce
+from utils.multi_get import by_ids, lookup
+from services.multi_get_service import MAX_QUERY_IDS, MAX_LOOKUP_IDS
+from utils.include import sideload
 from werkzeug.exceptions import HTTPException, BadRequest, NotFound
 
 # Initialize logging
@@ -10,16 +21,54 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for employees
-employees_ns = Namespace('employee', description='CRUD operations for managing employees')
+employees_ns = GarageNamespace('employee', description='CRUD operations for managing employees')
 
 # Generate the Swagger model for employees
 employee_model = generate_swagger_model(
     api=employees_ns,
     model=Employee,
-    exclude_fields=[],
+    exclude_fields=['password_hash'],  # Set with flask set-password, never returned
     readonly_fields=['employee_id', 'created_at']
 )
 
+# Request body validation, compiled once from the model (typed values for the services)
+employee_validator = compile_validator(Employee, readonly_fields=['employee_id', 'created_at', 'password_hash'])
+
+# Body of POST /lookup, and response of it and of GET /?ids=
+id_lookup_model = employees_ns.model('IdLookup', {
+    'ids': fields.List(fields.Integer, required=True, description='Ids to fetch, in the order they should be returned'),
+})
+employee_lookup_model = employees_ns.model('EmployeeLookupResult', {
+    'data': fields.List(fields.Nested(employee_model), description='Employees found, in the order of the ids'),
+    'missing': fields.List(fields.Integer, description='Requested ids that do not exist'),
+})
+
+# Model for the workload report of one employee
+workload_model = employees_ns.model('EmployeeWorkload', {
+    'employee_id': fields.Integer(description='Employee ID'),
+    'name': fields.String(description='Employee name'),
+    'tasks': fields.Integer(description='Tasks overlapping the range'),
+    'days_booked': fields.Integer(description='Task days inside the range (cancelled tasks excluded)'),
+    'open_tasks': fields.Integer(description='Pending or in-progress tasks'),
+    'finished_tasks': fields.Integer(description='Completed tasks'),
+    'cancelled_tasks': fields.Integer(description='Cancelled tasks'),
+})
+
+
+def parse_date_range():
+    """
+    Read the mandatory 'from' and 'to' query parameters (YYYY-MM-DD).
+    :return: tuple: (date_from, date_to), or aborts with 400 if they are missing or invalid
+    """
+    try:
+        date_from = date.fromisoformat(request.args['from'])
+        date_to = date.fromisoformat(request.args['to'])
+    except (KeyError, ValueError):
+        employees_ns.abort(400, "Query parameters 'from' and 'to' are required, in YYYY-MM-DD format.")
+    if date_from > date_to:
+        employees_ns.abort(400, "'from' must not be after 'to'.")
+    return date_from, date_to
+
 # Routes for managing employees
 @employees_ns.route('/')
 @employees_ns.response(500, 'Internal Server Error')
@@ -27,6 +76,9 @@ class EmployeeList(Resource):
     """
     Resource for operations on the collection of employees (GET all, POST new).
     """
+    @coalesce
+    @sideload(Employee)
+    @by_ids('employee', employee_model, MAX_QUERY_IDS)
     @employees_ns.doc('get_all_employees')
     @employees_ns.marshal_list_with(employee_model)
     def get(self):
@@ -45,18 +97,20 @@ class EmployeeList(Resource):
             logger.error(f"Error fetching all employees: {e}")
             employees_ns.abort(500, "Internal Server Error")
 
+    @idempotent
     @employees_ns.doc('create_employee')
     @employees_ns.expect(employee_model)
     @employees_ns.marshal_with(employee_model, code=201)
     @employees_ns.response(400, 'Bad Request')
+    @employees_ns.response(409, 'Another employee has the same email')
     def post(self):
         """
         Create a new employee.
         :return: Dictionary of the created employee with HTTP 201 status code
         """
         try:
-            data = employees_ns.payload
-            employee = create_employee(data['name'], data['email'], data['phone'], data['role'], data['hired_date'])
+            values = employee_validator(employees_ns.payload)
+            employee = create_employee(**values)
             return employee, 201
         except HTTPException as http_err:
             # Allow HTTP exceptions to propagate as they are
@@ -67,6 +121,32 @@ class EmployeeList(Resource):
             employees_ns.abort(400, "Bad Request")
 
 
+@employees_ns.route('/lookup')
+class EmployeeLookup(Resource):
+    """
+    Handles fetching several employees by id, for lists too long for GET /?ids=.
+    """
+
+    @sideload(Employee)
+    @employees_ns.doc('lookup_employees')
+    @employees_ns.expect(id_lookup_model, validate=True)
+    @employees_ns.marshal_with(employee_lookup_model)
+    @employees_ns.response(400, 'Bad Request')
+    def post(self):
+        """
+        Retrieve several employees by id, in the order given.
+        :return: The employees found and the ids that do not exist
+        """
+        try:
+            return lookup('employee', employees_ns.payload['ids'], MAX_LOOKUP_IDS)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while looking up employees: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error looking up employees: {e}")
+            employees_ns.abort(500, "An error occurred while retrieving the employees.")
+
+
 @employees_ns.route('/<int:employee_id>')
 @employees_ns.response(404, 'Employee ID not found')
 @employees_ns.response(500, 'Internal Server Error')
@@ -77,6 +157,7 @@ class Employee(Resource):
     """
     @employees_ns.route('/<int:employee_id>')
     class EmployeeResource(Resource):
+        @sideload(Employee)
         @employees_ns.doc('get_employee')
         @employees_ns.marshal_with(employee_model)
         def get(self, employee_id):
@@ -89,7 +170,7 @@ class Employee(Resource):
                 if not employee:
                     # Abort with a 404 status and custom message
                     raise NotFound('My custom message')
-                return employee
+                return employee, 200, etag_header(employee)
             # except HTTPException as http_err:
             #     # Allow HTTP exceptions to propagate as they are
             #     raise http_err
@@ -98,7 +179,8 @@ class Employee(Resource):
                 logger.error(f"Error fetching employee {employee_id}: {e}")
                 abort(500, description="Internal Server Error")
 
-    @employees_ns.doc('update_employee')
+    @employees_ns.doc('update_employee', params={'If-Match': IF_MATCH_PARAM})
+    @employees_ns.response(412, 'The record changed since the version named in If-Match')
     @employees_ns.expect(employee_model)
     @employees_ns.marshal_with(employee_model)
     @employees_ns.response(400, 'Bad Request')
@@ -109,11 +191,13 @@ class Employee(Resource):
         :return: Dictionary of the updated employee or a 404 error if not found
         """
         try:
-            data = employees_ns.payload
-            updated_employee = update_employee(employee_id, data['name'], data['email'], data['phone'], data['role'], data['hired_date'])
+            values = employee_validator(employees_ns.payload, partial=True)
+            updated_employee = update_employee(employee_id, **values, expected_versions=if_match_version())
             if not updated_employee:
                 employees_ns.abort(404, f"Employee with ID {employee_id} not found.")
-            return updated_employee
+            if isinstance(updated_employee, tuple):
+                return updated_employee
+            return updated_employee, 200, etag_header(updated_employee)
         except HTTPException as http_err:
             # Allow HTTP exceptions to propagate as they are
             raise http_err
@@ -140,4 +224,59 @@ class Employee(Resource):
         except Exception as e:
             # Log and handle unexpected exceptions with a 500 status code
             logger.error(f"Error deleting employee {employee_id}: {e}")
-            employees_ns.abort(500, "Internal Server Error")
\ No newline at end of file
+            employees_ns.abort(500, "Internal Server Error")
+
+@employees_ns.route('/workload')
+@employees_ns.response(400, 'Bad Request')
+@employees_ns.response(500, 'Internal Server Error')
+class EmployeeWorkload(Resource):
+    """
+    Resource for the employee workload report.
+    """
+    @employees_ns.doc('get_workload', params={'from': 'First day (YYYY-MM-DD)', 'to': 'Last day (YYYY-MM-DD)'})
+    @employees_ns.marshal_list_with(workload_model)
+    def get(self):
+        """
+        Tasks, days booked and open vs. finished work per employee over a date range.
+        :return: List with the workload of each employee
+        """
+        try:
+            date_from, date_to = parse_date_range()
+            return get_workload(date_from, date_to)
+        except HTTPException as http_err:
+            # Allow HTTP exceptions to propagate as they are
+            raise http_err
+        except Exception as e:
+            # Log and handle unexpected exceptions with a 500 status code
+            logger.error(f"Error computing the workload report: {e}")
+            employees_ns.abort(500, "Internal Server Error")
+
+
+@employees_ns.route('/available')
+@employees_ns.response(400, 'Bad Request')
+@employees_ns.response(500, 'Internal Server Error')
+class EmployeeAvailability(Resource):
+    """
+    Resource for finding free employees.
+    """
+    @employees_ns.doc('get_available_employees', params={
+        'from': 'First day (YYYY-MM-DD)',
+        'to': 'Last day (YYYY-MM-DD)',
+        'role': 'Only employees with this role (e.g. mechanic)',
+    })
+    @employees_ns.marshal_list_with(employee_model)
+    def get(self):
+        """
+        Retrieve the employees without any task in a date range.
+        :return: List of available employees
+        """
+        try:
+            date_from, date_to = parse_date_range()
+            return get_available_employees(date_from, date_to, request.args.get('role'))
+        except HTTPException as http_err:
+            # Allow HTTP exceptions to propagate as they are
+            raise http_err
+        except Exception as e:
+            # Log and handle unexpected exceptions with a 500 status code
+            logger.error(f"Error fetching available employees: {e}")
+            employees_ns.abort(500, "Internal Server Error")
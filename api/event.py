@@ -0,0 +1,123 @@
+import json
+import logging
+import time
+from flask import Response, current_app, request
+from flask_restx import Resource
+from api import GarageNamespace
+from werkzeug.exceptions import HTTPException
+from services.change_service import get_changes_after
+from utils.change_stream import STREAMED_RESOURCES, change_stream, format_event
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Namespace for the event stream
+events_ns = GarageNamespace('events', description='Server-Sent Events stream of work and task changes')
+
+
+def parse_list(name, values=None):
+    """
+    Read a comma-separated query parameter.
+    :return: list: The values, or None if the parameter is absent
+    """
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    items = [item.strip() for item in raw.split(',') if item.strip()]
+    if values is not None and any(item not in values for item in items):
+        events_ns.abort(400, f"'{name}' must be a comma-separated list of {', '.join(values)}.")
+    return items
+
+
+def stream_changes(position, backlog, resources, record_ids, heartbeat, max_replay, max_seconds=0):
+    """
+    Generate the event stream: the changes replayed from the change log, then the ones
+    published live, filtered, with a keep-alive comment when nothing was sent for a while.
+    The stream ends after max_seconds (0: never), or when the stream is closed, and the
+    client reconnects with its Last-Event-ID: a connection holds a server thread only so long.
+    """
+    yield "retry: 3000\n\n"
+    if len(backlog) > max_replay:
+        # Too far behind for a replay: the client catches up with /api/changes and reconnects
+        since = json.dumps({"since": backlog[0]["seq"] - 1})
+        yield f"event: reset\ndata: {since}\n\n"
+        return
+    last_seq = 0
+    for change in backlog:
+        yield format_event(change)
+        last_seq = change["seq"]
+
+    last_sent = time.monotonic()
+    deadline = last_sent + max_seconds if max_seconds else None
+    while True:
+        timeout = heartbeat
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                return
+        position, changes = change_stream.read(position, timeout)
+        if position is None:
+            # Fell behind the buffer, or the worker stops: closing makes the client reconnect
+            # with its Last-Event-ID
+            return
+        for change, message in changes:
+            # Changes committed before the replay query were replayed already
+            if (change["seq"] > last_seq and change["resource"] in resources
+                    and (not record_ids or change["record_id"] in record_ids)):
+                yield message
+                last_sent = time.monotonic()
+        if time.monotonic() - last_sent >= heartbeat:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+
+
+@events_ns.route('')
+class Events(Resource):
+    """
+    Handles the Server-Sent Events stream.
+    """
+
+    @events_ns.doc('get_events', params={
+        'resource': f"Comma-separated resources to follow ({', '.join(STREAMED_RESOURCES)}; default all)",
+        'id': 'Comma-separated record IDs to follow (default all)',
+        'last_event_id': 'Resume after this event ID (same as the Last-Event-ID header)',
+    })
+    @events_ns.produces(['text/event-stream'])
+    @events_ns.response(400, 'Bad Request')
+    def get(self):
+        """
+        Stream the work and task creations, updates and deletions as they are committed.
+        Each event has the change log sequence number as ID and the change as JSON data;
+        after a reconnection the changes missed since Last-Event-ID are sent first.
+        :return: A text/event-stream response
+        """
+        try:
+            resources = parse_list('resource', STREAMED_RESOURCES) or list(STREAMED_RESOURCES)
+            record_ids = parse_list('id')
+            if record_ids is not None and not all(item.isdigit() for item in record_ids):
+                events_ns.abort(400, "'id' must be a comma-separated list of IDs.")
+            record_ids = {int(item) for item in record_ids} if record_ids else None
+            last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+            if last_event_id is not None and not last_event_id.isdigit():
+                events_ns.abort(400, "Last-Event-ID must be an event ID.")
+
+            # Subscribe before reading the backlog, so that no change falls between the two
+            position = change_stream.position()
+            max_replay = current_app.config['EVENTS_MAX_REPLAY']
+            backlog = []
+            if last_event_id is not None:
+                backlog = get_changes_after(int(last_event_id), resources, record_ids, limit=max_replay + 1)
+            return Response(
+                stream_changes(position, backlog, resources, record_ids,
+                               current_app.config['EVENTS_HEARTBEAT_SECONDS'], max_replay,
+                               current_app.config['EVENTS_MAX_STREAM_SECONDS']),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+            )
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while opening the event stream: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error opening the event stream: {e}")
+            events_ns.abort(500, "An error occurred while opening the event stream.")
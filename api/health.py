@@ -0,0 +1,39 @@
+import logging
+from flask import Blueprint
+from services.warmup_service import ping_database, warm_up
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Probes for load balancers and orchestrators, outside /api (no rate limiting)
+health_bp = Blueprint('health', __name__)
+
+NO_STORE = {'Cache-Control': 'no-store'}
+
+
+@health_bp.route('/health')
+def health():
+    """
+    Liveness: the process is up and serving requests. Nothing else is checked, so that a
+    database outage does not get healthy processes restarted.
+    :return: 200 with {"status": "ok"}
+    """
+    return {'status': 'ok'}, 200, NO_STORE
+
+
+@health_bp.route('/ready')
+def ready():
+    """
+    Readiness: the warm-up is done and the database answers.
+    :return: 200 with the database round-trip latency and the warm-up report, or 503
+             while warming up or when the database cannot be reached
+    """
+    if not warm_up.ready:
+        return {'status': 'warming_up'}, 503, NO_STORE
+    try:
+        latency = ping_database()
+    except Exception as e:
+        logger.error(f"Readiness check failed: {e}")
+        return {'status': 'unavailable', 'error': 'The database cannot be reached.'}, 503, NO_STORE
+    return {'status': 'ready', 'db_latency_ms': round(latency, 2), 'warmup': warm_up.report}, 200, NO_STORE
@@ -1,5 +1,7 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask import Response, request, stream_with_context
+from flask_restx import Resource, fields
+from api import GarageNamespace
 from werkzeug.exceptions import HTTPException
 from services.invoice_service import (
     get_all_invoices,
@@ -8,15 +10,27 @@ from services.invoice_service import (
     update_invoice,
     delete_invoice
 )
+from services.invoice_summary_service import get_invoice_summary, GROUPINGS
+from services.billing_service import run_batch_invoicing, BILLING_CHUNK_SIZE
 from utils.utils import generate_swagger_model
+from utils.validation import compile_validator
+from utils.concurrency import IF_MATCH_PARAM, etag_header, if_match_version
+from utils.idempotency import idempotent
+from utils.single_flight import coalesce
+from utils.multi_get import by_ids, lookup
+from services.multi_get_service import MAX_QUERY_IDS, MAX_LOOKUP_IDS
+from utils.include import sideload
+from services.export_service import iter_csv, resolve_columns
+from utils.filters import build_filters, wants_archived
 from models.invoice import Invoice
+from models.archive import InvoiceArchive
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for managing invoice
-invoices_ns = Namespace('invoice', description='CRUD operations for managing invoices')
+invoices_ns = GarageNamespace('invoice', description='CRUD operations for managing invoices')
 
 # Generate the Swagger model for the invoice resource
 invoice_model = generate_swagger_model(
@@ -26,6 +40,55 @@ invoice_model = generate_swagger_model(
     readonly_fields=['invoice_id']  # Fields that cannot be modified
 )
 
+# Request body validation, compiled once from the model (typed values for the services)
+invoice_validator = compile_validator(Invoice, readonly_fields=['invoice_id', 'issued_at'])
+
+# Body of POST /lookup, and response of it and of GET /?ids=
+id_lookup_model = invoices_ns.model('IdLookup', {
+    'ids': fields.List(fields.Integer, required=True, description='Ids to fetch, in the order they should be returned'),
+})
+invoice_lookup_model = invoices_ns.model('InvoiceLookupResult', {
+    'data': fields.List(fields.Nested(invoice_model), description='Invoices found, in the order of the ids'),
+    'missing': fields.List(fields.Integer, description='Requested ids that do not exist'),
+})
+
+# Model for one row of the revenue summary
+invoice_summary_model = invoices_ns.model('InvoiceSummary', {
+    'year': fields.Integer(description='Year (when grouped by month or year)'),
+    'month': fields.Integer(description='Month (when grouped by month)'),
+    'client_id': fields.Integer(description='Client ID (when grouped by client)'),
+    'invoice_count': fields.Integer(description='Number of invoices'),
+    'total': fields.Float(description='Total without IVA'),
+    'total_with_iva': fields.Float(description='Total with IVA'),
+})
+
+billing_run_model = invoices_ns.model('BillingRun', {
+    'dry_run': fields.Boolean(description='Whether nothing was written'),
+    'iva': fields.Float(description='IVA rate applied'),
+    'invoices': fields.Integer(description='Invoices created (or to create)'),
+    'items': fields.Integer(description='Invoice items created (or to create)'),
+    'total': fields.Float(description='Total without IVA'),
+    'total_with_iva': fields.Float(description='Total with IVA'),
+    'chunks': fields.Integer(description='Transactions committed'),
+    'elapsed_seconds': fields.Float(description='Run duration'),
+    'items_per_second': fields.Float(description='Throughput (not set for dry runs)'),
+})
+
+
+def parse_month(value):
+    """
+    Parse a 'YYYY-MM' query parameter into a (year, month) tuple.
+    """
+    if not value:
+        return None
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        year, month = 0, 0
+    if not 1 <= month <= 12:
+        invoices_ns.abort(400, f"Invalid month '{value}', expected YYYY-MM.")
+    return year, month
+
 
 @invoices_ns.route('/')
 class InvoiceList(Resource):
@@ -34,7 +97,15 @@ class InvoiceList(Resource):
     Supports retrieving all invoices (GET) and creating new invoices (POST).
     """
 
-    @invoices_ns.doc('get_all_invoices')
+    @coalesce
+    @sideload(Invoice)
+    @by_ids('invoice', invoice_model, MAX_QUERY_IDS)
+    @invoices_ns.doc('get_all_invoices', params={
+        '<column>': 'Filter by equality on any column (e.g. client_id=3)',
+        '<column>_from / <column>_to': 'Inclusive range on any column (e.g. issued_at_from=2025-01-01)',
+        'include_archived': 'Also return archived records (1)',
+    })
+    @invoices_ns.response(400, 'Invalid filter')
     @invoices_ns.marshal_list_with(invoice_model)
     def get(self):
         """
@@ -42,27 +113,29 @@ class InvoiceList(Resource):
         :return: List of all invoices
         """
         try:
-            return get_all_invoices()
+            archived_filters = build_filters(InvoiceArchive, request.args) if wants_archived(request.args) else None
+            return get_all_invoices(build_filters(Invoice, request.args), archived_filters)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving invoices: {http_err}")
             raise http_err
+        except ValueError as e:
+            invoices_ns.abort(400, str(e))
         except Exception as e:
             logger.error(f"Error retrieving invoices: {e}")
             invoices_ns.abort(500, "An error occurred while retrieving the invoices.")
 
+    @idempotent
     @invoices_ns.doc('create_invoice')
-    @invoices_ns.expect(invoice_model, validate=True)
+    @invoices_ns.expect(invoice_model)
     @invoices_ns.marshal_with(invoice_model, code=201)
     def post(self):
         """
         Create a new invoice.
         :return: The created invoice with HTTP status code 201
         """
-        data = invoices_ns.payload
+        values = invoice_validator(invoices_ns.payload)
         try:
-            return create_invoice(
-                data["iva"], data["total"], data["total_with_iva"], data["client_id"]
-            ), 201
+            return create_invoice(**values), 201
         except HTTPException as http_err:
             logger.error(f"HTTP error while creating invoice: {http_err}")
             raise http_err
@@ -71,6 +144,32 @@ class InvoiceList(Resource):
             invoices_ns.abort(500, "An error occurred while creating the invoice.")
 
 
+@invoices_ns.route('/lookup')
+class InvoiceLookup(Resource):
+    """
+    Handles fetching several invoices by id, for lists too long for GET /?ids=.
+    """
+
+    @sideload(Invoice)
+    @invoices_ns.doc('lookup_invoices')
+    @invoices_ns.expect(id_lookup_model, validate=True)
+    @invoices_ns.marshal_with(invoice_lookup_model)
+    @invoices_ns.response(400, 'Bad Request')
+    def post(self):
+        """
+        Retrieve several invoices by id, in the order given.
+        :return: The invoices found and the ids that do not exist
+        """
+        try:
+            return lookup('invoice', invoices_ns.payload['ids'], MAX_LOOKUP_IDS)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while looking up invoices: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error looking up invoices: {e}")
+            invoices_ns.abort(500, "An error occurred while retrieving the invoices.")
+
+
 @invoices_ns.route('/<int:invoice_id>')
 @invoices_ns.param('invoice_id', 'The ID of the invoice')
 class InvoiceResource(Resource):
@@ -79,7 +178,8 @@ class InvoiceResource(Resource):
     Supports retrieving (GET), updating (PUT), and deleting (DELETE) an invoice.
     """
 
-    @invoices_ns.doc('get_invoice')
+    @sideload(Invoice)
+    @invoices_ns.doc('get_invoice', params={'include_archived': 'Also look among archived records (1)'})
     @invoices_ns.marshal_with(invoice_model)
     def get(self, invoice_id):
         """
@@ -88,10 +188,10 @@ class InvoiceResource(Resource):
         :return: The invoice details or 404 if not found
         """
         try:
-            invoice = get_invoice(invoice_id)
+            invoice = get_invoice(invoice_id, wants_archived(request.args))
             if not invoice:
                 invoices_ns.abort(404, f"Invoice with ID {invoice_id} not found.")
-            return invoice
+            return invoice, 200, etag_header(invoice)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving invoice with ID {invoice_id}: {http_err}")
             raise http_err
@@ -99,8 +199,9 @@ class InvoiceResource(Resource):
             logger.error(f"Error retrieving invoice with ID {invoice_id}: {e}")
             invoices_ns.abort(500, "An error occurred while retrieving the invoice.")
 
-    @invoices_ns.doc('update_invoice')
-    @invoices_ns.expect(invoice_model, validate=True)
+    @invoices_ns.doc('update_invoice', params={'If-Match': IF_MATCH_PARAM})
+    @invoices_ns.response(412, 'The record changed since the version named in If-Match')
+    @invoices_ns.expect(invoice_model)
     @invoices_ns.marshal_with(invoice_model)
     def put(self, invoice_id):
         """
@@ -108,15 +209,12 @@ class InvoiceResource(Resource):
         :param invoice_id: The ID of the invoice
         :return: The updated invoice details or 404 if not found
         """
-        data = invoices_ns.payload
+        values = invoice_validator(invoices_ns.payload, partial=True)
         try:
-            invoice = update_invoice(
-                invoice_id, data.get("total"), data.get("iva"),
-                data.get("total_with_iva"), data.get("client_id")
-            )
+            invoice = update_invoice(invoice_id, **values, expected_versions=if_match_version())
             if not invoice:
                 invoices_ns.abort(404, f"invoice with ID {invoice_id} not found.")
-            return invoice
+            return invoice, 200, etag_header(invoice)
         except HTTPException as http_err:
             logger.error(f"HTTP error while updating invoice with ID {invoice_id}: {http_err}")
             raise http_err
@@ -143,3 +241,104 @@ class InvoiceResource(Resource):
         except Exception as e:
             logger.error(f"Error deleting invoice with ID {invoice_id}: {e}")
             invoices_ns.abort(500, "An error occurred while deleting the invoice.")
+
+
+@invoices_ns.route('/summary')
+class InvoiceSummary(Resource):
+    """
+    Handles the monthly revenue report.
+    """
+
+    @invoices_ns.doc('get_invoice_summary', params={
+        'from': 'First month (YYYY-MM)',
+        'to': 'Last month (YYYY-MM)',
+        'group_by': 'One of: ' + ', '.join(GROUPINGS) + ' (default month)',
+    })
+    @invoices_ns.marshal_list_with(invoice_summary_model)
+    def get(self):
+        """
+        Retrieve revenue totals per month, year and/or client.
+        :return: List of revenue totals per group
+        """
+        try:
+            group_by = request.args.get('group_by', 'month')
+            if group_by not in GROUPINGS:
+                invoices_ns.abort(400, f"Invalid group_by '{group_by}', expected one of: {', '.join(GROUPINGS)}.")
+            return get_invoice_summary(
+                parse_month(request.args.get('from')), parse_month(request.args.get('to')), group_by
+            )
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while retrieving the invoice summary: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error retrieving the invoice summary: {e}")
+            invoices_ns.abort(500, "An error occurred while retrieving the invoice summary.")
+
+
+@invoices_ns.route('/export.csv')
+class InvoiceExport(Resource):
+    """
+    Handles the CSV export of invoices.
+    """
+
+    @invoices_ns.doc('export_invoice_csv', params={
+        'columns': 'Comma-separated columns to export (default: all)',
+        '<column>': 'Same filters as the list endpoint',
+    })
+    @invoices_ns.produces(['text/csv'])
+    @invoices_ns.response(400, 'Invalid column or filter')
+    def get(self):
+        """
+        Export invoices as CSV, streamed in constant memory.
+        :return: A streamed CSV file
+        """
+        try:
+            columns = request.args.get('columns')
+            selected = resolve_columns(Invoice, columns.split(',') if columns else None)
+            filters = build_filters(Invoice, request.args)
+            return Response(
+                stream_with_context(iter_csv(Invoice, selected, filters)),
+                mimetype='text/csv',
+                headers={'Content-Disposition': 'attachment; filename=invoice.csv'},
+            )
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while exporting invoices: {http_err}")
+            raise http_err
+        except ValueError as e:
+            invoices_ns.abort(400, str(e))
+        except Exception as e:
+            logger.error(f"Error exporting invoices: {e}")
+            invoices_ns.abort(500, "An error occurred while exporting the invoices.")
+
+
+@invoices_ns.route('/batch')
+class InvoiceBatch(Resource):
+    """
+    Handles batch invoicing runs.
+    """
+
+    @invoices_ns.doc('run_batch_invoicing', params={
+        'dry_run': 'Only report what would be invoiced (1/0, default 0)',
+        'chunk_size': f'Clients invoiced per transaction (default {BILLING_CHUNK_SIZE})',
+    })
+    @invoices_ns.response(400, 'Invalid chunk size')
+    @invoices_ns.response(409, 'A run is already in progress')
+    @invoices_ns.marshal_with(billing_run_model)
+    def post(self):
+        """
+        Invoice every completed task of a completed work that is not invoiced yet, one invoice per client.
+        Safe to repeat: tasks already invoiced are skipped.
+        :return: The run report
+        """
+        try:
+            chunk_size = request.args.get('chunk_size', BILLING_CHUNK_SIZE, type=int)
+            if chunk_size < 1:
+                invoices_ns.abort(400, "chunk_size must be a positive number.")
+            dry_run = request.args.get('dry_run', '0') in ('1', 'true')
+            return run_batch_invoicing(dry_run=dry_run, chunk_size=chunk_size)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while running batch invoicing: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error running batch invoicing: {e}")
+            invoices_ns.abort(500, "An error occurred while running the batch invoicing.")
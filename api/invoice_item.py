@@ -1,5 +1,7 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask import request
+from flask_restx import Resource, fields
+from api import GarageNamespace
 from werkzeug.exceptions import HTTPException
 from services.invoice_item_service import (
     get_all_invoice_items,
@@ -9,6 +11,14 @@ from services.invoice_item_service import (
     delete_invoice_item
 )
 from utils.utils import generate_swagger_model
+from utils.validation import compile_validator
+from utils.concurrency import IF_MATCH_PARAM, etag_header, if_match_version
+from utils.idempotency import idempotent
+from utils.single_flight import coalesce
+from utils.multi_get import by_ids, lookup
+from services.multi_get_service import MAX_QUERY_IDS, MAX_LOOKUP_IDS
+from utils.include import sideload
+from utils.filters import wants_archived
 from models.invoice_item import Invoice_item
 
 # Initialize logging
@@ -16,7 +26,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for managing work
-invoice_items_ns = Namespace('invoice_item', description='CRUD operations for managing invoice items')
+invoice_items_ns = GarageNamespace('invoice_item', description='CRUD operations for managing invoice items')
 
 # Generate the Swagger model for the work resource
 invoice_item_model = generate_swagger_model(
@@ -26,6 +36,18 @@ invoice_item_model = generate_swagger_model(
     readonly_fields=['item_id']  # Fields that cannot be modified
 )
 
+# Request body validation, compiled once from the model (typed values for the services)
+invoice_item_validator = compile_validator(Invoice_item, readonly_fields=['item_id'])
+
+# Body of POST /lookup, and response of it and of GET /?ids=
+id_lookup_model = invoice_items_ns.model('IdLookup', {
+    'ids': fields.List(fields.Integer, required=True, description='Ids to fetch, in the order they should be returned'),
+})
+invoice_item_lookup_model = invoice_items_ns.model('InvoiceItemLookupResult', {
+    'data': fields.List(fields.Nested(invoice_item_model), description='Invoice items found, in the order of the ids'),
+    'missing': fields.List(fields.Integer, description='Requested ids that do not exist'),
+})
+
 
 @invoice_items_ns.route('/')
 class InvoiceItemList(Resource):
@@ -34,7 +56,10 @@ class InvoiceItemList(Resource):
     Supports retrieving all work (GET) and creating new invoice items (POST).
     """
 
-    @invoice_items_ns.doc('get_all_invoice_items')
+    @coalesce
+    @sideload(Invoice_item)
+    @by_ids('invoice_item', invoice_item_model, MAX_QUERY_IDS)
+    @invoice_items_ns.doc('get_all_invoice_items', params={'include_archived': 'Also return archived records (1)'})
     @invoice_items_ns.marshal_list_with(invoice_item_model)
     def get(self):
         """
@@ -42,7 +67,7 @@ class InvoiceItemList(Resource):
         :return: List of all invoice items
         """
         try:
-            return get_all_invoice_items()
+            return get_all_invoice_items(wants_archived(request.args))
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving invoice items: {http_err}")
             raise http_err
@@ -50,19 +75,18 @@ class InvoiceItemList(Resource):
             logger.error(f"Error retrieving invoice items: {e}")
             invoice_items_ns.abort(500, "An error occurred while retrieving the invoice items.")
 
+    @idempotent
     @invoice_items_ns.doc('create_invoice_item')
-    @invoice_items_ns.expect(invoice_item_model, validate=True)
+    @invoice_items_ns.expect(invoice_item_model)
     @invoice_items_ns.marshal_with(invoice_item_model, code=201)
     def post(self):
         """
         Create a new invoice item.
         :return: The created invoice item with HTTP status code 201
         """
-        data = invoice_items_ns.payload
+        values = invoice_item_validator(invoice_items_ns.payload)
         try:
-            return create_invoice_item(
-                data["cost"], data["description"], data["invoice_id"], data["task_id"]
-            ), 201
+            return create_invoice_item(**values), 201
         except HTTPException as http_err:
             logger.error(f"HTTP error while creating invoice item: {http_err}")
             raise http_err
@@ -71,6 +95,32 @@ class InvoiceItemList(Resource):
             invoice_items_ns.abort(500, "An error occurred while creating the invoice item.")
 
 
+@invoice_items_ns.route('/lookup')
+class InvoiceItemLookup(Resource):
+    """
+    Handles fetching several invoice items by id, for lists too long for GET /?ids=.
+    """
+
+    @sideload(Invoice_item)
+    @invoice_items_ns.doc('lookup_invoice_items')
+    @invoice_items_ns.expect(id_lookup_model, validate=True)
+    @invoice_items_ns.marshal_with(invoice_item_lookup_model)
+    @invoice_items_ns.response(400, 'Bad Request')
+    def post(self):
+        """
+        Retrieve several invoice items by id, in the order given.
+        :return: The invoice items found and the ids that do not exist
+        """
+        try:
+            return lookup('invoice_item', invoice_items_ns.payload['ids'], MAX_LOOKUP_IDS)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while looking up invoice items: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error looking up invoice items: {e}")
+            invoice_items_ns.abort(500, "An error occurred while retrieving the invoice items.")
+
+
 @invoice_items_ns.route('/<int:item_id>')
 @invoice_items_ns.param('item_id', 'The ID of the invoice item.')
 class InvoiceItemResource(Resource):
@@ -79,7 +129,8 @@ class InvoiceItemResource(Resource):
     Supports retrieving (GET), updating (PUT), and deleting (DELETE) an invoice item.
     """
 
-    @invoice_items_ns.doc('get_invoice_item')
+    @sideload(Invoice_item)
+    @invoice_items_ns.doc('get_invoice_item', params={'include_archived': 'Also look among archived records (1)'})
     @invoice_items_ns.marshal_with(invoice_item_model)
     def get(self, item_id):
         """
@@ -88,10 +139,10 @@ class InvoiceItemResource(Resource):
         :return: The invoice item details or 404 if not found
         """
         try:
-            invoice_item = get_invoice_item(item_id)
+            invoice_item = get_invoice_item(item_id, wants_archived(request.args))
             if not invoice_item:
                 invoice_items_ns.abort(404, f"Invoice item with ID {item_id} not found.")
-            return invoice_item
+            return invoice_item, 200, etag_header(invoice_item)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving invoice item with ID {item_id}: {http_err}")
             raise http_err
@@ -99,8 +150,9 @@ class InvoiceItemResource(Resource):
             logger.error(f"Error retrieving invoice item with ID {item_id}: {e}")
             invoice_items_ns.abort(500, "An error occurred while retrieving the invoice item.")
 
-    @invoice_items_ns.doc('update_invoice_item')
-    @invoice_items_ns.expect(invoice_item_model, validate=True)
+    @invoice_items_ns.doc('update_invoice_item', params={'If-Match': IF_MATCH_PARAM})
+    @invoice_items_ns.response(412, 'The record changed since the version named in If-Match')
+    @invoice_items_ns.expect(invoice_item_model)
     @invoice_items_ns.marshal_with(invoice_item_model)
     def put(self, item_id):
         """
@@ -108,15 +160,12 @@ class InvoiceItemResource(Resource):
         :param item_id: The ID of the invoice item
         :return: The updated invoice item details or 404 if not found
         """
-        data = invoice_items_ns.payload
+        values = invoice_item_validator(invoice_items_ns.payload, partial=True)
         try:
-            invoice_item = update_invoice_item(
-                item_id, data.get("cost"), data.get("description"),
-                data.get("invoice_id"), data.get("task_id")
-            )
+            invoice_item = update_invoice_item(item_id, **values, expected_versions=if_match_version())
             if not invoice_item:
                 invoice_items_ns.abort(404, f"Invoice item with ID {item_id} not found.")
-            return invoice_item
+            return invoice_item, 200, etag_header(invoice_item)
         except HTTPException as http_err:
             logger.error(f"HTTP error while updating invoice item with ID {item_id}: {http_err}")
             raise http_err
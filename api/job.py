@@ -0,0 +1,216 @@
+import logging
+import os
+from flask import current_app, request, send_file, url_for
+from flask_restx import Resource, fields
+from api import GarageNamespace
+from werkzeug.exceptions import HTTPException
+from services.job_service import (
+    job_runner,
+    get_job,
+    get_jobs,
+    save_upload,
+    JOB_TYPES
+)
+from services.import_service import IMPORTABLE, FORMATS
+from utils.idempotency import idempotent
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Namespace for background jobs
+jobs_ns = GarageNamespace('jobs', description='Background jobs: exports, imports, invoicing and rebuilds')
+
+job_model = jobs_ns.model('Job', {
+    'job_id': fields.Integer(readonly=True, description='ID of the job'),
+    'job_type': fields.String(description='Job type', enum=sorted(JOB_TYPES)),
+    'status': fields.String(description='queued, running, succeeded, failed or cancelled'),
+    'params': fields.Raw(description='Job parameters'),
+    'progress': fields.Raw(description='Latest progress report'),
+    'result': fields.Raw(description='Result, once succeeded'),
+    'result_url': fields.String(
+        attribute=lambda job: url_for('api.jobs_job_result', job_id=job['job_id']) if job['result_path'] else None,
+        description='Where to download the file produced by the job, if any',
+    ),
+    'error': fields.String(description='Error message, if failed'),
+    'cancel_requested': fields.Boolean(description='Whether a running job was asked to stop'),
+    'created_at': fields.DateTime(),
+    'started_at': fields.DateTime(),
+    'finished_at': fields.DateTime(),
+})
+
+job_request_model = jobs_ns.model('JobRequest', {
+    'job_type': fields.String(required=True, description='Job type', enum=sorted(set(JOB_TYPES) - {'import'})),
+    'params': fields.Raw(description='Job parameters, e.g. {"resource": "invoice", "filters": {"client_id": 3}}'),
+})
+
+
+@jobs_ns.route('')
+class JobList(Resource):
+    """
+    Handles the collection of jobs.
+    Supports listing recent jobs (GET) and enqueueing a job (POST).
+    """
+
+    @jobs_ns.doc('get_jobs', params={
+        'status': 'Filter by status',
+        'type': 'Filter by job type',
+        'limit': 'Maximum number of jobs (default 50, max 200)',
+    })
+    @jobs_ns.marshal_list_with(job_model)
+    def get(self):
+        """
+        Retrieve the most recent jobs.
+        :return: List of jobs, newest first
+        """
+        try:
+            limit = min(request.args.get('limit', 50, type=int), 200)
+            return get_jobs(request.args.get('status'), request.args.get('type'), limit)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while retrieving jobs: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error retrieving jobs: {e}")
+            jobs_ns.abort(500, "An error occurred while retrieving the jobs.")
+
+    @idempotent
+    @jobs_ns.doc('create_job')
+    @jobs_ns.expect(job_request_model, validate=True)
+    @jobs_ns.response(400, 'Unknown job type or invalid parameters')
+    @jobs_ns.marshal_with(job_model, code=202)
+    def post(self):
+        """
+        Enqueue a job. It runs in the background; poll its status with GET /jobs/<job_id>.
+        :return: The queued job with HTTP status code 202
+        """
+        data = jobs_ns.payload
+        try:
+            return job_runner.submit(data['job_type'], data.get('params')), 202
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while creating job: {http_err}")
+            raise http_err
+        except ValueError as e:
+            jobs_ns.abort(400, str(e))
+        except Exception as e:
+            logger.error(f"Error creating job: {e}")
+            jobs_ns.abort(500, "An error occurred while creating the job.")
+
+
+@jobs_ns.route('/import/<string:resource>')
+@jobs_ns.param('resource', 'The resource to import (client, vehicle)')
+class JobImport(Resource):
+    """
+    Handles background bulk imports.
+    """
+
+    @jobs_ns.doc('create_import_job', params={
+        'format': 'csv (with a header line) or ndjson; defaults to the Content-Type',
+        'batch_size': 'Rows inserted per transaction (default IMPORT_BATCH_SIZE, max 5000)',
+    })
+    @jobs_ns.response(400, 'Invalid resource, format or batch size')
+    @jobs_ns.marshal_with(job_model, code=202)
+    def post(self, resource):
+        """
+        Upload a CSV or NDJSON file and import it in the background.
+        :param resource: The resource to import
+        :return: The queued job with HTTP status code 202
+        """
+        try:
+            fmt = request.args.get('format') or ('ndjson' if 'json' in request.mimetype else 'csv')
+            batch_size = request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE'], type=int)
+            if resource not in IMPORTABLE:
+                jobs_ns.abort(400, f"Resource must be one of {', '.join(IMPORTABLE)}.")
+            if fmt not in FORMATS or not 0 < batch_size <= 5000:
+                jobs_ns.abort(400, f"Format must be one of {', '.join(FORMATS)} and batch_size between 1 and 5000.")
+            params = {
+                'resource': resource, 'format': fmt, 'batch_size': batch_size,
+                'upload': save_upload(request.stream, fmt),
+            }
+            return job_runner.submit('import', params), 202
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while creating import job: {http_err}")
+            raise http_err
+        except ValueError as e:
+            jobs_ns.abort(400, str(e))
+        except Exception as e:
+            logger.error(f"Error creating import job: {e}")
+            jobs_ns.abort(500, "An error occurred while creating the import job.")
+
+
+@jobs_ns.route('/<int:job_id>')
+@jobs_ns.param('job_id', 'The ID of the job')
+class JobResource(Resource):
+    """
+    Handles a single job: status (GET) and cancellation (DELETE).
+    """
+
+    @jobs_ns.doc('get_job')
+    @jobs_ns.marshal_with(job_model)
+    def get(self, job_id):
+        """
+        Retrieve a job's status, progress and result.
+        :param job_id: The ID of the job
+        :return: The job or 404 if not found
+        """
+        try:
+            job = get_job(job_id)
+            if not job:
+                jobs_ns.abort(404, f"Job with ID {job_id} not found.")
+            return job
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while retrieving job with ID {job_id}: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error retrieving job with ID {job_id}: {e}")
+            jobs_ns.abort(500, "An error occurred while retrieving the job.")
+
+    @jobs_ns.doc('cancel_job')
+    @jobs_ns.marshal_with(job_model)
+    def delete(self, job_id):
+        """
+        Cancel a job. A queued job is dropped; a running job stops at its next checkpoint
+        (work already committed by it, e.g. imported batches, is kept).
+        :param job_id: The ID of the job
+        :return: The job or 404 if not found
+        """
+        try:
+            job = job_runner.cancel(job_id)
+            if not job:
+                jobs_ns.abort(404, f"Job with ID {job_id} not found.")
+            return job
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while cancelling job with ID {job_id}: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error cancelling job with ID {job_id}: {e}")
+            jobs_ns.abort(500, "An error occurred while cancelling the job.")
+
+
+@jobs_ns.route('/<int:job_id>/result', endpoint='jobs_job_result')
+@jobs_ns.param('job_id', 'The ID of the job')
+class JobResult(Resource):
+    """
+    Handles the download of the file produced by a job.
+    """
+
+    @jobs_ns.doc('get_job_result')
+    @jobs_ns.response(404, 'Job not found or without a result file')
+    def get(self, job_id):
+        """
+        Download the file produced by a succeeded job (e.g. an export).
+        :param job_id: The ID of the job
+        :return: The file
+        """
+        try:
+            job = get_job(job_id)
+            if not job or job['status'] != 'succeeded' or not job['result_path'] \
+                    or not os.path.exists(job['result_path']):
+                jobs_ns.abort(404, f"Job with ID {job_id} has no result file.")
+            return send_file(job['result_path'], as_attachment=True,
+                             download_name=os.path.basename(job['result_path']))
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while retrieving the result of job {job_id}: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error retrieving the result of job {job_id}: {e}")
+            jobs_ns.abort(500, "An error occurred while retrieving the job result.")
@@ -0,0 +1,62 @@
+import logging
+from flask import request
+from flask_restx import Resource, fields
+from api import GarageNamespace
+from werkzeug.exceptions import HTTPException
+from services.search_service import search, SEARCH_INDEXES
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Namespace for full-text search
+search_ns = GarageNamespace('search', description='Full-text search across clients, vehicles and works')
+
+search_result_model = search_ns.model('SearchResult', {
+    'type': fields.String(description='Resource type', enum=list(SEARCH_INDEXES)),
+    'id': fields.Integer(description='ID of the matched record'),
+    'rank': fields.Float(description='BM25 rank, lower is better'),
+    'data': fields.Raw(description='The matched record'),
+})
+
+search_page_model = search_ns.model('SearchPage', {
+    'query': fields.String(description='The search text'),
+    'page': fields.Integer(description='Page number'),
+    'per_page': fields.Integer(description='Results per page'),
+    'has_more': fields.Boolean(description='Whether a next page exists'),
+    'results': fields.List(fields.Nested(search_result_model)),
+})
+
+
+@search_ns.route('')
+class Search(Resource):
+    """
+    Handles ranked full-text searches.
+    """
+
+    @search_ns.doc('search', params={
+        'q': 'Search text; partial words match (e.g. "joa lisb")',
+        'type': 'Comma-separated resource types to search (client, vehicle, work)',
+        'page': 'Page number (default 1)',
+        'per_page': 'Results per page (default 20, max 100)',
+    })
+    @search_ns.marshal_with(search_page_model)
+    def get(self):
+        """
+        Search clients, vehicles and works.
+        :return: A ranked, paginated list of matches
+        """
+        try:
+            types = request.args.get('type')
+            return search(
+                request.args.get('q', ''),
+                types=types.split(',') if types else None,
+                page=request.args.get('page', 1, type=int),
+                per_page=request.args.get('per_page', 20, type=int),
+            )
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while searching: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error searching: {e}")
+            search_ns.abort(500, "An error occurred while searching.")
@@ -1,5 +1,6 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask_restx import Resource, fields
+from api import GarageNamespace
 from werkzeug.exceptions import HTTPException
 from services.setting_service import (
     get_all_settings,
@@ -9,6 +10,12 @@ from services.setting_service import (
     delete_setting
 )
 from utils.utils import generate_swagger_model
+from utils.validation import compile_validator
+from utils.concurrency import IF_MATCH_PARAM, etag_header, if_match_version
+from utils.idempotency import idempotent
+from utils.single_flight import coalesce
+from utils.multi_get import by_ids, lookup
+from services.multi_get_service import MAX_QUERY_IDS, MAX_LOOKUP_IDS
 from models.setting import Setting
 
 # Initialize logging
@@ -16,7 +23,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for managing setting
-settings_ns = Namespace('setting', description='CRUD operations for managing settings')
+settings_ns = GarageNamespace('setting', description='CRUD operations for managing settings')
 
 # Generate the Swagger model for the setting resource
 setting_model = generate_swagger_model(
@@ -26,6 +33,18 @@ setting_model = generate_swagger_model(
     readonly_fields=['setting_id']  # Fields that cannot be modified
 )
 
+# Request body validation, compiled once from the model (typed values for the services)
+setting_validator = compile_validator(Setting, readonly_fields=['setting_id'])
+
+# Body of POST /lookup, and response of it and of GET /?ids=
+id_lookup_model = settings_ns.model('IdLookup', {
+    'ids': fields.List(fields.Integer, required=True, description='Ids to fetch, in the order they should be returned'),
+})
+setting_lookup_model = settings_ns.model('SettingLookupResult', {
+    'data': fields.List(fields.Nested(setting_model), description='Settings found, in the order of the ids'),
+    'missing': fields.List(fields.Integer, description='Requested ids that do not exist'),
+})
+
 
 @settings_ns.route('/')
 class InvoiceItemList(Resource):
@@ -34,6 +53,8 @@ class InvoiceItemList(Resource):
     Supports retrieving all settings (GET) and creating new settings (POST).
     """
 
+    @coalesce
+    @by_ids('setting', setting_model, MAX_QUERY_IDS)
     @settings_ns.doc('get_all_settings')
     @settings_ns.marshal_list_with(setting_model)
     def get(self):
@@ -50,19 +71,18 @@ class InvoiceItemList(Resource):
             logger.error(f"Error retrieving settings: {e}")
             settings_ns.abort(500, "An error occurred while retrieving the settings.")
 
+    @idempotent
     @settings_ns.doc('create_setting')
-    @settings_ns.expect(setting_model, validate=True)
+    @settings_ns.expect(setting_model)
     @settings_ns.marshal_with(setting_model, code=201)
     def post(self):
         """
         Create a new setting.
         :return: The created setting with HTTP status code 201
         """
-        data = settings_ns.payload
+        values = setting_validator(settings_ns.payload)
         try:
-            return create_setting(
-                data["key_name"], data["updated_at"], data["value"]
-            ), 201
+            return create_setting(**values), 201
         except HTTPException as http_err:
             logger.error(f"HTTP error while creating setting: {http_err}")
             raise http_err
@@ -71,6 +91,31 @@ class InvoiceItemList(Resource):
             settings_ns.abort(500, "An error occurred while creating the setting.")
 
 
+@settings_ns.route('/lookup')
+class SettingLookup(Resource):
+    """
+    Handles fetching several settings by id, for lists too long for GET /?ids=.
+    """
+
+    @settings_ns.doc('lookup_settings')
+    @settings_ns.expect(id_lookup_model, validate=True)
+    @settings_ns.marshal_with(setting_lookup_model)
+    @settings_ns.response(400, 'Bad Request')
+    def post(self):
+        """
+        Retrieve several settings by id, in the order given.
+        :return: The settings found and the ids that do not exist
+        """
+        try:
+            return lookup('setting', settings_ns.payload['ids'], MAX_LOOKUP_IDS)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while looking up settings: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error looking up settings: {e}")
+            settings_ns.abort(500, "An error occurred while retrieving the settings.")
+
+
 @settings_ns.route('/<int:setting_id>')
 @settings_ns.param('setting_id', 'The ID of the setting.')
 class InvoiceItemResource(Resource):
@@ -91,7 +136,7 @@ class InvoiceItemResource(Resource):
             setting = get_setting(setting_id)
             if not setting:
                 settings_ns.abort(404, f"setting with ID {setting_id} not found.")
-            return setting
+            return setting, 200, etag_header(setting)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving setting with ID {setting_id}: {http_err}")
             raise http_err
@@ -99,8 +144,9 @@ class InvoiceItemResource(Resource):
             logger.error(f"Error retrieving setting with ID {setting_id}: {e}")
             settings_ns.abort(500, "An error occurred while retrieving the setting.")
 
-    @settings_ns.doc('update_setting')
-    @settings_ns.expect(setting_model, validate=True)
+    @settings_ns.doc('update_setting', params={'If-Match': IF_MATCH_PARAM})
+    @settings_ns.response(412, 'The record changed since the version named in If-Match')
+    @settings_ns.expect(setting_model)
     @settings_ns.marshal_with(setting_model)
     def put(self, setting_id):
         """
@@ -108,15 +154,12 @@ class InvoiceItemResource(Resource):
         :param setting_id: The ID of the setting
         :return: The updated setting details or 404 if not found
         """
-        data = settings_ns.payload
+        values = setting_validator(settings_ns.payload, partial=True)
         try:
-            setting = update_setting(
-                setting_id, data.get("key_name"), data.get("updated_at"),
-                data.get("value")
-            )
+            setting = update_setting(setting_id, **values, expected_versions=if_match_version())
             if not setting:
                 settings_ns.abort(404, f"setting with ID {setting_id} not found.")
-            return setting
+            return setting, 200, etag_header(setting)
         except HTTPException as http_err:
             logger.error(f"HTTP error while updating setting with ID {setting_id}: {http_err}")
             raise http_err
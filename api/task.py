@@ -1,5 +1,7 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask import Response, current_app, request, stream_with_context
+from flask_restx import Resource, fields
+from api import GarageNamespace
 from werkzeug.exceptions import HTTPException
 from services.task_service import (
     get_all_task,
@@ -9,14 +11,24 @@ from services.task_service import (
     delete_task
 )
 from utils.utils import generate_swagger_model
+from utils.validation import compile_validator
+from utils.concurrency import IF_MATCH_PARAM, etag_header, if_match_version
+from utils.idempotency import idempotent
+from utils.single_flight import coalesce
+from utils.multi_get import by_ids, lookup
+from services.multi_get_service import MAX_QUERY_IDS, MAX_LOOKUP_IDS
+from utils.include import sideload
+from services.export_service import iter_csv, resolve_columns
+from utils.filters import build_filters, wants_archived
 from models.task import Task
+from models.archive import TaskArchive
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for managing tasks
-tasks_ns = Namespace('task', description='CRUD operations for managing tasks')
+tasks_ns = GarageNamespace('task', description='CRUD operations for managing tasks')
 
 # Generate the Swagger model for the task resource
 task_model = generate_swagger_model(
@@ -26,6 +38,28 @@ task_model = generate_swagger_model(
     readonly_fields=['task_id']  # Fields that cannot be modified
 )
 
+# Request body validation, compiled once from the model (typed values for the services)
+task_validator = compile_validator(Task, readonly_fields=['task_id', 'created_at'])
+
+# Body of POST /lookup, and response of it and of GET /?ids=
+id_lookup_model = tasks_ns.model('IdLookup', {
+    'ids': fields.List(fields.Integer, required=True, description='Ids to fetch, in the order they should be returned'),
+})
+task_lookup_model = tasks_ns.model('TaskLookupResult', {
+    'data': fields.List(fields.Nested(task_model), description='Tasks found, in the order of the ids'),
+    'missing': fields.List(fields.Integer, description='Requested ids that do not exist'),
+})
+
+
+def conflict_check_requested():
+    """
+    Whether to reject double bookings: '?check_conflicts=1' or the TASK_CONFLICT_CHECK setting.
+    """
+    requested = request.args.get('check_conflicts')
+    if requested is None:
+        return current_app.config.get('TASK_CONFLICT_CHECK', False)
+    return requested.lower() in ('1', 'true', 'yes')
+
 
 @tasks_ns.route('/')
 class TaskList(Resource):
@@ -34,7 +68,15 @@ class TaskList(Resource):
     Supports retrieving all tasks (GET) and creating new tasks (POST).
     """
 
-    @tasks_ns.doc('get_all_task')
+    @coalesce
+    @sideload(Task)
+    @by_ids('task', task_model, MAX_QUERY_IDS)
+    @tasks_ns.doc('get_all_task', params={
+        '<column>': 'Filter by equality on any column (e.g. status=completed)',
+        '<column>_from / <column>_to': 'Inclusive range on any column (e.g. start_date_from=2025-01-01)',
+        'include_archived': 'Also return archived records (1)',
+    })
+    @tasks_ns.response(400, 'Invalid filter')
     @tasks_ns.marshal_list_with(task_model)
     def get(self):
         """
@@ -42,28 +84,30 @@ class TaskList(Resource):
         :return: List of all tasks
         """
         try:
-            return get_all_task()
+            archived_filters = build_filters(TaskArchive, request.args) if wants_archived(request.args) else None
+            return get_all_task(build_filters(Task, request.args), archived_filters)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving tasks: {http_err}")
             raise http_err
+        except ValueError as e:
+            tasks_ns.abort(400, str(e))
         except Exception as e:
             logger.error(f"Error retrieving tasks: {e}")
             tasks_ns.abort(500, "An error occurred while retrieving the tasks.")
 
-    @tasks_ns.doc('create_task')
-    @tasks_ns.expect(task_model, validate=True)
+    @idempotent
+    @tasks_ns.doc('create_task', params={'check_conflicts': 'Reject the task if the employee is already booked (1/0)'})
+    @tasks_ns.response(409, 'Employee already booked in that period')
+    @tasks_ns.expect(task_model)
     @tasks_ns.marshal_with(task_model, code=201)
     def post(self):
         """
         Create a new task.
         :return: The created task with HTTP status code 201
         """
-        data = tasks_ns.payload
+        values = task_validator(tasks_ns.payload)
         try:
-            return create_task(
-                data["description"], data["status"], data["start_date"],
-                data["end_date"], data["work_id"], data["employee_id"]
-            ), 201
+            return create_task(**values, check_conflicts=conflict_check_requested()), 201
         except HTTPException as http_err:
             logger.error(f"HTTP error while creating task: {http_err}")
             raise http_err
@@ -72,6 +116,32 @@ class TaskList(Resource):
             tasks_ns.abort(500, "An error occurred while creating the task.")
 
 
+@tasks_ns.route('/lookup')
+class TaskLookup(Resource):
+    """
+    Handles fetching several tasks by id, for lists too long for GET /?ids=.
+    """
+
+    @sideload(Task)
+    @tasks_ns.doc('lookup_tasks')
+    @tasks_ns.expect(id_lookup_model, validate=True)
+    @tasks_ns.marshal_with(task_lookup_model)
+    @tasks_ns.response(400, 'Bad Request')
+    def post(self):
+        """
+        Retrieve several tasks by id, in the order given.
+        :return: The tasks found and the ids that do not exist
+        """
+        try:
+            return lookup('task', tasks_ns.payload['ids'], MAX_LOOKUP_IDS)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while looking up tasks: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error looking up tasks: {e}")
+            tasks_ns.abort(500, "An error occurred while retrieving the tasks.")
+
+
 @tasks_ns.route('/<int:task_id>')
 @tasks_ns.param('task_id', 'The ID of the task')
 class TaskResource(Resource):
@@ -80,7 +150,8 @@ class TaskResource(Resource):
     Supports retrieving (GET), updating (PUT), and deleting (DELETE) a task.
     """
 
-    @tasks_ns.doc('get_task')
+    @sideload(Task)
+    @tasks_ns.doc('get_task', params={'include_archived': 'Also look among archived records (1)'})
     @tasks_ns.marshal_with(task_model)
     def get(self, task_id):
         """
@@ -89,10 +160,10 @@ class TaskResource(Resource):
         :return: The task details or 404 if not found
         """
         try:
-            task = get_task(task_id)
+            task = get_task(task_id, wants_archived(request.args))
             if not task:
                 tasks_ns.abort(404, f"Task with ID {task_id} not found.")
-            return task
+            return task, 200, etag_header(task)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving task with ID {task_id}: {http_err}")
             raise http_err
@@ -100,8 +171,10 @@ class TaskResource(Resource):
             logger.error(f"Error retrieving task with ID {task_id}: {e}")
             tasks_ns.abort(500, "An error occurred while retrieving the task.")
 
-    @tasks_ns.doc('update_task')
-    @tasks_ns.expect(task_model, validate=True)
+    @tasks_ns.doc('update_task', params={'If-Match': IF_MATCH_PARAM, 'check_conflicts': 'Reject the update if the employee is already booked (1/0)'})
+    @tasks_ns.response(412, 'The record changed since the version named in If-Match')
+    @tasks_ns.response(409, 'Employee already booked in that period')
+    @tasks_ns.expect(task_model)
     @tasks_ns.marshal_with(task_model)
     def put(self, task_id):
         """
@@ -109,16 +182,16 @@ class TaskResource(Resource):
         :param task_id: The ID of the task
         :return: The updated task details or 404 if not found
         """
-        data = tasks_ns.payload
+        values = task_validator(tasks_ns.payload, partial=True)
         try:
             task = update_task(
-                task_id, data.get("description"), data.get("status"),
-                data.get("start_date"), data.get("end_date"),
-                data.get("work_id"), data.get("employee_id")
+                task_id, **values,
+                check_conflicts=conflict_check_requested(),
+                expected_versions=if_match_version()
             )
             if not task:
                 tasks_ns.abort(404, f"Task with ID {task_id} not found.")
-            return task
+            return task, 200, etag_header(task)
         except HTTPException as http_err:
             logger.error(f"HTTP error while updating task with ID {task_id}: {http_err}")
             raise http_err
@@ -145,3 +218,39 @@ class TaskResource(Resource):
         except Exception as e:
             logger.error(f"Error deleting task with ID {task_id}: {e}")
             tasks_ns.abort(500, "An error occurred while deleting the task.")
+
+
+@tasks_ns.route('/export.csv')
+class TaskExport(Resource):
+    """
+    Handles the CSV export of tasks.
+    """
+
+    @tasks_ns.doc('export_task_csv', params={
+        'columns': 'Comma-separated columns to export (default: all)',
+        '<column>': 'Same filters as the list endpoint',
+    })
+    @tasks_ns.produces(['text/csv'])
+    @tasks_ns.response(400, 'Invalid column or filter')
+    def get(self):
+        """
+        Export tasks as CSV, streamed in constant memory.
+        :return: A streamed CSV file
+        """
+        try:
+            columns = request.args.get('columns')
+            selected = resolve_columns(Task, columns.split(',') if columns else None)
+            filters = build_filters(Task, request.args)
+            return Response(
+                stream_with_context(iter_csv(Task, selected, filters)),
+                mimetype='text/csv',
+                headers={'Content-Disposition': 'attachment; filename=task.csv'},
+            )
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while exporting tasks: {http_err}")
+            raise http_err
+        except ValueError as e:
+            tasks_ns.abort(400, str(e))
+        except Exception as e:
+            logger.error(f"Error exporting tasks: {e}")
+            tasks_ns.abort(500, "An error occurred while exporting the tasks.")
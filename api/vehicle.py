@@ -1,14 +1,26 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask import current_app, request
+from flask_restx import Resource, fields
+from api import GarageNamespace
 from werkzeug.exceptions import HTTPException
 from services.vehicle_service import (
     get_all_vehicle,
     get_vehicle,
     create_vehicle,
     update_vehicle,
-    delete_vehicle
+    delete_vehicle,
+    get_vehicle_by_plate,
+    autocomplete_plates
 )
-from utils.utils import generate_swagger_model
+from services.import_service import import_records, FORMATS
+from utils.utils import generate_swagger_model, import_report_model
+from utils.validation import compile_validator
+from utils.concurrency import IF_MATCH_PARAM, etag_header, if_match_version
+from utils.idempotency import idempotent
+from utils.single_flight import coalesce
+from utils.multi_get import by_ids, lookup
+from services.multi_get_service import MAX_QUERY_IDS, MAX_LOOKUP_IDS
+from utils.include import sideload
 from models.vehicle import Vehicle
 
 # Initialize logging
@@ -16,16 +28,28 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for managing vehicles
-vehicles_ns = Namespace('vehicle', description='CRUD operations for managing vehicles')
+vehicles_ns = GarageNamespace('vehicle', description='CRUD operations for managing vehicles')
 
 # Generate the Swagger model for the vehicle resource
 vehicle_model = generate_swagger_model(
     api=vehicles_ns,       # Namespace to associate with the model
     model=Vehicle,         # SQLAlchemy model representing the vehicle resource
-    exclude_fields=[],     # No excluded fields in this model
+    exclude_fields=['plate_key'],  # Internal lookup key, derived from license_plate
     readonly_fields=['vehicle_id']  # Fields that cannot be modified
 )
 
+# Request body validation, compiled once from the model (typed values for the services)
+vehicle_validator = compile_validator(Vehicle, readonly_fields=['vehicle_id', 'plate_key', 'created_at'])
+
+# Body of POST /lookup, and response of it and of GET /?ids=
+id_lookup_model = vehicles_ns.model('IdLookup', {
+    'ids': fields.List(fields.Integer, required=True, description='Ids to fetch, in the order they should be returned'),
+})
+vehicle_lookup_model = vehicles_ns.model('VehicleLookupResult', {
+    'data': fields.List(fields.Nested(vehicle_model), description='Vehicles found, in the order of the ids'),
+    'missing': fields.List(fields.Integer, description='Requested ids that do not exist'),
+})
+vehicles_ns.add_model(import_report_model.name, import_report_model)
 
 @vehicles_ns.route('/')
 class VehicleList(Resource):
@@ -34,6 +58,9 @@ class VehicleList(Resource):
     Supports retrieving all vehicles (GET) and creating new vehicles (POST).
     """
 
+    @coalesce
+    @sideload(Vehicle)
+    @by_ids('vehicle', vehicle_model, MAX_QUERY_IDS)
     @vehicles_ns.doc('get_all_vehicle')
     @vehicles_ns.marshal_list_with(vehicle_model)
     def get(self):
@@ -53,21 +80,20 @@ class VehicleList(Resource):
             logger.error(f"Error retrieving vehicles: {e}")
             vehicles_ns.abort(500, "An error occurred while retrieving the vehicles.")
 
+    @idempotent
     @vehicles_ns.doc('create_vehicle')
-    @vehicles_ns.expect(vehicle_model, validate=True)
+    @vehicles_ns.response(409, 'Another vehicle has the same license plate')
+    @vehicles_ns.expect(vehicle_model)
     @vehicles_ns.marshal_with(vehicle_model, code=201)
     def post(self):
         """
         Create a new vehicle.
         :return: The created vehicle with HTTP status code 201
         """
-        data = vehicles_ns.payload  # Extract JSON payload
+        values = vehicle_validator(vehicles_ns.payload)  # Typed values of the JSON payload
         try:
             # Call the service to create a new vehicle
-            return create_vehicle(
-                data["brand"], data["model"], data["license_plate"],
-                data["year"], data["client_id"], data["created_at"]
-            ), 201
+            return create_vehicle(**values), 201
         except HTTPException as http_err:
             logger.error(f"HTTP error while creating vehicle: {http_err}")
             raise http_err
@@ -77,6 +103,32 @@ class VehicleList(Resource):
             vehicles_ns.abort(500, "An error occurred while creating the vehicle.")
 
 
+@vehicles_ns.route('/lookup')
+class VehicleLookup(Resource):
+    """
+    Handles fetching several vehicles by id, for lists too long for GET /?ids=.
+    """
+
+    @sideload(Vehicle)
+    @vehicles_ns.doc('lookup_vehicles')
+    @vehicles_ns.expect(id_lookup_model, validate=True)
+    @vehicles_ns.marshal_with(vehicle_lookup_model)
+    @vehicles_ns.response(400, 'Bad Request')
+    def post(self):
+        """
+        Retrieve several vehicles by id, in the order given.
+        :return: The vehicles found and the ids that do not exist
+        """
+        try:
+            return lookup('vehicle', vehicles_ns.payload['ids'], MAX_LOOKUP_IDS)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while looking up vehicles: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error looking up vehicles: {e}")
+            vehicles_ns.abort(500, "An error occurred while retrieving the vehicles.")
+
+
 @vehicles_ns.route('/<int:vehicle_id>')
 @vehicles_ns.param('vehicle_id', 'The ID of the vehicle')
 class Vehicle(Resource):
@@ -85,6 +137,7 @@ class Vehicle(Resource):
     Supports retrieving (GET), updating (PUT), and deleting (DELETE) a vehicle.
     """
 
+    @sideload(Vehicle)
     @vehicles_ns.doc('get_vehicle')
     @vehicles_ns.marshal_with(vehicle_model)
     def get(self, vehicle_id):
@@ -99,7 +152,7 @@ class Vehicle(Resource):
             if not vehicle:
                 # Return a 404 error if vehicle does not exist
                 vehicles_ns.abort(404, f"Vehicle with ID {vehicle_id} not found.")
-            return vehicle
+            return vehicle, 200, etag_header(vehicle)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving vehicle with ID {vehicle_id}: {http_err}")
             raise http_err
@@ -108,8 +161,10 @@ class Vehicle(Resource):
             logger.error(f"Error retrieving vehicle with ID {vehicle_id}: {e}")
             vehicles_ns.abort(500, "An error occurred while retrieving the vehicle.")
 
-    @vehicles_ns.doc('update_vehicle')
-    @vehicles_ns.expect(vehicle_model, validate=True)
+    @vehicles_ns.doc('update_vehicle', params={'If-Match': IF_MATCH_PARAM})
+    @vehicles_ns.response(409, 'Another vehicle has the same license plate')
+    @vehicles_ns.response(412, 'The record changed since the version named in If-Match')
+    @vehicles_ns.expect(vehicle_model)
     @vehicles_ns.marshal_with(vehicle_model)
     def put(self, vehicle_id):
         """
@@ -117,16 +172,14 @@ class Vehicle(Resource):
         :param vehicle_id: The ID of the vehicle
         :return: The updated vehicle details or 404 if not found
         """
-        data = vehicles_ns.payload  # Extract JSON payload
+        values = vehicle_validator(vehicles_ns.payload, partial=True)  # Typed values of the fields given
         try:
             # Call the service to update the vehicle
-            vehicle = update_vehicle(
-                vehicle_id, data.get("brand"), data.get("model"), data.get("license_plate"),  data.get("year"), data.get("client_id")
-            )
+            vehicle = update_vehicle(vehicle_id, **values, expected_versions=if_match_version())
             if not vehicle:
                 # Return a 404 error if vehicle does not exist
                 vehicles_ns.abort(404, f"Vehicle with ID {vehicle_id} not found.")
-            return vehicle
+            return vehicle, 200, etag_header(vehicle)
         except HTTPException as http_err:
             logger.error(f"HTTP error while updating vehicle with ID {vehicle_id}: {http_err}")
             raise http_err
@@ -157,3 +210,90 @@ class Vehicle(Resource):
             # Log error and return a 500 status code
             logger.error(f"Error deleting vehicle with ID {vehicle_id}: {e}")
             vehicles_ns.abort(500, "An error occurred while deleting the vehicle.")
+
+
+@vehicles_ns.route('/by-plate/<string:license_plate>')
+@vehicles_ns.param('license_plate', 'The license plate, in any format (e.g. AA-12-BB, aa12bb)')
+class VehicleByPlate(Resource):
+    """
+    Handles exact license plate lookups.
+    """
+
+    @vehicles_ns.doc('get_vehicle_by_plate')
+    @vehicles_ns.marshal_with(vehicle_model)
+    def get(self, license_plate):
+        """
+        Retrieve a vehicle by license plate.
+        :param license_plate: The license plate of the vehicle
+        :return: The vehicle details or 404 if not found
+        """
+        try:
+            vehicle = get_vehicle_by_plate(license_plate)
+            if not vehicle:
+                vehicles_ns.abort(404, f"Vehicle with license plate {license_plate} not found.")
+            return vehicle
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while retrieving vehicle with license plate {license_plate}: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error retrieving vehicle with license plate {license_plate}: {e}")
+            vehicles_ns.abort(500, "An error occurred while retrieving the vehicle.")
+
+
+@vehicles_ns.route('/autocomplete')
+class VehiclePlateAutocomplete(Resource):
+    """
+    Handles license plate autocompletion.
+    """
+
+    @vehicles_ns.doc('autocomplete_plates', params={
+        'prefix': 'Beginning of the license plate, in any format',
+        'limit': 'Maximum number of vehicles (default 10, max 50)',
+    })
+    @vehicles_ns.marshal_list_with(vehicle_model)
+    def get(self):
+        """
+        Retrieve the vehicles whose license plate starts with a prefix.
+        :return: List of matching vehicles, ordered by plate
+        """
+        try:
+            limit = min(request.args.get('limit', 10, type=int), 50)
+            return autocomplete_plates(request.args.get('prefix', ''), limit)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while autocompleting plates: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error autocompleting plates: {e}")
+            vehicles_ns.abort(500, "An error occurred while autocompleting the license plates.")
+
+
+@vehicles_ns.route('/import')
+class VehicleImport(Resource):
+    """
+    Handles bulk imports of vehicles.
+    """
+
+    @vehicles_ns.doc('import_vehicles', params={
+        'format': 'csv (with a header line) or ndjson; defaults to the Content-Type',
+        'batch_size': 'Rows inserted per transaction (default IMPORT_BATCH_SIZE, max 5000)',
+    })
+    @vehicles_ns.response(400, 'Invalid format or batch size')
+    @vehicles_ns.marshal_with(import_report_model)
+    def post(self):
+        """
+        Import vehicles from a CSV or NDJSON request body, streamed and committed in batches.
+        Rows failing validation are skipped and listed in the report.
+        :return: The import report
+        """
+        try:
+            fmt = request.args.get('format') or ('ndjson' if 'json' in request.mimetype else 'csv')
+            batch_size = request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE'], type=int)
+            if fmt not in FORMATS or not 0 < batch_size <= 5000:
+                vehicles_ns.abort(400, f"Format must be one of {', '.join(FORMATS)} and batch_size between 1 and 5000.")
+            return import_records('vehicle', request.stream, fmt, batch_size)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while importing vehicles: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error importing vehicles: {e}")
+            vehicles_ns.abort(500, "An error occurred while importing the vehicles.")
@@ -1,5 +1,7 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask import Response, request, stream_with_context
+from flask_restx import Resource, fields
+from api import GarageNamespace
 from werkzeug.exceptions import HTTPException
 from services.work_service import (
     get_all_work,
@@ -9,14 +11,24 @@ from services.work_service import (
     delete_work
 )
 from utils.utils import generate_swagger_model
+from utils.validation import compile_validator
+from utils.concurrency import IF_MATCH_PARAM, etag_header, if_match_version
+from utils.idempotency import idempotent
+from utils.single_flight import coalesce
+from utils.multi_get import by_ids, lookup
+from services.multi_get_service import MAX_QUERY_IDS, MAX_LOOKUP_IDS
+from utils.include import sideload
+from services.export_service import iter_csv, resolve_columns
+from utils.filters import build_filters, wants_archived
 from models.work import Work
+from models.archive import WorkArchive
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for managing work
-works_ns = Namespace('work', description='CRUD operations for managing work')
+works_ns = GarageNamespace('work', description='CRUD operations for managing work')
 
 # Generate the Swagger model for the work resource
 work_model = generate_swagger_model(
@@ -26,6 +38,18 @@ work_model = generate_swagger_model(
     readonly_fields=['work_id']  # Fields that cannot be modified
 )
 
+# Request body validation, compiled once from the model (typed values for the services)
+work_validator = compile_validator(Work, readonly_fields=['work_id', 'created_at'])
+
+# Body of POST /lookup, and response of it and of GET /?ids=
+id_lookup_model = works_ns.model('IdLookup', {
+    'ids': fields.List(fields.Integer, required=True, description='Ids to fetch, in the order they should be returned'),
+})
+work_lookup_model = works_ns.model('WorkLookupResult', {
+    'data': fields.List(fields.Nested(work_model), description='Works found, in the order of the ids'),
+    'missing': fields.List(fields.Integer, description='Requested ids that do not exist'),
+})
+
 
 @works_ns.route('/')
 class WorkList(Resource):
@@ -34,7 +58,15 @@ class WorkList(Resource):
     Supports retrieving all work (GET) and creating new work (POST).
     """
 
-    @works_ns.doc('get_all_work')
+    @coalesce
+    @sideload(Work)
+    @by_ids('work', work_model, MAX_QUERY_IDS)
+    @works_ns.doc('get_all_work', params={
+        '<column>': 'Filter by equality on any column (e.g. status=completed)',
+        '<column>_from / <column>_to': 'Inclusive range on any column (e.g. start_date_from=2025-01-01)',
+        'include_archived': 'Also return archived records (1)',
+    })
+    @works_ns.response(400, 'Invalid filter')
     @works_ns.marshal_list_with(work_model)
     def get(self):
         """
@@ -42,27 +74,29 @@ class WorkList(Resource):
         :return: List of all work
         """
         try:
-            return get_all_work()
+            archived_filters = build_filters(WorkArchive, request.args) if wants_archived(request.args) else None
+            return get_all_work(build_filters(Work, request.args), archived_filters)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving work: {http_err}")
             raise http_err
+        except ValueError as e:
+            works_ns.abort(400, str(e))
         except Exception as e:
             logger.error(f"Error retrieving work: {e}")
             works_ns.abort(500, "An error occurred while retrieving the work.")
 
+    @idempotent
     @works_ns.doc('create_work')
-    @works_ns.expect(work_model, validate=True)
+    @works_ns.expect(work_model)
     @works_ns.marshal_with(work_model, code=201)
     def post(self):
         """
         Create a new work.
         :return: The created work with HTTP status code 201
         """
-        data = works_ns.payload
+        values = work_validator(works_ns.payload)
         try:
-            return create_work(
-                data["cost"], data["description"], data["end_date"], data["start_date"], data["status"], data["vehicle_id"]
-            ), 201
+            return create_work(**values), 201
         except HTTPException as http_err:
             logger.error(f"HTTP error while creating work: {http_err}")
             raise http_err
@@ -71,6 +105,32 @@ class WorkList(Resource):
             works_ns.abort(500, "An error occurred while creating the work.")
 
 
+@works_ns.route('/lookup')
+class WorkLookup(Resource):
+    """
+    Handles fetching several works by id, for lists too long for GET /?ids=.
+    """
+
+    @sideload(Work)
+    @works_ns.doc('lookup_works')
+    @works_ns.expect(id_lookup_model, validate=True)
+    @works_ns.marshal_with(work_lookup_model)
+    @works_ns.response(400, 'Bad Request')
+    def post(self):
+        """
+        Retrieve several works by id, in the order given.
+        :return: The works found and the ids that do not exist
+        """
+        try:
+            return lookup('work', works_ns.payload['ids'], MAX_LOOKUP_IDS)
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while looking up works: {http_err}")
+            raise http_err
+        except Exception as e:
+            logger.error(f"Error looking up works: {e}")
+            works_ns.abort(500, "An error occurred while retrieving the works.")
+
+
 @works_ns.route('/<int:work_id>')
 @works_ns.param('work_id', 'The ID of the work')
 class WorkResource(Resource):
@@ -79,7 +139,8 @@ class WorkResource(Resource):
     Supports retrieving (GET), updating (PUT), and deleting (DELETE) a work.
     """
 
-    @works_ns.doc('get_work')
+    @sideload(Work)
+    @works_ns.doc('get_work', params={'include_archived': 'Also look among archived records (1)'})
     @works_ns.marshal_with(work_model)
     def get(self, work_id):
         """
@@ -88,10 +149,10 @@ class WorkResource(Resource):
         :return: The work details or 404 if not found
         """
         try:
-            work = get_work(work_id)
+            work = get_work(work_id, wants_archived(request.args))
             if not work:
                 works_ns.abort(404, f"Work with ID {work_id} not found.")
-            return work
+            return work, 200, etag_header(work)
         except HTTPException as http_err:
             logger.error(f"HTTP error while retrieving work with ID {work_id}: {http_err}")
             raise http_err
@@ -99,8 +160,9 @@ class WorkResource(Resource):
             logger.error(f"Error retrieving work with ID {work_id}: {e}")
             works_ns.abort(500, "An error occurred while retrieving the work.")
 
-    @works_ns.doc('update_work')
-    @works_ns.expect(work_model, validate=True)
+    @works_ns.doc('update_work', params={'If-Match': IF_MATCH_PARAM})
+    @works_ns.response(412, 'The record changed since the version named in If-Match')
+    @works_ns.expect(work_model)
     @works_ns.marshal_with(work_model)
     def put(self, work_id):
         """
@@ -108,15 +170,12 @@ class WorkResource(Resource):
         :param work_id: The ID of the work
         :return: The updated work details or 404 if not found
         """
-        data = works_ns.payload
+        values = work_validator(works_ns.payload, partial=True)
         try:
-            work = update_work(
-                work_id, data.get("cost"), data.get("description"),
-                data.get("end_date"), data.get("start_date"), data.get("status"), data.get("vehicle_id")
-            )
+            work = update_work(work_id, **values, expected_versions=if_match_version())
             if not work:
                 works_ns.abort(404, f"Work with ID {work_id} not found.")
-            return work
+            return work, 200, etag_header(work)
         except HTTPException as http_err:
             logger.error(f"HTTP error while updating work with ID {work_id}: {http_err}")
             raise http_err
@@ -143,3 +202,39 @@ class WorkResource(Resource):
         except Exception as e:
             logger.error(f"Error deleting work with ID {work_id}: {e}")
             works_ns.abort(500, "An error occurred while deleting the work.")
+
+
+@works_ns.route('/export.csv')
+class WorkExport(Resource):
+    """
+    Handles the CSV export of work.
+    """
+
+    @works_ns.doc('export_work_csv', params={
+        'columns': 'Comma-separated columns to export (default: all)',
+        '<column>': 'Same filters as the list endpoint',
+    })
+    @works_ns.produces(['text/csv'])
+    @works_ns.response(400, 'Invalid column or filter')
+    def get(self):
+        """
+        Export work as CSV, streamed in constant memory.
+        :return: A streamed CSV file
+        """
+        try:
+            columns = request.args.get('columns')
+            selected = resolve_columns(Work, columns.split(',') if columns else None)
+            filters = build_filters(Work, request.args)
+            return Response(
+                stream_with_context(iter_csv(Work, selected, filters)),
+                mimetype='text/csv',
+                headers={'Content-Disposition': 'attachment; filename=work.csv'},
+            )
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while exporting work: {http_err}")
+            raise http_err
+        except ValueError as e:
+            works_ns.abort(400, str(e))
+        except Exception as e:
+            logger.error(f"Error exporting work: {e}")
+            works_ns.abort(500, "An error occurred while exporting the work.")
@@ -0,0 +1,105 @@
+import logging
+from flask_restx import Resource, fields
+from sqlalchemy import Column, Float, Integer, String
+from api import GarageNamespace
+from werkzeug.exceptions import HTTPException
+from services.work_order_service import create_work_order, MAX_ORDER_TASKS
+from utils.idempotency import idempotent
+from api.work import work_model
+from api.task import task_model, conflict_check_requested
+from api.invoice import invoice_model
+from api.invoice_item import invoice_item_model
+from utils.validation import compile_validator
+from models.work import Work
+from models.task import Task
+from models.invoice_item import Invoice_item
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Namespace for composite work orders
+work_orders_ns = GarageNamespace('work-order', description='Create a work with its tasks and invoice items in one transaction')
+
+work_order_task_model = work_orders_ns.model('WorkOrderTask', {
+    'description': fields.String(required=True, description='Task description'),
+    'status': fields.String(description='Task status (default pending)'),
+    'start_date': fields.Date(required=True, description='First day of the task'),
+    'end_date': fields.Date(description='Last day of the task'),
+    'employee_id': fields.Integer(required=True, description='Assigned employee'),
+})
+
+work_order_item_model = work_orders_ns.model('WorkOrderInvoiceItem', {
+    'task': fields.Integer(required=True, description='Index of the billed task in tasks (0 for the first)'),
+    'cost': fields.Float(required=True, description='Item cost, without IVA'),
+    'description': fields.String(description='Item description (defaults to the task description)'),
+})
+
+work_order_model = work_orders_ns.model('WorkOrder', {
+    'description': fields.String(required=True, description='Work description'),
+    'cost': fields.Float(description='Work cost'),
+    'start_date': fields.Date(required=True, description='First day of the work'),
+    'end_date': fields.Date(description='Last day of the work'),
+    'status': fields.String(description='Work status (default pending)'),
+    'vehicle_id': fields.Integer(required=True, description='Vehicle being worked on'),
+    'tasks': fields.List(fields.Nested(work_order_task_model), required=True, min_items=1,
+                         max_items=MAX_ORDER_TASKS, description='Tasks of the work'),
+    'invoice_items': fields.List(fields.Nested(work_order_item_model), max_items=MAX_ORDER_TASKS,
+                                 description="Initial invoice items, billed on a new invoice for the vehicle's client"),
+})
+
+# Request body validation, compiled once from the models like the other POST bodies: the same
+# types and date parsing, with the errors keyed by path (e.g. tasks[0].start_date)
+work_order_task_validator = compile_validator(Task, readonly_fields=['task_id', 'created_at', 'work_id'])
+work_order_item_validator = compile_validator(
+    Invoice_item,
+    readonly_fields=['item_id', 'invoice_id', 'task_id'],
+    columns=[
+        Column('task', Integer, nullable=False),
+        Column('cost', Float, nullable=False),
+        Column('description', String(80)),
+    ],
+)
+work_order_validator = compile_validator(Work, readonly_fields=['work_id', 'created_at'], lists={
+    'tasks': (work_order_task_validator, True, MAX_ORDER_TASKS),
+    'invoice_items': (work_order_item_validator, False, MAX_ORDER_TASKS),
+})
+
+work_order_result_model = work_orders_ns.model('WorkOrderResult', {
+    'work': fields.Nested(work_model),
+    'tasks': fields.List(fields.Nested(task_model)),
+    'invoice': fields.Nested(invoice_model, allow_null=True, description='Invoice of the initial items, if any'),
+    'invoice_items': fields.List(fields.Nested(invoice_item_model)),
+})
+
+
+@work_orders_ns.route('')
+class WorkOrder(Resource):
+    """
+    Handles the creation of work orders.
+    """
+
+    @idempotent
+    @work_orders_ns.doc('create_work_order', params={
+        'check_conflicts': 'Reject the order if a task double-books an employee (1)',
+    })
+    @work_orders_ns.expect(work_order_model)
+    @work_orders_ns.marshal_with(work_order_result_model, code=201)
+    @work_orders_ns.response(400, 'Invalid work order')
+    @work_orders_ns.response(409, 'Employee already booked')
+    def post(self):
+        """
+        Create a work, its tasks and optionally an invoice with initial items, all or nothing.
+        :return: The created work, tasks, invoice and invoice items with HTTP 201 status code
+        """
+        try:
+            order = work_order_validator(work_orders_ns.payload)
+            return create_work_order(order, conflict_check_requested()), 201
+        except HTTPException as http_err:
+            logger.error(f"HTTP error while creating work order: {http_err}")
+            raise http_err
+        except ValueError as e:
+            work_orders_ns.abort(400, str(e))
+        except Exception as e:
+            logger.error(f"Error creating work order: {e}")
+            work_orders_ns.abort(500, "An error occurred while creating the work order.")
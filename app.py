@@ -1,11 +1,22 @@
 from flask import Flask
 from sqlalchemy import false
 
-from api import api_bp  # Import the API blueprint
+from api import api, init_api  # Import the API, loaded on first use
 from config import Config  # Import the configuration class
 from utils.database import db  # Import the SQLAlchemy database instance
 from utils.utils import configure_logging  # Import the logging configuration function
 from errors.errors import register_error_handlers
+from utils.cli import register_commands  # Import the CLI commands registration function
+from utils.openapi import load_openapi_spec
+from utils.migrations import run_migrations  # Import the schema migrations runner
+from services.job_service import job_runner  # Import the background job runner
+from utils.rate_limit import rate_limiter  # Import the per-client rate limiter
+from utils.auth import token_auth  # Import the token authentication of the API
+from services.auth_service import load_revocations  # Import the loading of the token revocation list
+from services.sync_service import change_follower  # Import the follower of changes made by other processes
+from utils.change_stream import change_stream  # Import the fan-out of changes to event streams
+from api.health import health_bp  # Import the liveness and readiness probes
+from services.warmup_service import warm_up  # Import the warm-up of connections and caches
 
 
 def create_app():
@@ -20,8 +31,21 @@ def create_app():
         app.config.from_object(Config)  # Load configuration from the Config class
         register_error_handlers(app)  # Register error handlers for 404 and 500 errors
         db.init_app(app) # Initialize extensions (e.g., SQLAlchemy)
-        # Register blueprints (e.g., API routes)
-        app.register_blueprint(api_bp)
+        with app.app_context():
+            run_migrations()  # Bring the database schema up to date
+            # Follow the changes of the other processes (token revocations, caches) from here on
+            change_follower.start(app, app.config["SERVER_SYNC_SECONDS"])
+            load_revocations()  # Tokens revoked before a restart stay revoked
+        job_runner.init_app(app)  # Resume the jobs left queued by a stopped server
+        token_auth.init_app(app)  # Require a valid token on the API routes (without a database query)
+        rate_limiter.init_app(app)  # Throttle clients, by employee or IP, before they reach the database
+        change_stream.init_app(app)  # Buffer the work and task changes pushed to /api/events
+        # Register blueprints (e.g., API routes, imported by the warm-up or the first request)
+        init_api(app)
+        app.register_blueprint(health_bp)  # /health and /ready
+        load_openapi_spec(app, api)  # Use the prebuilt OpenAPI spec, if present
+        register_commands(app)
+        warm_up.start(app)  # Connections and caches, in the background: /ready answers 503 until done
         return app
 
     except Exception as e:
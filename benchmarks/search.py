@@ -0,0 +1,105 @@
+"""
+Full-text search benchmark on a synthetic database.
+
+Usage:
+    python benchmarks/search.py [--rows 1000000] [--runs 20]
+
+Builds a throwaway SQLite database with the given number of clients, vehicles and works,
+then reports the median latency of typical front-desk queries.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STREETS = ["Rua", "Avenida", "Travessa", "Largo", "Praça"]
+PLACES = ["Lisboa", "Porto", "Faro", "Coimbra", "Braga", "Aveiro", "Évora", "Setúbal"]
+NAMES = ["João", "Maria", "Carlos", "Ana", "Ricardo", "Sofia", "Tiago", "Pedro", "Inês", "Rui"]
+SURNAMES = ["Silva", "Santos", "Ferreira", "Pereira", "Oliveira", "Costa", "Rodrigues", "Martins"]
+BRANDS = ["Renault", "Peugeot", "Seat", "Volkswagen", "Toyota", "Fiat", "Opel", "BMW"]
+JOBS = ["Troca de óleo", "Revisão geral", "Substituição de travões", "Alinhamento", "Troca de pneus"]
+QUERIES = ["joa", "silva lisboa", "AA-12", "renault", "travões", "rua porto", "zzzz"]
+
+
+def populate(db, rows):
+    from sqlalchemy import text
+
+    random.seed(42)
+    clients = (
+        {"client_id": i, "name": f"{random.choice(NAMES)} {random.choice(SURNAMES)} {i}",
+         "email": f"cliente{i}@example.com", "phone": "910000000",
+         "address": f"{random.choice(STREETS)} {i}, {random.choice(PLACES)}"}
+        for i in range(1, rows + 1)
+    )
+    vehicles = (
+        {"vehicle_id": i, "client_id": i, "brand": random.choice(BRANDS), "model": "Modelo",
+         "license_plate": f"{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}-{i % 100:02d}-{i:06d}", "year": 2015}
+        for i in range(1, rows + 1)
+    )
+    works = (
+        {"work_id": i, "vehicle_id": i, "description": random.choice(JOBS), "start_date": "2024-01-01"}
+        for i in range(1, rows + 1)
+    )
+    for table, generator in (("client", clients), ("vehicle", vehicles), ("work", works)):
+        columns = None
+        batch = []
+        for row in generator:
+            columns = columns or list(row)
+            batch.append(row)
+            if len(batch) == 50000:
+                db.session.execute(text(f"INSERT INTO {table} ({', '.join(columns)}) "
+                                        f"VALUES ({', '.join(':' + c for c in columns)})"), batch)
+                batch = []
+        if batch:
+            db.session.execute(text(f"INSERT INTO {table} ({', '.join(columns)}) "
+                                    f"VALUES ({', '.join(':' + c for c in columns)})"), batch)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URI"] = f"sqlite:///{os.path.join(directory, 'search.db')}"
+
+    from flask import Flask
+    from config import Config
+    from utils.database import db
+    import models.client, models.vehicle, models.work  # noqa: F401 (register the tables)
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["DATABASE_URI"]
+    db.init_app(app)
+
+    with app.app_context():
+        from services.search_service import rebuild_search_indexes, search
+        from utils.migrations import run_migrations
+
+        db.create_all()
+        started = time.perf_counter()
+        populate(db, args.rows)
+        run_migrations()
+        rebuild_search_indexes()
+        print(f"Built {args.rows} rows per table in {time.perf_counter() - started:.1f} s")
+
+        for q in QUERIES:
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                result = search(q, per_page=20)
+                timings.append((time.perf_counter() - started) * 1000)
+                db.session.rollback()
+            print(f"{q!r:>16}: median {statistics.median(timings):7.2f} ms ({len(result['results'])} results)")
+
+
+if __name__ == "__main__":
+    main()
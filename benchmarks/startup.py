@@ -0,0 +1,65 @@
+"""
+Startup-time benchmark: cold start of a fresh Python process up to the first served requests.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--budget-ms 1500]
+
+Exits with status 1 when the median cold start exceeds the budget.
+Run 'flask build-openapi' first to measure the prebuilt-spec path.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a fresh interpreter for every run, so nothing is imported or cached up front
+COLD_START = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+client = app.test_client()
+client.get('/api/client/')
+first_request = time.perf_counter()
+client.get('/api/swagger.json')
+spec = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first_request - created) * 1000,
+    'swagger_json_ms': (spec - first_request) * 1000,
+    'total_ms': (spec - started) * 1000,
+}))
+"""
+
+
+def run_once():
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_START], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", 1500)))
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    for phase in runs[0]:
+        print(f"{phase:>18}: median {statistics.median(run[phase] for run in runs):8.1f} ms")
+
+    total = statistics.median(run["total_ms"] for run in runs)
+    print(f"{'budget':>18}: {args.budget_ms:8.1f} ms -> {'OK' if total <= args.budget_ms else 'OVER BUDGET'}")
+    sys.exit(0 if total <= args.budget_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
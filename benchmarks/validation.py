@@ -0,0 +1,81 @@
+"""
+Request validation benchmark: the per-request cost of turning a JSON body into service arguments.
+
+Usage:
+    python benchmarks/validation.py [--iterations 20000]
+
+Compares, for the create and update bodies of a work and a task, the previous path
+(flask-restx JSON-schema validation, expect(..., validate=True), then the services
+parsing the dates with strptime) with the validators compiled once from the models
+(utils.validation.compile_validator).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BODIES = {
+    "work create": ("work", False, {
+        "cost": 120.5, "description": "Revisão geral", "start_date": "2025-03-01",
+        "end_date": "2025-03-05", "status": "pending", "vehicle_id": 1,
+    }),
+    "work update": ("work", True, {"status": "completed", "end_date": "2025-03-06"}),
+    "task create": ("task", False, {
+        "description": "Troca de óleo", "status": "pending", "start_date": "2025-03-01",
+        "end_date": "2025-03-02", "work_id": 1, "employee_id": 1,
+    }),
+    "task update": ("task", True, {"status": "in_progress"}),
+}
+
+
+def schema_path(api, model):
+    # What a request paid before: the JSON-schema check of flask-restx, then the service
+    # converting both dates (and failing when one of them was left out of an update)
+    def run(payload):
+        model.validate(payload, api.refresolver, api.format_checker)
+        values = dict(payload)
+        for name in ("start_date", "end_date"):
+            if values.get(name) is not None:
+                values[name] = datetime.strptime(values[name], "%Y-%m-%d").date()
+        return values
+    return run
+
+
+def median_us(function, payload, iterations):
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function(payload)
+        timings.append((time.perf_counter() - started) / iterations * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    from api import api
+    from api.task import task_model, task_validator
+    from api.work import work_model, work_validator
+    from app import create_app
+
+    app = create_app()
+    models = {"work": (work_model, work_validator), "task": (task_model, task_validator)}
+
+    with app.test_request_context():
+        print(f"{'body':>12}  {'schema + strptime':>18}  {'compiled':>10}  {'saved':>8}")
+        for label, (resource, partial, payload) in BODIES.items():
+            model, validator = models[resource]
+            before = median_us(schema_path(api, model), payload, args.iterations)
+            after = median_us(lambda body: validator(body, partial), payload, args.iterations)
+            print(f"{label:>12}  {before:15.2f} us  {after:7.2f} us  {(1 - after / before) * 100:6.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,99 @@
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URI")
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # OpenAPI spec prebuilt by 'flask build-openapi' and served as a static, ETagged file
+    OPENAPI_SPEC_PATH = os.getenv("OPENAPI_SPEC_PATH", os.path.join(basedir, "static", "openapi.json"))
+    SWAGGER_UI_ENABLED = os.getenv("SWAGGER_UI_ENABLED", "1") == "1"
+
+    # Reject tasks that double-book an employee (can also be requested per call with ?check_conflicts=1)
+    TASK_CONFLICT_CHECK = os.getenv("TASK_CONFLICT_CHECK", "0") == "1"
+
+    # Rows inserted per transaction by the bulk import endpoints (can be overridden per call with ?batch_size=)
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+    # Background jobs (see services.job_service): worker threads, and where job files (exports, uploads) are kept
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_RESULTS_DIR = os.getenv("JOB_RESULTS_DIR", os.path.join(basedir, "instance", "jobs"))
+
+    # Idempotency-Key support on create routes: how long responses are kept, how long a retry
+    # waits for the first request with the same key to finish before getting a 409, and after
+    # how long a key whose first request never finished (e.g. its process died) is taken over
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "5"))
+    IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+    # Token-bucket rate limits per client (logged in employee or IP) and route. Keys are 'METHOD /route' glob
+    # patterns matched against route templates; the first match applies. Override with a JSON object in RATE_LIMITS.
+    # Buckets are kept per process: under 'flask serve' each worker applies the limits on its own.
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+    RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "10000"))
+    RATE_LIMITS = json.loads(os.getenv("RATE_LIMITS", "null")) or {
+        "GET /api/*/export.csv": "10/minute",  # Full table exports
+        "POST /api/*/import": "20/hour",  # Bulk imports
+        "POST /api/jobs*": "30/minute",
+        "POST /api/invoice/batch": "10/hour",
+        "GET /api/invoice/summary": "60/minute",  # Reports
+        "GET /api/employee/workload": "60/minute",
+        "GET /api/employee/available": "60/minute",
+        "GET /api/search": "120/minute",
+        "POST /api/auth/login": "10/minute",  # Password guessing
+        "POST /api/*/lookup": "600/minute",  # Multi-get reads
+        "GET *": "600/minute",  # Other reads
+        "*": "120/minute",  # Other writes
+    }
+
+    # Archiving (flask archive, 'archive' jobs): finished works and invoices older than this move to the archive tables
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", str(2 * 365)))
+
+    # GET /api/events (Server-Sent Events): keep-alive comment interval, changes kept in memory for
+    # subscribers that fall behind, most changes replayed from the change log on resume (Last-Event-ID),
+    # and seconds after which a stream ends and its client reconnects (0 never: each open stream holds
+    # a server thread)
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", "1024"))
+    EVENTS_MAX_REPLAY = int(os.getenv("EVENTS_MAX_REPLAY", "1000"))
+    EVENTS_MAX_STREAM_SECONDS = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", "300"))
+
+    # POST /api/batch: maximum sub-requests per batch, and threads shared by parallel batches
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50"))
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+
+    # flask serve (pre-forked server): worker processes, requests served by a worker before it is replaced
+    # (plus a random jitter of up to SERVER_MAX_REQUESTS_JITTER, so workers are not all replaced at once;
+    # 0 never replaces them), seconds a connection may stay idle or blocked on socket I/O (and a worker may
+    # go without a heartbeat before the master kills and replaces it), seconds stopping workers get to finish
+    # their requests, and how often a serving process (a worker, or flask run) picks up the changes committed
+    # by the others (token revocations, cache invalidation and event streams, see services.sync_service)
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+    SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "1000"))
+    SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "100"))
+    SERVER_TIMEOUT = float(os.getenv("SERVER_TIMEOUT", "30"))
+    SERVER_GRACEFUL_TIMEOUT = float(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    SERVER_SYNC_SECONDS = float(os.getenv("SERVER_SYNC_SECONDS", "0.5"))
+
+    # Warm-up after start (see services.warmup_service): GET /ready answers 503 until it is done. Database
+    # connections opened up front, and most recent records of each resource loaded into the entity caches
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+    WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+    WARMUP_CACHE_RECORDS = int(os.getenv("WARMUP_CACHE_RECORDS", "200"))
+
+    # Token authentication of /api (see utils.auth): employees get a token from POST /api/auth/login.
+    # Signing keys, comma-separated and oldest first (new tokens use the last one, all are accepted: append a
+    # key to rotate, drop the old one after AUTH_TOKEN_TTL_SECONDS), token lifetime, and tokens whose
+    # verification is cached per process
+    AUTH_ENABLED = os.getenv("AUTH_ENABLED", "1") == "1"
+    AUTH_SECRET_KEYS = [key for key in os.getenv("AUTH_SECRET_KEYS", "").split(",") if key] or (
+        [SECRET_KEY] if SECRET_KEY else []
+    )
+    AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", "3600"))
+    AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
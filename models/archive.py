@@ -0,0 +1,32 @@
+from models.invoice import Invoice
+from models.invoice_item import Invoice_item
+from models.task import Task
+from models.work import Work
+from utils.database import db
+
+
+def archive_model(model, class_name, indexes=()):
+    """
+    Build the archive counterpart of a model: a '<table>_archive' table with the same
+    columns, plus archived_at, and neither foreign keys nor unique constraints (archived
+    rows may reference records deleted later). Rows keep their primary key when moved.
+    :param model: The hot model.
+    :param class_name: Name of the archive model class.
+    :param indexes: Column names to index in the archive table.
+    """
+    table_name = f"{model.__tablename__}_archive"
+    attributes = {
+        "__tablename__": table_name,
+        "__table_args__": tuple(db.Index(f"ix_{table_name}_{column}", column) for column in indexes),
+        "__doc__": f"Archived rows of the '{model.__tablename__}' table (see services.archive_service).",
+    }
+    for column in model.__table__.columns:
+        attributes[column.name] = db.Column(column.type, primary_key=column.primary_key, nullable=column.nullable)
+    attributes["archived_at"] = db.Column(db.DateTime, server_default=db.func.now())
+    return type(class_name, (db.Model,), attributes)
+
+
+WorkArchive = archive_model(Work, "WorkArchive")
+TaskArchive = archive_model(Task, "TaskArchive", indexes=("work_id",))
+InvoiceArchive = archive_model(Invoice, "InvoiceArchive")
+InvoiceItemArchive = archive_model(Invoice_item, "InvoiceItemArchive", indexes=("invoice_id", "task_id"))
@@ -0,0 +1,31 @@
+from utils.database import db
+
+
+class Change(db.Model):
+    """
+    An entry of the change feed (see services.change_service): one per created, updated
+    or deleted record, written in the same transaction as the change itself.
+
+    Attributes:
+        seq (int): The primary key; increases with every change and is never reused.
+        resource (str): The table of the changed record (e.g. 'work').
+        record_id (int): The primary key of the changed record.
+        action (str): 'create', 'update', 'delete' or 'archive' (moved to the archive tables).
+        data (str): JSON of the record after the change; empty for deletes and archiving (tombstones).
+        changed_at (datetime): Timestamp of the change.
+    """
+    __tablename__ = 'change_log'
+    # AUTOINCREMENT: sequence numbers of pruned or rolled back changes are never handed out again
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    # Define columns for the table
+    seq = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(40), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)
+    data = db.Column(db.Text)
+    changed_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    def __repr__(self):
+        return (f"<Change {self.seq}: "
+                f"{self.action} {self.resource} {self.record_id}>")
@@ -23,6 +23,10 @@ class Client(db.Model):
     address = db.Column(db.String(200), nullable=False)  # Client address
     created_at = db.Column(db.DateTime, server_default=db.func.now())  # Auto-generated timestamp
 
+    # Row version, checked and bumped by every ORM update and delete (optimistic concurrency)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         """
         String representation of the Client object.
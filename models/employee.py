@@ -12,6 +12,7 @@ class Employee(db.Model):
         phone (str): Phone number of the employee (optional).
         role (str): Role of the employee (e.g., 'mechanic', 'manager'). Default is 'mechanic'.
         hired_date (date): Date when the employee was hired.
+        password_hash (str): Hash of the login password (see utils.security); None until one is set.
         created_at (datetime): Timestamp indicating when the record was created. Auto-generated by the database.
     """
     # Primary key column
@@ -26,9 +27,16 @@ class Employee(db.Model):
     role = db.Column(db.String(20), nullable=False, default='mechanic')  # Role with a default value of 'mechanic'
     hired_date = db.Column(db.Date, nullable=False)  # Mandatory hire date
 
+    # Login (POST /api/auth/login); never returned by the API
+    password_hash = db.Column(db.String(256))
+
     # Audit information
     created_at = db.Column(db.DateTime, server_default=db.func.now())  # Timestamp for when the record was created
 
+    # Row version, checked and bumped by every ORM update and delete (optimistic concurrency)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         """
         String representation of the Employee object.
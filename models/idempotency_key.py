@@ -0,0 +1,30 @@
+from utils.database import db
+
+
+class IdempotencyKey(db.Model):
+    """
+    Response stored for an Idempotency-Key, replayed when a create request is retried
+    (see utils.idempotency).
+
+    Attributes:
+        key_hash (str): SHA-256 of the method, path, caller (employee ID) and Idempotency-Key header.
+        fingerprint (str): SHA-256 of the request body, to detect a key reused for another request.
+        status (int): HTTP status of the stored response; NULL while the first request is still running.
+        body (str): The stored JSON response body.
+        expires_at (datetime): When the key may be forgotten.
+        claimed_at (datetime): When the request running it claimed the key.
+        owner (str): Host and process id of that request ('host:pid').
+    """
+    __tablename__ = 'idempotency_key'
+
+    # Define columns for the table
+    key_hash = db.Column(db.String(64), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.Integer)
+    body = db.Column(db.Text)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    claimed_at = db.Column(db.DateTime)
+    owner = db.Column(db.String(128))
+
+    def __repr__(self):
+        return f"<Idempotency Key {self.key_hash[:12]}, Status: {self.status}>"
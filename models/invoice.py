@@ -8,6 +8,8 @@ def relationship(param, back_populates):
 
 
 class Invoice(db.Model):
+    # IDs of archived invoices are never handed out again (models.archive)
+    __table_args__ = {'sqlite_autoincrement': True}
 
     # Define colunas para a tabela
     invoice_id = db.Column(db.Integer, primary_key=True)
@@ -19,6 +21,10 @@ class Invoice(db.Model):
     client_id = db.Column(db.Integer, ForeignKey('client.client_id'), nullable=False)
     relationship("Client", back_populates="invoices")
 
+    # Row version, checked and bumped by every ORM update and delete (optimistic concurrency)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return (f"<Invoice ID: {self.invoice_id}, "
                 f"Issued At: {self.issued_at}, "
@@ -9,7 +9,12 @@ def relationship(param, back_populates):
 
 
 class Invoice_item(db.Model):
-
+    # Index used to find the tasks that are not invoiced yet (see services.billing_service)
+    __table_args__ = (
+        db.Index('ix_invoice_item_task_id', 'task_id'),
+        # IDs of archived items are never handed out again (models.archive)
+        {'sqlite_autoincrement': True},
+    )
 
     # Define columns for the table
     item_id = db.Column(db.Integer, primary_key=True)
@@ -20,6 +25,10 @@ class Invoice_item(db.Model):
     task_id =  db.Column(db.Integer, ForeignKey('task.task_id'), nullable=False)
     relationship("Task", back_populates="invoice_items")
 
+    # Row version, checked and bumped by every ORM update and delete (optimistic concurrency)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return (f"<Item ID: {self.item_id}, "
                 f"Cost: {self.cost}, "
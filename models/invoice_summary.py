@@ -0,0 +1,34 @@
+from sqlalchemy import ForeignKey
+
+from utils.database import db
+
+
+class InvoiceSummary(db.Model):
+    """
+    Monthly revenue per client, maintained by the invoice service in the same transaction
+    as every invoice change, so revenue reports never scan the invoice table.
+
+    Attributes:
+        year (int): Year the invoices were issued.
+        month (int): Month the invoices were issued (1-12).
+        client_id (int): The invoiced client.
+        invoice_count (int): Number of invoices.
+        total (float): Sum of the invoice totals without IVA.
+        total_with_iva (float): Sum of the invoice totals with IVA.
+    """
+    __tablename__ = 'invoice_summary'
+
+    # Define columns for the table
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, ForeignKey('client.client_id'), primary_key=True)
+    invoice_count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+    total_with_iva = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return (f"<Invoice Summary {self.year}-{self.month:02d}, "
+                f"Client ID: {self.client_id}, "
+                f"Invoices: {self.invoice_count}, "
+                f"Total: {self.total}, "
+                f"Total With Iva: {self.total_with_iva}>")
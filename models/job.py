@@ -0,0 +1,46 @@
+from utils.database import db
+
+
+class Job(db.Model):
+    """
+    A background job, run by the job runner (see services.job_service).
+
+    Attributes:
+        job_id (int): The primary key for the job table.
+        job_type (str): The registered job type (e.g. 'export', 'invoice-batch').
+        status (str): 'queued', 'running', 'succeeded', 'failed' or 'cancelled'.
+        params (str): JSON parameters of the job.
+        progress (str): JSON progress report, updated while the job runs.
+        result (str): JSON result, once the job has succeeded.
+        result_path (str): File produced by the job (e.g. an export), if any.
+        error (str): Error message, if the job failed.
+        cancel_requested (bool): Set when a cancellation was requested while the job was running.
+        worker (str): 'host:pid' of the process that owns the job.
+        created_at (datetime): Timestamp when the job was enqueued.
+        started_at (datetime): Timestamp when the job started running.
+        finished_at (datetime): Timestamp when the job ended.
+    """
+    __tablename__ = 'job'
+    __table_args__ = (
+        db.Index('ix_job_status', 'status'),
+    )
+
+    # Define columns for the table
+    job_id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(40), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    params = db.Column(db.Text)
+    progress = db.Column(db.Text)
+    result = db.Column(db.Text)
+    result_path = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    worker = db.Column(db.String(80))
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return (f"<Job ID: {self.job_id}, "
+                f"Type: {self.job_type}, "
+                f"Status: {self.status}>")
@@ -0,0 +1,27 @@
+from utils.database import db
+
+
+class RevokedToken(db.Model):
+    """
+    An entry of the token revocation list (see utils.auth): either one logged out token,
+    or every token issued to an employee up to revoked_at (password changed, employee deleted).
+
+    Attributes:
+        revocation_id (int): Primary key.
+        token_id (str): The revoked token id (jti), or NULL for an employee-wide entry.
+        employee_id (int): The employee whose tokens are revoked, for an employee-wide entry.
+        revoked_at (datetime): Timestamp of the revocation.
+        expires_at (datetime): When the tokens it covers have expired and the entry may be forgotten.
+    """
+    __tablename__ = 'revoked_token'
+
+    # Define columns for the table
+    revocation_id = db.Column(db.Integer, primary_key=True)
+    token_id = db.Column(db.String(32))
+    employee_id = db.Column(db.Integer)
+    revoked_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return (f"<Revoked Token {self.revocation_id}: "
+                f"{self.token_id or f'all of employee {self.employee_id}'}>")
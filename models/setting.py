@@ -17,6 +17,10 @@ class Setting(db.Model):
     updated_at =  db.Column(db.DateTime, server_default=db.func.now())
     value =  db.Column(db.String(80), nullable=False)
 
+    # Row version, checked and bumped by every ORM update and delete (optimistic concurrency)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return (f"<Setting ID: {self.setting_id}, "
                 f"Key Name: {self.key_name}, "
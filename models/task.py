@@ -8,6 +8,12 @@ def relationship(param, back_populates):
 
 
 class Task(db.Model):
+    # Índice composto usado pelos relatórios de carga de trabalho por funcionário e intervalo de datas
+    __table_args__ = (
+        db.Index('ix_task_employee_dates', 'employee_id', 'start_date', 'end_date', 'status'),
+        # IDs of archived tasks are never handed out again (models.archive)
+        {'sqlite_autoincrement': True},
+    )
 
     # Define colunas para a tabela
     task_id = db.Column(db.Integer, primary_key=True)
@@ -24,6 +30,10 @@ class Task(db.Model):
     employee_id = db.Column(db.Integer, ForeignKey('employee.employee_id'), nullable=False)
     relationship("Employee", back_populates="tasks")
 
+    # Row version, checked and bumped by every ORM update and delete (optimistic concurrency)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return (f"<Task ID: {self.task_id}, "
                 f"Description: {self.description}, "
@@ -16,11 +16,16 @@ class Vehicle(db.Model):
     brand =  db.Column(db.String(80), nullable=False)  # Added brand
     model =  db.Column(db.String(80), nullable=False)
     license_plate =  db.Column(db.String(20), unique=True, nullable=False)
+    plate_key =  db.Column(db.String(20), unique=True, index=True)  # Normalized plate (see normalize_plate), for lookups
     year =  db.Column(db.Integer, nullable=False)
     client_id =  db.Column(db.Integer, ForeignKey('client.client_id'), nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     relationship('Client', back_populates='vehicles')
 
+    # Row version, checked and bumped by every ORM update and delete (optimistic concurrency)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return (f"<Vehicle ID: {self.vehicle_id}, "
                 f"Brand: {self.brand}, "
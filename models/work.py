@@ -9,7 +9,8 @@ def relationship(param, back_populates):
 
 
 class Work(db.Model):
-
+    # IDs of archived works are never handed out again (models.archive)
+    __table_args__ = {'sqlite_autoincrement': True}
 
     # Define columns for the table
     work_id = db.Column(db.Integer, primary_key=True)
@@ -23,6 +24,10 @@ class Work(db.Model):
     vehicle_id =  db.Column(db.Integer, ForeignKey('vehicle.vehicle_id'), nullable=False)
     relationship("Vehicle", back_populates="works")
 
+    # Row version, checked and bumped by every ORM update and delete (optimistic concurrency)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return (f"<Work ID: {self.work_id}, "
                 f"Cost: {self.cost}, "
@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import delete, exists, func, insert, select
+from werkzeug.exceptions import Conflict
+
+from models.archive import InvoiceArchive, InvoiceItemArchive, TaskArchive, WorkArchive
+from models.invoice import Invoice
+from models.invoice_item import Invoice_item
+from models.task import Task
+from models.work import Work
+from services.change_service import record_changes
+from services.employee_service import workload_cache
+from services.schedule_service import task_schedule
+from services.search_service import remove_documents
+from utils.cache import entity_cache
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Hot model -> archive model
+ARCHIVES = {
+    Work: WorkArchive,
+    Task: TaskArchive,
+    Invoice: InvoiceArchive,
+    Invoice_item: InvoiceItemArchive,
+}
+
+# Works and tasks in these statuses are finished
+FINISHED_STATUSES = ("completed", "cancelled")
+
+# Invoices or works moved per transaction
+ARCHIVE_CHUNK_SIZE = 500
+
+# Only one archiving run at a time in this process
+_run_lock = threading.Lock()
+
+
+def default_cutoff(days):
+    """
+    The cutoff date for records finished more than a number of days ago.
+    """
+    return date.today() - timedelta(days=days)
+
+
+def archivable_invoices(cutoff):
+    """
+    SELECT of the IDs of the invoices issued before the cutoff.
+    """
+    return select(Invoice.invoice_id).where(
+        Invoice.issued_at < cutoff,
+    )
+
+
+def archivable_works(cutoff):
+    """
+    SELECT of the IDs of the finished works that ended before the cutoff and whose tasks
+    are all finished and not billed on a hot invoice. Completed works with a task still to
+    bill, or billed on a hot invoice, stay hot until it is invoiced and the invoice archived.
+    """
+    billed_in_archive = exists().where(InvoiceItemArchive.task_id == Task.task_id)
+    return select(Work.work_id).where(
+        Work.status.in_(FINISHED_STATUSES),
+        func.coalesce(Work.end_date, Work.start_date) < cutoff,
+        ~exists().where(
+            Task.work_id == Work.work_id,
+            func.coalesce(Task.status, "").not_in(FINISHED_STATUSES)
+            | exists().where(Invoice_item.task_id == Task.task_id)
+            | ((Task.status == "completed") & (Work.status == "completed") & ~billed_in_archive),
+        ),
+    )
+
+
+def _move(model, column, ids):
+    """
+    Copy the rows whose column is in ids to the archive table, then delete them, inside
+    the current transaction, and record them in the change feed.
+    :return: list: The primary keys of the moved rows.
+    """
+    archive = ARCHIVES[model]
+    primary_key = model.__table__.primary_key.columns[0]
+    names = model.__table__.columns.keys()
+    moved = db.session.execute(
+        insert(archive)
+        .from_select(names, select(*model.__table__.columns).where(column.in_(ids)))
+        .returning(getattr(archive, primary_key.name))
+    ).scalars().all()
+    db.session.execute(delete(model).where(column.in_(ids)))
+    record_changes(model, "archive", [{primary_key.name: record_id} for record_id in moved])
+    return moved
+
+
+def _archive_chunk(kind, ids):
+    """
+    Archive a chunk of invoices (with their items) or works (with their tasks) in one transaction.
+    :return: tuple: (parents moved, children moved).
+    """
+    if kind == "invoice":
+        items = _move(Invoice_item, Invoice_item.invoice_id, ids)
+        invoices = _move(Invoice, Invoice.invoice_id, ids)
+        db.session.commit()
+        for item_id in items:
+            entity_cache("invoice_item").invalidate(item_id)
+        for invoice_id in invoices:
+            entity_cache("invoice").invalidate(invoice_id)
+        return len(invoices), len(items)
+
+    tasks = _move(Task, Task.work_id, ids)
+    works = _move(Work, Work.work_id, ids)
+    remove_documents("work", works)
+    db.session.commit()
+    for task_id in tasks:
+        task_schedule.remove(task_id)
+        entity_cache("task").invalidate(task_id)
+    for work_id in works:
+        entity_cache("work").invalidate(work_id)
+    return len(works), len(tasks)
+
+
+def run_archiving(cutoff, dry_run=False, chunk_size=ARCHIVE_CHUNK_SIZE, progress=None):
+    """
+    Move the records finished before a cutoff to the archive tables: first the invoices
+    with their items, then the works with their tasks (which may only become archivable
+    once their invoice is). Each chunk is committed on its own, so an interrupted run is
+    resumed simply by running it again. The monthly invoice summary keeps archived invoices.
+    :param cutoff: Records issued or ended before this date are archived.
+    :param dry_run: Only count what would be archived.
+    :param chunk_size: Invoices or works moved per transaction.
+    :param progress: Optional callable, called with the report after each chunk.
+    :return: dict: The number of records archived per table.
+    """
+    if not _run_lock.acquire(blocking=False):
+        raise Conflict("An archiving run is already in progress.")
+    started = time.perf_counter()
+    try:
+        report = {"cutoff": cutoff.isoformat(), "dry_run": dry_run, "invoice": 0, "invoice_item": 0,
+                  "work": 0, "task": 0, "chunks": 0}
+        if dry_run:
+            invoice_ids = archivable_invoices(cutoff).subquery()
+            report["invoice"] = db.session.scalar(select(func.count()).select_from(invoice_ids))
+            report["invoice_item"] = db.session.scalar(
+                select(func.count()).where(Invoice_item.invoice_id.in_(select(invoice_ids.c.invoice_id)))
+            )
+            # Works are counted as they are now: archiving the invoices first may free more of them
+            work_ids = archivable_works(cutoff).subquery()
+            report["work"] = db.session.scalar(select(func.count()).select_from(work_ids))
+            report["task"] = db.session.scalar(select(func.count()).where(Task.work_id.in_(select(work_ids.c.work_id))))
+        else:
+            for kind, children, query in (("invoice", "invoice_item", archivable_invoices),
+                                          ("work", "task", archivable_works)):
+                while True:
+                    ids = db.session.scalars(query(cutoff).limit(chunk_size)).all()
+                    if not ids:
+                        break
+                    parents, moved_children = _archive_chunk(kind, ids)
+                    report[kind] += parents
+                    report[children] += moved_children
+                    report["chunks"] += 1
+                    if progress:
+                        progress(report)
+            if report["task"]:
+                workload_cache.clear()
+        report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return report
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error archiving records before {cutoff}: {e}")
+        raise
+    finally:
+        _run_lock.release()
+
+
+def get_archived(model, filters=()):
+    """
+    Retrieve the archived rows of a model.
+    :param model: The hot model (Work, Task, Invoice or Invoice_item).
+    :param filters: Filter conditions on the archive model (see utils.filters.build_filters).
+    :return: list: Archive model instances, with the same attributes as the hot ones.
+    """
+    return ARCHIVES[model].query.filter(*filters).all()
+
+
+def get_archived_one(model, record_id):
+    """
+    Retrieve one archived row by primary key, or None.
+    """
+    return db.session.get(ARCHIVES[model], record_id)
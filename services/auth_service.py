@@ -0,0 +1,145 @@
+import logging
+from datetime import datetime
+from functools import cache
+
+from models.employee import Employee
+from models.revoked_token import RevokedToken
+from services.change_service import record_change
+from utils.auth import token_auth
+from utils.cache import entity_cache
+from utils.database import db
+from utils.security import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def _unknown_employee_hash():
+    # Checked when the email is unknown, so that a failed login takes as long either way
+    return hash_password("unknown employee")
+
+
+def login(email, password):
+    """
+    Check an employee's credentials and issue a token. This is the only place the
+    password hash is checked: the requests made with the token do not touch the database.
+    :param email: The email of the employee.
+    :param password: The plain-text password.
+    :return: dict: The token and its lifetime, or None if the credentials are wrong.
+    """
+    try:
+        employee = Employee.query.filter_by(email=email).first()
+        if employee is None or not employee.password_hash:
+            verify_password(_unknown_employee_hash(), password)
+            return None
+        if not verify_password(employee.password_hash, password):
+            return None
+        token, _ = token_auth.issue(employee.employee_id, employee.role)
+        return {
+            "access_token": token,
+            "token_type": "Bearer",
+            "expires_in": token_auth.token_ttl,
+            "employee_id": employee.employee_id,
+            "role": employee.role,
+        }
+    except Exception as e:
+        logger.error(f"Error logging in {email}: {e}")
+        raise
+
+
+def _revocation(token_id=None, employee_id=None, expires_at=None):
+    # Add a revocation to the caller's transaction, with its change log entry so that
+    # the other server workers pick it up (services.sync_service.apply_change)
+    now = datetime.now()
+    revocation = RevokedToken(
+        token_id=token_id,
+        employee_id=employee_id,
+        revoked_at=now,
+        expires_at=expires_at or datetime.fromtimestamp(now.timestamp() + token_auth.token_ttl),
+    )
+    db.session.add(revocation)
+    db.session.flush()
+    record_change("create", revocation)
+    return revocation
+
+
+def apply_revocation(revocation):
+    """
+    Add a revocation to the revocation list of this process.
+    :param revocation: A RevokedToken, or a mapping of its columns (dates as ISO text).
+    """
+    values = revocation if isinstance(revocation, dict) else {
+        name: getattr(revocation, name) for name in RevokedToken.__table__.columns.keys()
+    }
+    revoked_at, expires_at = (
+        datetime.fromisoformat(value) if isinstance(value, str) else value
+        for value in (values["revoked_at"], values["expires_at"])
+    )
+    token_auth.revoke(values["token_id"], values["employee_id"], revoked_at.timestamp(), expires_at.timestamp())
+
+
+def logout(claims):
+    """
+    Revoke the token of the current request until it expires.
+    :param claims: The claims of the token (flask.g.auth).
+    :return: dict: A confirmation message.
+    """
+    try:
+        revocation = _revocation(token_id=claims["jti"], expires_at=datetime.fromtimestamp(claims["exp"]))
+        db.session.commit()
+        apply_revocation(revocation)
+        return {"message": "Logged out."}
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error logging out employee {claims['sub']}: {e}")
+        raise
+
+
+def revoke_employee_tokens(employee_id):
+    """
+    Revoke every token issued so far to an employee, in the caller's transaction.
+    Call apply_revocation with the result once it is committed.
+    :return: RevokedToken: The revocation.
+    """
+    return _revocation(employee_id=employee_id)
+
+
+def set_password(email, password):
+    """
+    Set the login password of an employee and revoke the tokens issued before.
+    :param email: The email of the employee.
+    :param password: The new plain-text password.
+    :return: bool: False if no employee has that email.
+    """
+    try:
+        employee = Employee.query.filter_by(email=email).first()
+        if not employee:
+            return False
+        employee.password_hash = hash_password(password)
+        record_change("update", employee)
+        revocation = revoke_employee_tokens(employee.employee_id)
+        db.session.commit()
+        entity_cache("employee").invalidate(employee.employee_id)
+        apply_revocation(revocation)
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error setting the password of {email}: {e}")
+        raise
+
+
+def load_revocations():
+    """
+    Fill the revocation list of this process with the entries that have not expired, and
+    forget the expired ones. Must be called inside an application context.
+    :return: int: The number of entries loaded.
+    """
+    now = datetime.now()
+    RevokedToken.query.filter(RevokedToken.expires_at <= now).delete()
+    db.session.commit()
+    token_auth.clear_revocations()
+    revocations = RevokedToken.query.filter(RevokedToken.expires_at > now).all()
+    for revocation in revocations:
+        apply_revocation(revocation)
+    db.session.rollback()
+    return len(revocations)
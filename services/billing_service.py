@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, case, exists, func, insert, literal, select
+from werkzeug.exceptions import Conflict
+
+from models.archive import InvoiceItemArchive
+from models.invoice import Invoice
+from models.invoice_item import Invoice_item
+from models.task import Task
+from models.vehicle import Vehicle
+from models.work import Work
+from services.change_service import record_changes
+from services.invoice_summary_service import apply_invoices
+from services.setting_service import get_iva_rate
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Clients invoiced per transaction by the batch invoicing run
+BILLING_CHUNK_SIZE = 200
+
+# Per-connection staging table holding the items of the chunk being invoiced, so that the
+# invoices and their items are both computed from the same snapshot of unbilled tasks
+billing_run_item = Table(
+    "billing_run_item",
+    MetaData(),
+    Column("task_id", Integer, primary_key=True),
+    Column("client_id", Integer, nullable=False),
+    Column("description", String(80)),
+    Column("cost", Float, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+# Only one run at a time per process; concurrent runs in other processes are serialized by the database
+_run_lock = threading.Lock()
+
+
+def unbilled_tasks():
+    """
+    SELECT of the completed tasks of completed works that have no invoice item yet (hot or archived),
+    with the client to invoice and the item cost. A work's cost is split evenly over its
+    completed tasks, the ones that are billed; the last of them also takes the cents lost
+    to rounding, so that the items of a work add up to its cost.
+    """
+    sibling = Task.__table__.alias("sibling")
+    billed_sibling = (sibling.c.work_id == Work.work_id) & (sibling.c.status == "completed")
+    task_count = select(func.count()).select_from(sibling).where(billed_sibling).scalar_subquery()
+    last_task_id = select(func.max(sibling.c.task_id)).where(billed_sibling).scalar_subquery()
+    share = func.round(Work.cost / task_count, 2)
+    return (
+        select(
+            Task.task_id,
+            Vehicle.client_id,
+            func.substr(Task.description, 1, 80).label("description"),
+            case(
+                (Task.task_id == last_task_id, func.round(Work.cost - share * (task_count - 1), 2)),
+                else_=share,
+            ).label("cost"),
+        )
+        .join(Work, Work.work_id == Task.work_id)
+        .join(Vehicle, Vehicle.vehicle_id == Work.vehicle_id)
+        .where(
+            Task.status == "completed",
+            Work.status == "completed",
+            Work.cost.isnot(None),
+            ~exists().where(Invoice_item.task_id == Task.task_id),
+            ~exists().where(InvoiceItemArchive.task_id == Task.task_id),
+        )
+    )
+
+
+def _preview(iva):
+    """
+    Totals the run would invoice, without writing anything.
+    """
+    pending = unbilled_tasks().subquery()
+    per_client = (
+        select(func.count().label("item_count"), func.round(func.sum(pending.c.cost), 2).label("total"))
+        .group_by(pending.c.client_id)
+        .subquery()
+    )
+    row = db.session.execute(select(
+        func.count(),
+        func.coalesce(func.sum(per_client.c.item_count), 0),
+        func.coalesce(func.sum(per_client.c.total), 0),
+        func.coalesce(func.sum(func.round(per_client.c.total * (1 + iva), 2)), 0),
+    )).one()
+    return {"invoices": row[0], "items": row[1], "total": round(row[2], 2), "total_with_iva": round(row[3], 2)}
+
+
+def _invoice_chunk(client_ids, iva):
+    """
+    Invoice the unbilled tasks of a chunk of clients inside the current transaction: one
+    invoice per client with INSERT ... SELECT, then all their items with a second one.
+    Both are added to the change feed from the rows they return.
+    :return: tuple: (invoice rows (with invoice_id, total, total_with_iva), number of items).
+    """
+    billing_run_item.create(db.session.connection(), checkfirst=True)
+    db.session.execute(billing_run_item.delete())
+    db.session.execute(insert(billing_run_item).from_select(
+        ["task_id", "client_id", "description", "cost"],
+        unbilled_tasks().where(Vehicle.client_id.in_(client_ids)),
+    ))
+
+    staged = billing_run_item.c
+    total = func.round(func.sum(staged.cost), 2)
+    invoices = db.session.execute(
+        insert(Invoice)
+        .from_select(
+            ["client_id", "iva", "total", "total_with_iva"],
+            select(staged.client_id, literal(iva), total, func.round(total * (1 + iva), 2))
+            .group_by(staged.client_id),
+        )
+        .returning(*Invoice.__table__.columns)
+    ).all()
+    invoice_ids = [invoice.invoice_id for invoice in invoices]
+
+    items = db.session.execute(
+        insert(Invoice_item)
+        .from_select(
+            ["invoice_id", "task_id", "description", "cost"],
+            select(Invoice.invoice_id, staged.task_id, staged.description, staged.cost)
+            .join(Invoice, Invoice.client_id == staged.client_id)
+            .where(Invoice.invoice_id.in_(invoice_ids)),
+        )
+        .returning(*Invoice_item.__table__.columns)
+    ).mappings().all()
+    apply_invoices(invoice_ids)
+    record_changes(Invoice, "create", [invoice._mapping for invoice in invoices])
+    record_changes(Invoice_item, "create", items)
+    return invoices, len(items)
+
+
+def run_batch_invoicing(dry_run=False, chunk_size=BILLING_CHUNK_SIZE, progress=None):
+    """
+    Invoice every completed task of a completed work that has no invoice item yet, with one
+    invoice per client. Clients are processed in chunks, each committed on its own; since
+    invoiced tasks are excluded by the selection itself, the run is idempotent and an
+    interrupted run is resumed simply by running it again.
+    :param dry_run: Only report what would be invoiced.
+    :param chunk_size: Clients invoiced per transaction.
+    :param progress: Optional callable, called with the report after each chunk.
+    :return: dict: The run report (invoices, items and totals created, throughput).
+    """
+    if not _run_lock.acquire(blocking=False):
+        raise Conflict("A batch invoicing run is already in progress.")
+    started = time.perf_counter()
+    try:
+        iva = get_iva_rate()
+        if dry_run:
+            report = dict(_preview(iva), dry_run=True, iva=iva, chunks=0)
+        else:
+            report = {"dry_run": False, "iva": iva, "invoices": 0, "items": 0,
+                      "total": 0.0, "total_with_iva": 0.0, "chunks": 0}
+            pending = unbilled_tasks().subquery()
+            client_ids = db.session.scalars(
+                select(pending.c.client_id).distinct().order_by(pending.c.client_id)
+            ).all()
+            for offset in range(0, len(client_ids), chunk_size):
+                invoices, items = _invoice_chunk(client_ids[offset:offset + chunk_size], iva)
+                db.session.commit()
+                report["chunks"] += 1
+                report["invoices"] += len(invoices)
+                report["items"] += items
+                report["total"] = round(report["total"] + sum(invoice.total for invoice in invoices), 2)
+                report["total_with_iva"] = round(
+                    report["total_with_iva"] + sum(invoice.total_with_iva for invoice in invoices), 2
+                )
+                logger.info(f"Batch invoicing: {report['invoices']} invoices, {report['items']} items")
+                if progress:
+                    progress(report)
+        elapsed = time.perf_counter() - started
+        report["elapsed_seconds"] = round(elapsed, 3)
+        report["items_per_second"] = round(report["items"] / elapsed, 1) if elapsed and not dry_run else None
+        return report
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in batch invoicing run: {e}")
+        raise
+    finally:
+        _run_lock.release()
@@ -0,0 +1,147 @@
+import json
+import logging
+from collections.abc import Mapping
+from datetime import date, datetime
+
+from sqlalchemy import func, insert
+
+from models.change import Change
+from services.include_service import HIDDEN_COLUMNS
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("create", "update", "delete", "archive")
+
+# Actions recorded without the record (tombstones)
+TOMBSTONE_ACTIONS = ("delete", "archive")
+
+# Resources logged only so that the server processes follow them (services.sync_service):
+# token revocations carry token and employee IDs and are never served by the public feed
+INTERNAL_RESOURCES = ("revoked_token",)
+
+# Changes returned per page of the feed
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _to_json(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _entry(model, action, row):
+    """
+    The change_log values for one record; row is a model instance or a mapping of its columns.
+    """
+    values = row if isinstance(row, Mapping) else {name: getattr(row, name) for name in model.__table__.columns.keys()}
+    record_id = values[model.__table__.primary_key.columns[0].name]
+    data = None
+    if action not in TOMBSTONE_ACTIONS:
+        data = json.dumps({
+            name: _to_json(value) for name, value in values.items() if name not in HIDDEN_COLUMNS
+        })
+    return {"resource": model.__tablename__, "record_id": record_id, "action": action, "data": data}
+
+
+def record_change(action, entity):
+    """
+    Append a change to the feed, inside the caller's transaction so that it is committed
+    (or rolled back) with the change itself. The entity must already be flushed so that
+    its primary key is known; for deletes, call it before or after db.session.delete().
+    Pending changes are flushed first, so that an update is recorded with its new version.
+    :param action: 'create', 'update' or 'delete'.
+    :param entity: The model instance that changed.
+    :return: dict: The change log entry (seq, resource, record_id, action, data as JSON text).
+    """
+    db.session.flush()
+    entry = _entry(type(entity), action, entity)
+    entry["seq"] = db.session.scalar(insert(Change).values(entry).returning(Change.seq))
+    return entry
+
+
+def record_changes(model, action, rows):
+    """
+    Append the changes of a set-based statement (bulk insert) to the feed, in one
+    statement, inside the caller's transaction.
+    :param model: The SQLAlchemy model of the rows.
+    :param action: 'create', 'update', 'delete' or 'archive'.
+    :param rows: Mappings holding every column of the changed rows (e.g. from RETURNING), or
+                 only the primary key for deletes and archiving.
+    :return: list: The change log entries, as returned by record_change.
+    """
+    entries = [_entry(model, action, row) for row in rows]
+    if entries:
+        seqs = db.session.scalars(insert(Change).returning(Change.seq, sort_by_parameter_order=True), entries).all()
+        for entry, seq in zip(entries, seqs):
+            entry["seq"] = seq
+    return entries
+
+
+def latest_seq():
+    """
+    The sequence number of the newest change (0 when the feed is empty).
+    """
+    return db.session.scalar(db.select(func.max(Change.seq))) or 0
+
+
+def get_changes_after(since, resources, record_ids=None, limit=MAX_PAGE_SIZE, include_internal=False):
+    """
+    The change log entries of some resources after a sequence number, oldest first, in
+    the form published to the change stream (used to resume an event stream).
+    :param resources: Resources to include, or None for all.
+    :param record_ids: Optional record IDs to include.
+    :param include_internal: Also return the INTERNAL_RESOURCES (for the process sync only).
+    :return: list: Entries (seq, resource, record_id, action, data as JSON text).
+    """
+    query = Change.query.filter(Change.seq > since)
+    if not include_internal:
+        query = query.filter(Change.resource.not_in(INTERNAL_RESOURCES))
+    if resources is not None:
+        query = query.filter(Change.resource.in_(resources))
+    if record_ids:
+        query = query.filter(Change.record_id.in_(record_ids))
+    return [
+        {"seq": change.seq, "resource": change.resource, "record_id": change.record_id,
+         "action": change.action, "data": change.data}
+        for change in query.order_by(Change.seq).limit(limit)
+    ]
+
+
+def _serialize_change(change):
+    return {
+        "seq": change.seq,
+        "resource": change.resource,
+        "record_id": change.record_id,
+        "action": change.action,
+        "data": json.loads(change.data) if change.data else None,
+        "changed_at": change.changed_at,
+    }
+
+
+def get_changes(since=0, limit=DEFAULT_PAGE_SIZE):
+    """
+    Read the feed after a sequence number, oldest first. SQLite has a single writer, so
+    sequence numbers are committed in increasing order: a client that resumes from the
+    last seq it received never misses a change committed later with a lower one.
+    The INTERNAL_RESOURCES are left out, so sequence numbers may skip.
+    :param since: The last sequence number the client has applied (0 for all changes).
+    :param limit: Maximum number of changes returned.
+    :return: dict: 'changes', 'next_since' (the seq to resume from), 'has_more', and
+             'latest_seq' (the newest change, e.g. to start from after a full download).
+    """
+    try:
+        changes = (
+            Change.query.filter(Change.seq > since, Change.resource.not_in(INTERNAL_RESOURCES))
+            .order_by(Change.seq).limit(limit + 1).all()
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        return {
+            "changes": [_serialize_change(change) for change in changes],
+            "next_since": changes[-1].seq if changes else since,
+            "has_more": has_more,
+            "latest_seq": latest_seq(),
+        }
+    except Exception as e:
+        logger.error(f"Error reading the change feed since {since}: {e}")
+        raise
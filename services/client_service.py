@@ -1,6 +1,13 @@
 import logging
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import Conflict, PreconditionFailed
 from utils.database import db
+from services.change_service import record_change
 from models.client import Client
+from services.search_service import index_document, remove_document
+from utils.concurrency import check_version, modified_concurrently
+from utils.cache import entity_cache
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +21,7 @@ def get_all_clients():
         return [
             {
                 "client_id": client.client_id,
+                "version": client.version,
                 "name": client.name,
                 "email": client.email,
                 "phone": client.phone,
@@ -38,6 +46,7 @@ def get_client(client_id):
             return None
         return {
             "client_id": client.client_id,
+            "version": client.version,
             "name": client.name,
             "email": client.email,
             "phone": client.phone,
@@ -56,25 +65,35 @@ def create_client(name, email, phone, address):
     :param phone: The phone number of the client.
     :param address: The address of the client.
     :return: tuple: A dictionary containing the newly created client's information and the HTTP status code.
+    :raises Conflict: If a unique value of the client is already taken.
     """
     try:
         client = Client(name=name, email=email, phone=phone, address=address)
         db.session.add(client)  # Save the new client to the database
+        db.session.flush()  # Assign the client ID
+        index_document("client", client)  # Keep the search index in the same transaction
+        record_change("create", client)  # Feed the change log in the same transaction
         db.session.commit() # Save the new client to the database
         return {
             "client_id": client.client_id,
+            "version": client.version,
             "name": client.name,
             "email": client.email,
             "phone": client.phone,
             "address": client.address,
             "created_at": client.created_at,
         }
+    except IntegrityError as e:
+        db.session.rollback()
+        logger.error(f"Error creating client: {e}")
+        raise Conflict("The client conflicts with an existing record (a unique value is already taken).")
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error creating client: {e}")
-        return {"error": "Internal Server Error"}
+        raise
 
 
-def update_client(client_id, name, email, phone, address):
+def update_client(client_id, name=None, email=None, phone=None, address=None, expected_versions=None):
     """
     Update an existing client.
     :param client_id: The ID of the client to update.
@@ -82,6 +101,7 @@ def update_client(client_id, name, email, phone, address):
     :param email: The new email of the client.
     :param phone: The new phone number of the client.
     :param address: The new address of the client.
+    :param expected_versions: The versions the client read (If-Match), or None to skip the check.
     :return: tuple: A dictionary containing the updated client's information or an error message and the HTTP status code.
     """
     try:
@@ -90,24 +110,35 @@ def update_client(client_id, name, email, phone, address):
 
         if not client:
             return None
+        check_version(client, expected_versions, f"Client {client_id}")
 
         # Update the fields if new values are provided (they can be optional)
         client.name = name if name else client.name
         client.email = email if email else client.email
         client.phone = phone if phone else client.phone
         client.address = address if address else client.address
+        index_document("client", client)
 
         # Commit the changes to the database
+        record_change("update", client)
         db.session.commit()
+        entity_cache("client").invalidate(client_id)
         # Return updated client information
         return {
             "client_id": client.client_id,
+            "version": client.version,
             "name": client.name,
             "email": client.email,
             "phone": client.phone,
             "address": client.address,
             "created_at": client.created_at,
         }
+    except PreconditionFailed:
+        db.session.rollback()
+        raise
+    except StaleDataError:
+        db.session.rollback()
+        raise modified_concurrently(f"Client {client_id}")
     except Exception as e:
         # If an error occurs, rollback the transaction
         db.session.rollback()
@@ -125,8 +156,11 @@ def delete_client(client_id):
             return None
         # Delete the client
         db.session.delete(client)
+        remove_document("client", client_id)
         # Commit the deletion
+        record_change("delete", client)
         db.session.commit()
+        entity_cache("client").invalidate(client_id)
         return client
     except Exception as e:
         logger.error(f"Error deleting client {client_id}: {e}")
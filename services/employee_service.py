@@ -1,10 +1,21 @@
 import logging
+from sqlalchemy import and_, case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import Conflict, PreconditionFailed
 from models.employee import Employee
+from models.task import Task
+from utils.concurrency import check_version, modified_concurrently
+from utils.cache import ResultCache, entity_cache
 from utils.database import db
-from datetime import datetime
+from services.change_service import record_change
+from services.auth_service import apply_revocation, revoke_employee_tokens
 
 logger = logging.getLogger(__name__)
 
+# Workload reports per (from, to) range; cleared whenever tasks or employees change
+workload_cache = ResultCache(maxsize=128)
+
 def get_all_employees():
     """
     Retrieve all employees.
@@ -12,7 +23,7 @@ def get_all_employees():
     """
     try:
         employees = Employee.query.all()
-        return [{"employee_id": employee.employee_id, "name": employee.name, "email": employee.email, "phone": employee.phone, "role": employee.role, "hired_date": employee.hired_date, "created_at": employee.created_at} for employee in employees]
+        return [{"employee_id": employee.employee_id, "version": employee.version, "name": employee.name, "email": employee.email, "phone": employee.phone, "role": employee.role, "hired_date": employee.hired_date, "created_at": employee.created_at} for employee in employees]
     except Exception as e:
         logger.error(f"Error fetching all employees: {e}")
         return {"error": "Internal Server Error"}
@@ -31,6 +42,7 @@ def get_employee(employee_id):
         # Return employee data as a dictionary
         return {
             "employee_id": employee.employee_id,
+            "version": employee.version,
             "name": employee.name,
             "email": employee.email,
             "phone": employee.phone,
@@ -51,23 +63,26 @@ def create_employee(name, email, phone, role, hired_date):
     :param role: The role of the employee.
     :param hired_date: The date the employee was hired.
     :return: dict: A dictionary containing the created employee's information.
+    :raises Conflict: If a unique value of the employee is already taken.
     """
     try:
-        # Convert hired_date string to datetime.date object
-        hired_date_obj = datetime.strptime(hired_date, "%Y-%m-%d").date()
-        employee = Employee(name=name, email=email, phone=phone, role=role, hired_date=hired_date_obj)
+        employee = Employee(name=name, email=email, phone=phone, role=role, hired_date=hired_date)
         db.session.add(employee)  # Save the new employee to the database
+        db.session.flush()  # Assign the employee ID
+        record_change("create", employee)  # Feed the change log in the same transaction
         db.session.commit()
-        return {"employee_id": employee.employee_id, "name": employee.name, "email": employee.email, "phone": employee.phone, "role": employee.role, "hired_date": employee.hired_date, "created_at": employee.created_at}
+        workload_cache.clear()
+        return {"employee_id": employee.employee_id, "version": employee.version, "name": employee.name, "email": employee.email, "phone": employee.phone, "role": employee.role, "hired_date": employee.hired_date, "created_at": employee.created_at}
+    except IntegrityError as e:
+        db.session.rollback()
+        logger.error(f"Error creating employee: {e}")
+        raise Conflict("The employee conflicts with an existing record (a unique value is already taken).")
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error creating employee: {e}")
-        return {"error": "Internal Server Error"}
-
+        raise
 
-from datetime import datetime
-
-
-def update_employee(employee_id, name, email, phone, role, hired_date):
+def update_employee(employee_id, name=None, email=None, phone=None, role=None, hired_date=None, expected_versions=None):
     """
     Update an existing employee.
     :param employee_id: The ID of the employee to update.
@@ -76,28 +91,31 @@ def update_employee(employee_id, name, email, phone, role, hired_date):
     :param phone: The new phone number of the employee.
     :param role: The new role of the employee (mechanic, manager, admin).
     :param hired_date: The new hired date of the employee.
+    :param expected_versions: The versions the client read (If-Match), or None to skip the check.
     :return: tuple: A dictionary containing the updated employee's information or an error message and the HTTP status code.
     """
     try:
-        # Convert hired_date string to datetime.date object
-        hired_date_obj = datetime.strptime(hired_date, "%Y-%m-%d").date()
-
         # Get the employee from the database
         employee = Employee.query.get(employee_id)
         if not employee:
             return {"error": f"Employee with ID {employee_id} not found."}, 404
+        check_version(employee, expected_versions, f"Employee {employee_id}")
 
-        # Update the employee's attributes
-        employee.name = name
-        employee.email = email
-        employee.phone = phone
-        employee.role = role
-        employee.hired_date = hired_date_obj  # Update hired date
+        # Update the attributes given, keep the others
+        employee.name = name if name else employee.name
+        employee.email = email if email else employee.email
+        employee.phone = phone if phone is not None else employee.phone
+        employee.role = role if role else employee.role
+        employee.hired_date = hired_date if hired_date else employee.hired_date
 
+        record_change("update", employee)
         db.session.commit()  # Commit the transaction
+        entity_cache("employee").invalidate(employee_id)
+        workload_cache.clear()
 
         return {
             "employee_id": employee.employee_id,
+            "version": employee.version,
             "name": employee.name,
             "email": employee.email,
             "phone": employee.phone,
@@ -106,6 +124,12 @@ def update_employee(employee_id, name, email, phone, role, hired_date):
             "created_at": employee.created_at,
         }
 
+    except PreconditionFailed:
+        db.session.rollback()
+        raise
+    except StaleDataError:
+        db.session.rollback()
+        raise modified_concurrently(f"Employee {employee_id}")
     except Exception as e:
         db.session.rollback()  # Rollback on error
         logger.error(f"Error updating employee {employee_id}: {e}")
@@ -121,9 +145,79 @@ def delete_employee(employee_id):
         employee = Employee.query.get(employee_id)
         if not employee:
             return None
-        employee.delete()  # Delete the employee from the database
+        db.session.delete(employee)  # Delete the employee from the database
+        record_change("delete", employee)
+        revocation = revoke_employee_tokens(employee_id)  # Tokens already issued stop working too
+        db.session.commit()
+        entity_cache("employee").invalidate(employee_id)
+        workload_cache.clear()
+        apply_revocation(revocation)
         return employee
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error deleting employee {employee_id}: {e}")
         return {"error": "Internal Server Error"}, 500
 
+
+
+def get_workload(date_from, date_to):
+    """
+    Compute the workload of every employee over a date range, in one grouped query.
+    A task counts when its [start_date, end_date] period overlaps the range (a task without
+    end_date lasts one day); days booked only count the days inside the range.
+    Results are cached per range until a task or employee changes.
+    :param date_from: First day of the range (datetime.date).
+    :param date_to: Last day of the range (datetime.date).
+    :return: list: A list of dictionaries with the workload of each employee.
+    """
+    cached = workload_cache.get((date_from, date_to))
+    if cached is not None:
+        return cached
+    # Read before querying: a workload computed while a task or employee changes is not cached
+    generation = workload_cache.generation
+    try:
+        task_end = func.coalesce(Task.end_date, Task.start_date)
+        # A task without status is open; the LEFT JOIN's NULL rows (no task at all) are not
+        active = Task.task_id.isnot(None) & (Task.status.is_(None) | Task.status.in_(("pending", "in_progress")))
+        booked = Task.status.is_(None) | (Task.status != "cancelled")  # NULL != 'cancelled' is not true in SQL
+        booked_days = (
+            func.julianday(func.min(task_end, date_to)) - func.julianday(func.max(Task.start_date, date_from)) + 1
+        )
+        rows = (
+            db.session.query(
+                Employee.employee_id,
+                Employee.name,
+                func.count(Task.task_id).label("tasks"),
+                func.coalesce(func.sum(case((booked, booked_days), else_=0)), 0).label("days_booked"),
+                func.coalesce(func.sum(case((active, 1), else_=0)), 0).label("open_tasks"),
+                func.coalesce(func.sum(case((Task.status == "completed", 1), else_=0)), 0).label("finished_tasks"),
+                func.coalesce(func.sum(case((Task.status == "cancelled", 1), else_=0)), 0).label("cancelled_tasks"),
+            )
+            # Range conditions live in the join so employees without tasks are still listed;
+            # (employee_id, start_date) is served by the ix_task_employee_dates composite index
+            .outerjoin(Task, and_(
+                Task.employee_id == Employee.employee_id,
+                Task.start_date <= date_to,
+                task_end >= date_from,
+            ))
+            .group_by(Employee.employee_id, Employee.name)
+            .order_by(Employee.employee_id)
+            .all()
+        )
+        workload = [
+            {
+                "employee_id": row.employee_id,
+                "name": row.name,
+                "tasks": row.tasks,
+                "days_booked": int(row.days_booked),
+                "open_tasks": row.open_tasks,
+                "finished_tasks": row.finished_tasks,
+                "cancelled_tasks": row.cancelled_tasks,
+            }
+            for row in rows
+        ]
+        workload_cache.set((date_from, date_to), workload, generation=generation)
+        return workload
+    except Exception as e:
+        logger.error(f"Error computing workload from {date_from} to {date_to}: {e}")
+        raise
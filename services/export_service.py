@@ -0,0 +1,76 @@
+import csv
+import io
+import logging
+
+from sqlalchemy import select
+
+from models.invoice import Invoice
+from models.task import Task
+from models.work import Work
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Resources that can be exported as CSV
+EXPORTABLE = {
+    "invoice": Invoice,
+    "work": Work,
+    "task": Task,
+}
+
+# Rows fetched from the database cursor (and written to the response) per batch
+EXPORT_BATCH_SIZE = 1000
+
+
+def resolve_columns(model, requested=None):
+    """
+    Validate a column selection against the model.
+    :param model: SQLAlchemy model class.
+    :param requested: List of column names, or None for every column.
+    :return: list: The selected Column objects, in the requested order.
+    :raises ValueError: If a requested column does not exist.
+    """
+    columns = model.__table__.columns
+    if not requested:
+        return list(columns)
+    unknown = [name for name in requested if name not in columns]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}. Available: {', '.join(columns.keys())}.")
+    return [columns[name] for name in requested]
+
+
+def iter_csv(model, columns, filters=()):
+    """
+    Stream a table as CSV, without ever holding more than one batch in memory.
+    Rows come from a server-side cursor in EXPORT_BATCH_SIZE partitions; each partition
+    is encoded and yielded before the next one is fetched.
+    :param model: SQLAlchemy model class.
+    :param columns: The Column objects to export (see resolve_columns).
+    :param filters: SQLAlchemy filter conditions (see utils.filters.build_filters).
+    :return: generator: CSV text chunks, header first.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow([column.name for column in columns])
+    yield buffer.getvalue()
+
+    primary_key = model.__table__.primary_key.columns[0]
+    statement = (
+        select(*columns)
+        .where(*filters)
+        .order_by(primary_key)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    try:
+        result = db.session.execute(statement)
+        for partition in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(partition)
+            yield buffer.getvalue()
+    except Exception as e:
+        logger.error(f"Error exporting {model.__tablename__}: {e}")
+        raise
+    finally:
+        db.session.rollback()  # Release the read transaction as soon as the stream ends
@@ -0,0 +1,237 @@
+import csv
+import io
+import json
+import logging
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models.client import Client
+from models.vehicle import Vehicle
+from services.change_service import record_changes
+from services.search_service import SEARCH_INDEXES, index_new_documents
+from utils.database import db
+from utils.filters import coerce_value
+from utils.utils import normalize_plate
+
+logger = logging.getLogger(__name__)
+
+# Resources that can be bulk imported
+IMPORTABLE = {
+    "client": Client,
+    "vehicle": Vehicle,
+}
+
+# Columns computed from other columns instead of being read from the file
+DERIVED_COLUMNS = {
+    "vehicle": {"plate_key": lambda values: normalize_plate(values["license_plate"])},
+}
+
+FORMATS = ("csv", "ndjson")
+
+# Rejected rows listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_records(stream, fmt):
+    """
+    Parse an uploaded file incrementally, one record at a time.
+    :param stream: Binary file-like object (e.g. request.stream).
+    :param fmt: 'csv' (with a header line) or 'ndjson' (one JSON object per line).
+    :return: generator: (line number, record dict or None, parse error or None) tuples.
+    """
+    text_stream = io.TextIOWrapper(io.BufferedReader(stream), encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text_stream)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, "Too many fields"
+                continue
+            # Empty cells are missing values, so that nullable columns stay NULL
+            yield reader.line_num, {key: value for key, value in record.items() if value != ""}, None
+    else:
+        for line_number, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "Expected a JSON object"
+                continue
+            yield line_number, record, None
+
+
+def _importable_columns(resource):
+    """
+    Columns that may appear in an import file: everything but the primary key and derived columns.
+    """
+    model = IMPORTABLE[resource]
+    derived = DERIVED_COLUMNS.get(resource, {})
+    return {
+        column.name: column
+        for column in model.__table__.columns
+        if not column.primary_key and column.name not in derived
+    }
+
+
+def validate_record(resource, record):
+    """
+    Check a record against the model metadata and convert its values to the column types.
+    :param resource: The resource name (a key of IMPORTABLE).
+    :param record: The parsed record.
+    :return: tuple: (values dict, None) if valid, or (None, error message).
+    """
+    columns = _importable_columns(resource)
+    unknown = [name for name in record if name not in columns]
+    if unknown:
+        return None, f"Unknown field(s): {', '.join(unknown)}"
+
+    values = {}
+    for name, column in columns.items():
+        value = record.get(name)
+        if value is None:
+            if not column.nullable and column.default is None and column.server_default is None:
+                return None, f"Missing required field '{name}'"
+            continue
+        try:
+            value = coerce_value(column, value if isinstance(value, str) else str(value))
+        except (TypeError, ValueError):
+            return None, f"Invalid value for '{name}': {record[name]!r}"
+        length = getattr(column.type, "length", None)
+        if length and isinstance(value, str) and len(value) > length:
+            return None, f"'{name}' is longer than {length} characters"
+        values[name] = value
+
+    for name, derive in DERIVED_COLUMNS.get(resource, {}).items():
+        values[name] = derive(values)
+    return values, None
+
+
+def _check_constraints(model, batch):
+    """
+    Find the rows of a batch that would break a unique or foreign key constraint,
+    with one query per constrained column instead of one per row.
+    :param batch: List of (line number, values) pairs.
+    :return: dict: line number -> error message.
+    """
+    errors = {}
+    for column in model.__table__.columns:
+        if column.unique:
+            wanted = {values[column.name] for _, values in batch if values.get(column.name) is not None}
+            taken = set(db.session.scalars(select(column).where(column.in_(wanted)))) if wanted else set()
+            for line_number, values in batch:
+                value = values.get(column.name)
+                if value is None:
+                    continue
+                if value in taken:
+                    errors.setdefault(line_number, f"Duplicate {column.name} '{value}'")
+                taken.add(value)  # Later rows of the batch may not reuse it either
+        for foreign_key in column.foreign_keys:
+            target = foreign_key.column
+            wanted = {values[column.name] for _, values in batch if values.get(column.name) is not None}
+            found = set(db.session.scalars(select(target).where(target.in_(wanted)))) if wanted else set()
+            for line_number, values in batch:
+                value = values.get(column.name)
+                if value is not None and value not in found:
+                    errors.setdefault(line_number, f"{target.table.name} {value} does not exist")
+    return errors
+
+
+def _insert_batch(resource, batch):
+    """
+    Insert a batch of validated rows, index them for search and add them to the change
+    feed, inside the current transaction.
+    :return: int: The number of inserted rows.
+    """
+    model = IMPORTABLE[resource]
+    table = model.__table__
+    rows = db.session.execute(insert(model).returning(*table.columns), [values for _, values in batch]).mappings().all()
+    if resource in SEARCH_INDEXES:
+        index_new_documents(resource, rows)
+    record_changes(model, "create", rows)
+    return len(batch)
+
+
+def _reject(report, line_number, error):
+    report["rejected"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line_number, "error": error})
+
+
+def _flush_batch(resource, batch, report):
+    """
+    Write one batch in its own transaction. If the database still refuses it (e.g. a row
+    inserted concurrently), retry the rows one by one so that only the offending ones are rejected.
+    """
+    model = IMPORTABLE[resource]
+    errors = _check_constraints(model, batch)
+    for line_number, error in errors.items():
+        _reject(report, line_number, error)
+    valid = [(line_number, values) for line_number, values in batch if line_number not in errors]
+
+    try:
+        report["imported"] += _insert_batch(resource, valid) if valid else 0
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        for line_number, values in valid:
+            try:
+                with db.session.begin_nested():
+                    report["imported"] += _insert_batch(resource, [(line_number, values)])
+            except IntegrityError as e:
+                _reject(report, line_number, str(e.orig))
+        db.session.commit()
+    report["batches"] += 1
+
+
+def import_records(resource, stream, fmt="csv", batch_size=500, progress=None):
+    """
+    Bulk import a streamed CSV or NDJSON file.
+    The file is read incrementally and written in batches of batch_size rows, each one
+    committed on its own, so memory use does not depend on the file size and an error
+    late in the file does not undo the batches already imported.
+    :param resource: The resource name (a key of IMPORTABLE).
+    :param stream: Binary file-like object (e.g. request.stream).
+    :param fmt: 'csv' or 'ndjson'.
+    :param batch_size: Rows inserted per transaction.
+    :param progress: Optional callable, called with the report after each batch.
+    :return: dict: The import report (processed, imported and rejected counts, first errors).
+    """
+    if resource not in IMPORTABLE:
+        raise ValueError(f"Resource '{resource}' cannot be imported.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+
+    report = {"resource": resource, "processed": 0, "imported": 0, "rejected": 0, "batches": 0, "errors": []}
+    started = time.perf_counter()
+    batch = []
+    try:
+        for line_number, record, error in iter_records(stream, fmt):
+            report["processed"] += 1
+            values = None
+            if error is None:
+                values, error = validate_record(resource, record)
+            if error is not None:
+                _reject(report, line_number, error)
+                continue
+            batch.append((line_number, values))
+            if len(batch) >= batch_size:
+                _flush_batch(resource, batch, report)
+                batch = []
+                logger.info(f"Import {resource}: {report['processed']} rows processed, {report['imported']} imported")
+                if progress:
+                    progress(report)
+        if batch:
+            _flush_batch(resource, batch, report)
+            if progress:
+                progress(report)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error importing {resource} after {report['imported']} rows: {e}")
+        raise
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return report
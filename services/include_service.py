@@ -0,0 +1,86 @@
+import logging
+from datetime import date, datetime
+
+from models.client import Client
+from models.employee import Employee
+from models.invoice import Invoice
+from models.invoice_item import Invoice_item
+from models.task import Task
+from models.vehicle import Vehicle
+from models.work import Work
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Resources that can be sideloaded, by table name
+INCLUDABLE = {model.__tablename__: model for model in (Client, Employee, Vehicle, Work, Task, Invoice, Invoice_item)}
+
+# Internal columns never returned by the API
+HIDDEN_COLUMNS = {"plate_key", "password_hash"}
+
+# Values per IN (...) query, well below SQLite's bound parameter limit
+IN_CHUNK_SIZE = 500
+
+
+def _primary_key(model):
+    return model.__table__.primary_key.columns[0].name
+
+
+def relations(model):
+    """
+    The resources related to a model through the foreign keys declared in models/:
+    the ones it references ('task' -> 'employee', 'work') and the ones referencing it
+    ('invoice' -> 'invoice_item').
+    :return: dict: name -> (related model, column holding the key in the records, column to match in the related table).
+    """
+    found = {}
+    for column in model.__table__.columns:
+        for foreign_key in column.foreign_keys:
+            related = INCLUDABLE.get(foreign_key.column.table.name)
+            if related is not None:
+                found[related.__tablename__] = (related, column.name, foreign_key.column.name)
+    for related in INCLUDABLE.values():
+        for column in related.__table__.columns:
+            for foreign_key in column.foreign_keys:
+                if foreign_key.column.table is model.__table__:
+                    found.setdefault(related.__tablename__, (related, foreign_key.column.name, column.name))
+    return found
+
+
+def _to_json(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _serialize(model, row):
+    return {
+        column.name: _to_json(getattr(row, column.name))
+        for column in model.__table__.columns
+        if column.name not in HIDDEN_COLUMNS
+    }
+
+
+def load_included(model, records, names):
+    """
+    Load the related records of a page of results, with one IN query per related
+    resource (chunked for large pages), deduplicated by primary key.
+    :param model: SQLAlchemy model of the records.
+    :param records: The records, as dictionaries (e.g. marshalled API output).
+    :param names: The related resources to load (keys of relations(model)).
+    :return: dict: name -> list of related records, ordered by primary key.
+    """
+    available = relations(model)
+    included = {}
+    try:
+        for name in names:
+            related, local_column, remote_column = available[name]
+            keys = sorted({record[local_column] for record in records if record.get(local_column) is not None})
+            match = getattr(related, remote_column)
+            rows = {}
+            for offset in range(0, len(keys), IN_CHUNK_SIZE):
+                for row in related.query.filter(match.in_(keys[offset:offset + IN_CHUNK_SIZE])):
+                    rows[getattr(row, _primary_key(related))] = _serialize(related, row)
+            included[name] = [rows[key] for key in sorted(rows)]
+        return included
+    except Exception as e:
+        logger.error(f"Error loading included resources {names} for {model.__tablename__}: {e}")
+        raise
@@ -1,19 +1,30 @@
 import logging
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import Conflict, PreconditionFailed
 from models.invoice_item import Invoice_item
 from utils.database import db
+from services.archive_service import get_archived, get_archived_one
+from services.change_service import record_change
+from utils.concurrency import check_version, modified_concurrently
+from utils.cache import entity_cache
 
 logger = logging.getLogger(__name__)
 
-def get_all_invoice_items():
+def get_all_invoice_items(include_archived=False):
     """
     Retrieve all invoice_items.
+    :param include_archived: Also return the archived invoice items, after the hot ones.
     :return: list: A list of dictionaries containing information about all invoice_items.
     """
     try:
         invoice_items = Invoice_item.query.all()
+        if include_archived:
+            invoice_items += get_archived(Invoice_item)
         return [
             {
                 "item_id": invoice_item.item_id,
+                "version": invoice_item.version,
                 "cost": invoice_item.cost,
                 "description": invoice_item.description,
                 "invoice_id": invoice_item.invoice_id,
@@ -25,18 +36,22 @@ def get_all_invoice_items():
         logger.error(f"Error fetching all invoice_items: {e}")
         return {"error": "Internal Server Error"}
 
-def get_invoice_item(item_id):
+def get_invoice_item(item_id, include_archived=False):
     """
     Retrieve an invoice_item by ID.
     :param item_id: The ID of the invoice_item to retrieve.
+    :param include_archived: Also look in the archive table.
     :return: dict: A dictionary containing the invoice_item's information or an error message.
     """
     try:
         invoice_item = Invoice_item.query.get(item_id)
+        if not invoice_item and include_archived:
+            invoice_item = get_archived_one(Invoice_item, item_id)
         if not invoice_item:
             return None
         return {
             "item_id": invoice_item.item_id,
+            "version": invoice_item.version,
             "cost": invoice_item.cost,
             "description": invoice_item.description,
             "invoice_id": invoice_item.invoice_id,
@@ -53,7 +68,8 @@ def create_invoice_item(cost, description, invoice_id, task_id):
     :param description: Description of the invoice_item.
     :param invoice_id: The ID of the associated invoice
     :param task_id: The ID of the associated task.
-    :return: dict: A dictionary containing the newly created invoice_item's information or an error message.
+    :return: dict: A dictionary containing the newly created invoice_item's information.
+    :raises Conflict: If a unique value of the invoice item is already taken.
     """
     try:
         invoice_item = Invoice_item(
@@ -63,20 +79,27 @@ def create_invoice_item(cost, description, invoice_id, task_id):
             task_id=task_id,
         )
         db.session.add(invoice_item)
+        db.session.flush()  # Assign the invoice item ID
+        record_change("create", invoice_item)  # Feed the change log in the same transaction
         db.session.commit()
         return {
             "item_id": invoice_item.item_id,
+            "version": invoice_item.version,
             "cost": invoice_item.cost,
             "description": invoice_item.description,
             "invoice_id": invoice_item.invoice_id,
             "task_id": invoice_item.task_id,
         }
+    except IntegrityError as e:
+        db.session.rollback()
+        logger.error(f"Error creating invoice_item: {e}")
+        raise Conflict("The invoice item conflicts with an existing record (a unique value is already taken).")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error creating invoice_item: {e}")
-        return {"error": "Internal Server Error"}
+        raise
 
-def update_invoice_item(item_id, cost=None, description=None, invoice_id=None, task_id=None):
+def update_invoice_item(item_id, cost=None, description=None, invoice_id=None, task_id=None, expected_versions=None):
     """
     Update an existing invoice_item.
     :param item_id: The ID of the invoice_item to update.
@@ -84,26 +107,37 @@ def update_invoice_item(item_id, cost=None, description=None, invoice_id=None, t
     :param description: The updated description.
     :param invoice_id: The updated invoice ID.
     :param task_id: The updated task ID.
+    :param expected_versions: The versions the client read (If-Match), or None to skip the check.
     :return: dict: A dictionary containing the updated invoice_item's information or an error message.
     """
     try:
         invoice_item = Invoice_item.query.get(item_id)
         if not invoice_item:
             return None
+        check_version(invoice_item, expected_versions, f"Invoice item {item_id}")
 
         invoice_item.cost = cost if cost is not None else invoice_item.cost
         invoice_item.description = description if description else invoice_item.description
         invoice_item.invoice_id = invoice_id if invoice_id else invoice_item.invoice_id
         invoice_item.task_id = task_id if task_id else invoice_item.task_id
 
+        record_change("update", invoice_item)
         db.session.commit()
+        entity_cache("invoice_item").invalidate(item_id)
         return {
             "item_id": invoice_item.item_id,
+            "version": invoice_item.version,
             "cost": invoice_item.cost,
             "description": invoice_item.description,
             "invoice_id": invoice_item.invoice_id,
             "task_id": invoice_item.task_id,
         }
+    except PreconditionFailed:
+        db.session.rollback()
+        raise
+    except StaleDataError:
+        db.session.rollback()
+        raise modified_concurrently(f"Invoice item {item_id}")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating invoice_item {item_id}: {e}")
@@ -120,7 +154,9 @@ def delete_invoice_item(item_id):
         if not invoice_item:
             return None
         db.session.delete(invoice_item)
+        record_change("delete", invoice_item)
         db.session.commit()
+        entity_cache("invoice_item").invalidate(item_id)
         return {"message": f"invoice_item {item_id} deleted successfully"}
     except Exception as e:
         db.session.rollback()
@@ -1,19 +1,33 @@
 import logging
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import Conflict, PreconditionFailed
 from models.invoice import Invoice
+from services.invoice_summary_service import apply_invoices
 from utils.database import db
+from services.archive_service import get_archived, get_archived_one
+from services.change_service import record_change
+from utils.concurrency import check_version, modified_concurrently
+from utils.cache import entity_cache
 
 logger = logging.getLogger(__name__)
 
-def get_all_invoices():
+def get_all_invoices(filters=(), archived_filters=None):
     """
-    Retrieve all works.
-    :return: list: A list of dictionaries containing information about all works.
+    Retrieve all invoices.
+    :param filters: Optional SQLAlchemy filter conditions (see utils.filters.build_filters).
+    :param archived_filters: Filter conditions on the archive table; when given, the matching archived
+                             records are returned too, after the hot ones.
+    :return: list: A list of dictionaries containing information about all invoices.
     """
     try:
-        invoices = Invoice.query.all()
+        invoices = Invoice.query.filter(*filters).all()
+        if archived_filters is not None:
+            invoices += get_archived(Invoice, archived_filters)
         return [
             {
                 "invoice_id": invoice.invoice_id,
+                "version": invoice.version,
                 "issued_at": invoice.issued_at,
                 "iva": invoice.iva,
                 "total": invoice.total,
@@ -26,18 +40,22 @@ def get_all_invoices():
         logger.error(f"Error fetching all invoices: {e}")
         return {"error": "Internal Server Error"}
 
-def get_invoice(invoice_id):
+def get_invoice(invoice_id, include_archived=False):
     """
     Retrieve an invoice by ID.
     :param invoice_id: The ID of the invoice to retrieve.
+    :param include_archived: Also look in the archive table.
     :return: dict: A dictionary containing the invoice's information or an error message.
     """
     try:
         invoice = Invoice.query.get(invoice_id)
+        if not invoice and include_archived:
+            invoice = get_archived_one(Invoice, invoice_id)
         if not invoice:
             return None
         return {
             "invoice_id": invoice.invoice_id,
+            "version": invoice.version,
             "issued_at": invoice.issued_at,
             "iva": invoice.iva,
             "total": invoice.total,
@@ -56,7 +74,8 @@ def create_invoice(iva, total, total_with_iva, client_id):
     :param total: Total value (without iva) of the invoice.
     :param total_with_iva: Total value (with iva) of the invoice.
     :param client_id: The ID of the associated client.
-    :return: dict: A dictionary containing the newly created invoice's information or an error message.
+    :return: dict: A dictionary containing the newly created invoice's information.
+    :raises Conflict: If a unique value of the invoice is already taken.
     """
     try:
         invoice = Invoice(
@@ -66,21 +85,29 @@ def create_invoice(iva, total, total_with_iva, client_id):
             client_id=client_id,
         )
         db.session.add(invoice)
+        db.session.flush()  # Assign the invoice ID and issued_at
+        apply_invoices([invoice.invoice_id])  # Keep the monthly summary in the same transaction
+        record_change("create", invoice)  # Feed the change log in the same transaction
         db.session.commit()
         return {
             "invoice_id": invoice.invoice_id,
+            "version": invoice.version,
             "issued_at": invoice.issued_at,
             "iva": invoice.iva,
             "total": invoice.total,
             "total_with_iva": invoice.total_with_iva,
             "client_id": invoice.client_id,
         }
+    except IntegrityError as e:
+        db.session.rollback()
+        logger.error(f"Error creating invoice: {e}")
+        raise Conflict("The invoice conflicts with an existing record (a unique value is already taken).")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error creating invoice: {e}")
-        return {"error": "Internal Server Error"}
+        raise
 
-def update_invoice(invoice_id, iva=None, total=None, total_with_iva=None, client_id=None):
+def update_invoice(invoice_id, iva=None, total=None, total_with_iva=None, client_id=None, expected_versions=None):
     """
     Update an existing invoice.
     :param invoice_id: The ID of the invoice to update.
@@ -89,27 +116,41 @@ def update_invoice(invoice_id, iva=None, total=None, total_with_iva=None, client
     :param total: Updated total value (without iva) of the invoice.
     :param total_with_iva: Updated total value (with iva) of the invoice.
     :param client_id: Updated ID of the associated client.
+    :param expected_versions: The versions the client read (If-Match), or None to skip the check.
     :return: dict: A dictionary containing the updated invoice's information or an error message.
     """
     try:
         invoice = Invoice.query.get(invoice_id)
         if not invoice:
             return None
+        check_version(invoice, expected_versions, f"Invoice {invoice_id}")
 
+        apply_invoices([invoice_id], sign=-1)  # Take the old values out of the monthly summary
         invoice.iva = iva if iva is not None else invoice.iva
         invoice.total = total if total is not None else invoice.total
         invoice.total_with_iva = total_with_iva if total_with_iva is not None else invoice.total_with_iva
-        invoice.client_id = client_id if client_id is not None else invoice.vehicle_id
+        invoice.client_id = client_id if client_id is not None else invoice.client_id
+        db.session.flush()
+        apply_invoices([invoice_id])  # And put the new ones in
 
+        record_change("update", invoice)
         db.session.commit()
+        entity_cache("invoice").invalidate(invoice_id)
         return {
             "invoice_id": invoice.invoice_id,
+            "version": invoice.version,
             "issued_at": invoice.issued_at,
             "iva": invoice.iva,
             "total": invoice.total,
             "total_with_iva": invoice.total_with_iva,
             "client_id": invoice.client_id,
         }
+    except PreconditionFailed:
+        db.session.rollback()
+        raise
+    except StaleDataError:
+        db.session.rollback()
+        raise modified_concurrently(f"Invoice {invoice_id}")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating invoice {invoice_id}: {e}")
@@ -125,8 +166,11 @@ def delete_invoice(invoice_id):
         invoice = Invoice.query.get(invoice_id)
         if not invoice:
             return None
+        apply_invoices([invoice_id], sign=-1)
         db.session.delete(invoice)
+        record_change("delete", invoice)
         db.session.commit()
+        entity_cache("invoice").invalidate(invoice_id)
         return {"message": f"Invoice {invoice_id} deleted successfully"}
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,123 @@
+import logging
+
+from sqlalchemy import Integer, cast, func, select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+
+from models.archive import InvoiceArchive
+from models.invoice import Invoice
+from models.invoice_summary import InvoiceSummary
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Supported report groupings: group_by value -> summary columns
+GROUPINGS = {
+    "month": ("year", "month"),
+    "year": ("year",),
+    "client": ("client_id",),
+    "month,client": ("year", "month", "client_id"),
+}
+
+
+def summary_select(sign=1, source=Invoice):
+    """
+    SELECT that aggregates invoices into (year, month, client_id) summary rows.
+    With sign=-1 it produces the rows to subtract.
+    :param source: Invoice, or InvoiceArchive for the archived invoices.
+    """
+    year = cast(func.strftime("%Y", source.issued_at), Integer)
+    month = cast(func.strftime("%m", source.issued_at), Integer)
+    return select(
+        year, month, source.client_id,
+        sign * func.count(),
+        sign * func.sum(source.total),
+        sign * func.sum(source.total_with_iva),
+    ).group_by(year, month, source.client_id)
+
+
+def _add_to_summary(rows):
+    """
+    Add summary rows (a summary_select) to the summary table, inside the caller's transaction.
+    """
+    columns = ["year", "month", "client_id", "invoice_count", "total", "total_with_iva"]
+    statement = insert(InvoiceSummary).from_select(columns, rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["year", "month", "client_id"],
+        set_={
+            "invoice_count": InvoiceSummary.invoice_count + statement.excluded.invoice_count,
+            "total": InvoiceSummary.total + statement.excluded.total,
+            "total_with_iva": InvoiceSummary.total_with_iva + statement.excluded.total_with_iva,
+        },
+    )
+    db.session.execute(statement)
+
+
+def apply_invoices(invoice_ids, sign=1):
+    """
+    Add (sign=1) or subtract (sign=-1) invoices to the monthly summary, inside the caller's
+    transaction. The invoices are read from the database, so call it after flushing a new
+    invoice, or before changing or deleting an existing one.
+    :param invoice_ids: IDs of the invoices.
+    :param sign: 1 to add the invoices, -1 to subtract them.
+    """
+    if not invoice_ids:
+        return
+    _add_to_summary(summary_select(sign).where(Invoice.invoice_id.in_(invoice_ids)))
+
+
+def rebuild_invoice_summary():
+    """
+    Regenerate the monthly summary from scratch with one set-based INSERT ... SELECT, then
+    add the archived invoices, which the summary keeps.
+    :return: int: The number of summary rows.
+    """
+    try:
+        db.session.query(InvoiceSummary).delete()
+        db.session.execute(insert(InvoiceSummary).from_select(
+            ["year", "month", "client_id", "invoice_count", "total", "total_with_iva"], summary_select()
+        ))
+        _add_to_summary(summary_select(source=InvoiceArchive))
+        db.session.commit()
+        return db.session.query(func.count()).select_from(InvoiceSummary).scalar()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error rebuilding the invoice summary: {e}")
+        raise
+
+
+def get_invoice_summary(period_from=None, period_to=None, group_by="month"):
+    """
+    Revenue report read from the summary table; its cost does not depend on invoice history size.
+    :param period_from: First month as a (year, month) tuple, or None for no lower bound.
+    :param period_to: Last month as a (year, month) tuple, or None for no upper bound.
+    :param group_by: One of GROUPINGS ('month', 'year', 'client', 'month,client').
+    :return: list: A list of dictionaries with the invoice count and totals of each group.
+    """
+    try:
+        keys = [getattr(InvoiceSummary, column) for column in GROUPINGS[group_by]]
+        query = db.session.query(
+            *keys,
+            func.sum(InvoiceSummary.invoice_count).label("invoice_count"),
+            func.sum(InvoiceSummary.total).label("total"),
+            func.sum(InvoiceSummary.total_with_iva).label("total_with_iva"),
+        )
+        # Row-value comparisons let SQLite range-scan the (year, month, client_id) primary key
+        if period_from:
+            query = query.filter(tuple_(InvoiceSummary.year, InvoiceSummary.month) >= tuple_(*period_from))
+        if period_to:
+            query = query.filter(tuple_(InvoiceSummary.year, InvoiceSummary.month) <= tuple_(*period_to))
+        rows = query.group_by(*keys).having(func.sum(InvoiceSummary.invoice_count) > 0).order_by(*keys).all()
+        return [
+            {
+                "year": getattr(row, "year", None),
+                "month": getattr(row, "month", None),
+                "client_id": getattr(row, "client_id", None),
+                "invoice_count": row.invoice_count,
+                "total": round(row.total, 2),
+                "total_with_iva": round(row.total_with_iva, 2),
+            }
+            for row in rows
+        ]
+    except Exception as e:
+        logger.error(f"Error fetching the invoice summary: {e}")
+        raise
@@ -0,0 +1,517 @@
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from models.job import Job
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Registered job types: name -> (function, maximum concurrent jobs of that type, parameter validator)
+JOB_TYPES = {}
+
+def job_type(name, concurrency=1, validate=None):
+    """
+    Register a job type. The function receives the job parameters and a JobContext,
+    and returns a JSON-serializable result.
+    :param concurrency: How many jobs of this type may run at the same time.
+    :param validate: Optional callable checking the parameters at enqueue time (raises ValueError).
+    """
+    def decorator(func):
+        JOB_TYPES[name] = (func, concurrency, validate)
+        return func
+    return decorator
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a running job when its cancellation was requested.
+    """
+
+
+class JobContext:
+    """
+    Handle given to a running job to report progress, notice cancellation and name its output file.
+    """
+
+    # Minimum seconds between two progress writes to the jobs table
+    PROGRESS_INTERVAL = 1.0
+
+    def __init__(self, runner, job_id):
+        self.runner = runner
+        self.job_id = job_id
+        self.result_path = None
+        self._last_progress = 0.0
+
+    def check_cancelled(self):
+        """
+        Stop the job (by raising JobCancelled) if its cancellation was requested.
+        """
+        if self.runner.is_cancel_requested(self.job_id):
+            raise JobCancelled()
+
+    def progress(self, report):
+        """
+        Record the job's progress (throttled), then honour any pending cancellation.
+        Long-running jobs should call it at safe points, e.g. after each committed batch.
+        :param report: JSON-serializable progress report.
+        """
+        now = time.monotonic()
+        if now - self._last_progress >= self.PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.runner.set_fields(self.job_id, progress=json.dumps(report, default=str))
+            self.runner.sync_cancel(self.job_id)
+        self.check_cancelled()
+
+    def output_file(self, filename):
+        """
+        Path of a file produced by the job; it is reported as the job's result location.
+        """
+        self.result_path = os.path.join(self.runner.results_dir, f"job-{self.job_id}-{filename}")
+        return self.result_path
+
+
+class JobRunner:
+    """
+    Runs jobs on a bounded thread pool, outside of the request threads.
+
+    Jobs are persisted in the jobs table, so their status survives the request that
+    created them. Each job type has its own concurrency limit: jobs over the limit wait
+    in a per-type queue instead of occupying a worker thread. Cancellation is
+    cooperative: queued jobs are dropped, running ones stop at their next progress call.
+    A process about to exit drains its runner; the jobs it leaves queued are taken over
+    by another process (recover).
+    """
+
+    def __init__(self):
+        self.app = None
+        self.results_dir = None
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = None
+        self._lock = threading.Lock()
+        self._running = {}  # job type -> number of running (or submitted) jobs
+        self._pending = {}  # job type -> deque of job IDs waiting for a slot
+        self._futures = {}  # job_id -> Future
+        self._cancelled = set()  # IDs of the running jobs asked to stop
+        self._draining = False  # Set once the process is exiting: no job is started any more
+
+    def init_app(self, app):
+        """
+        Bind the runner to the application and take over the jobs left by dead processes.
+        """
+        self.app = app
+        self.results_dir = app.config["JOB_RESULTS_DIR"]
+        os.makedirs(self.results_dir, exist_ok=True)
+        app.extensions["job_runner"] = self
+        with app.app_context():
+            self.recover()
+
+    def after_fork(self):
+        """
+        Start afresh in a forked child process (a server worker): the parent's threads are
+        not inherited, and the jobs it dispatched remain its own.
+        """
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = None
+        self._lock = threading.Lock()
+        self._running = {}
+        self._pending = {}
+        self._futures = {}
+        self._cancelled = set()
+        self._draining = False
+
+    def drain(self, timeout):
+        """
+        Prepare the process to exit: start no more jobs and wait up to timeout seconds for
+        the running ones to finish. Jobs not started yet stay queued in the jobs table,
+        owned by this process, for another one to take over once it is gone (recover).
+        :return: int: The number of jobs still running after the timeout.
+        """
+        with self._lock:
+            self._draining = True
+            self._pending.clear()
+            futures = [future for future in self._futures.values() if not future.cancel()]
+        return len(wait(futures, timeout=max(timeout, 0)).not_done)
+
+    def _executor_instance(self):
+        with self._lock:
+            if self._executor is None or self.worker != f"{socket.gethostname()}:{os.getpid()}":
+                # Created lazily (and again after a fork), so commands that never run jobs start no threads
+                self.worker = f"{socket.gethostname()}:{os.getpid()}"
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.app.config["JOB_WORKERS"], thread_name_prefix="job"
+                )
+            return self._executor
+
+    def recover(self):
+        """
+        Jobs owned by a process that no longer runs: running ones are marked failed,
+        queued ones are claimed and queued again here. Several processes may recover at
+        the same time (e.g. the workers started by a reload): each job is claimed by a
+        conditional update, so only one of them runs it.
+        Must be called inside an application context.
+        :return: int: The number of jobs taken over.
+        """
+        host = socket.gethostname()
+        orphans = db.session.execute(
+            select(Job.job_id, Job.job_type, Job.status, Job.worker).where(Job.status.in_(("queued", "running")))
+        ).all()
+        db.session.rollback()
+        claimed = []
+        for job in orphans:
+            owner_host, _, owner_pid = (job.worker or ":").rpartition(":")
+            if job.worker == self.worker or (
+                owner_host == host and owner_pid.isdigit() and _process_alive(int(owner_pid))
+            ):
+                continue
+            statement = update(Job).where(
+                Job.job_id == job.job_id, Job.status == job.status, Job.worker.is_not_distinct_from(job.worker)
+            )
+            if job.status == "running":
+                statement = statement.values(
+                    status="failed", error="Interrupted by a server restart.", finished_at=datetime.now()
+                )
+            else:
+                statement = statement.values(worker=self.worker)
+            with db.engine.begin() as conn:
+                if conn.execute(statement).rowcount and job.status == "queued":
+                    claimed.append(job)
+        for job in claimed:
+            self._dispatch(job.job_id, job.job_type)
+        return len(claimed)
+
+    def set_fields(self, job_id, expected_status=None, **values):
+        """
+        Update a job row on its own connection, so that a job's status is never
+        committed together with (or rolled back with) the job's own work.
+        :param expected_status: Only update the job if it still has this status.
+        :return: bool: Whether the job was updated.
+        """
+        statement = update(Job).where(Job.job_id == job_id)
+        if expected_status:
+            statement = statement.where(Job.status == expected_status)
+        with db.engine.begin() as conn:
+            return conn.execute(statement.values(**values)).rowcount > 0
+
+    def submit(self, name, params=None):
+        """
+        Enqueue a job.
+        :param name: The job type (a key of JOB_TYPES).
+        :param params: JSON-serializable job parameters.
+        :return: dict: The queued job.
+        :raises ValueError: If the job type is unknown or its parameters are invalid.
+        """
+        if name not in JOB_TYPES:
+            raise ValueError(f"Unknown job type '{name}'. Available: {', '.join(sorted(JOB_TYPES))}.")
+        params = params or {}
+        validate = JOB_TYPES[name][2]
+        if validate:
+            validate(params)
+        job = Job(job_type=name, status="queued", params=json.dumps(params), worker=self.worker)
+        db.session.add(job)
+        db.session.commit()
+        self._dispatch(job.job_id, name)
+        return serialize_job(job)
+
+    def _dispatch(self, job_id, name):
+        executor = self._executor_instance()
+        with self._lock:
+            if self._draining:
+                return  # Left queued for the process that takes over (recover)
+            if self._running.get(name, 0) < JOB_TYPES[name][1]:
+                self._running[name] = self._running.get(name, 0) + 1
+                self._futures[job_id] = executor.submit(self._run, job_id, name)
+            else:
+                self._pending.setdefault(name, deque()).append(job_id)
+
+    def _release(self, name):
+        """
+        Free a slot of a job type and start the next job waiting for it.
+        """
+        with self._lock:
+            self._running[name] -= 1
+            pending = self._pending.get(name)
+            if pending and not self._draining:
+                self._running[name] += 1
+                job_id = pending.popleft()
+                self._futures[job_id] = self._executor.submit(self._run, job_id, name)
+
+    def _run(self, job_id, name):
+        try:
+            with self.app.app_context():
+                self._execute(job_id, name)
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+                self._cancelled.discard(job_id)
+            self._release(name)
+
+    def _execute(self, job_id, name):
+        if not self.set_fields(job_id, expected_status="queued", status="running", started_at=datetime.now()):
+            return  # Cancelled while waiting
+        params = json.loads(db.session.get(Job, job_id).params or "{}")
+        db.session.rollback()  # Do not keep a read transaction open for the whole job
+
+        context = JobContext(self, job_id)
+        func = JOB_TYPES[name][0]
+        try:
+            context.check_cancelled()
+            result = func(params, context)
+            self.set_fields(
+                job_id, status="succeeded", finished_at=datetime.now(),
+                result=json.dumps(result, default=str), result_path=context.result_path,
+            )
+            logger.info(f"Job {job_id} ({name}) succeeded")
+        except JobCancelled:
+            db.session.rollback()
+            self.set_fields(job_id, status="cancelled", finished_at=datetime.now())
+            logger.info(f"Job {job_id} ({name}) cancelled")
+        except Exception as e:
+            db.session.rollback()
+            self.set_fields(job_id, status="failed", finished_at=datetime.now(), error=str(e))
+            logger.error(f"Job {job_id} ({name}) failed: {e}")
+
+    def is_cancel_requested(self, job_id):
+        return job_id in self._cancelled
+
+    def sync_cancel(self, job_id):
+        """
+        Pick up a cancellation requested through another process (e.g. another server worker),
+        which could only record it in the jobs table.
+        """
+        with db.engine.connect() as conn:
+            if conn.scalar(select(Job.cancel_requested).where(Job.job_id == job_id)):
+                with self._lock:
+                    self._cancelled.add(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: a queued job is dropped, a running job is asked to stop.
+        :param job_id: The ID of the job.
+        :return: dict: The job, or None if it does not exist.
+        """
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return None
+        if job.status == "queued" and self.set_fields(
+            job_id, expected_status="queued", status="cancelled", finished_at=datetime.now()
+        ):
+            with self._lock:
+                pending = self._pending.get(job.job_type, ())
+                if job_id in pending:
+                    pending.remove(job_id)
+                future = self._futures.pop(job_id, None)
+            if future is not None and future.cancel():
+                self._release(job.job_type)
+        elif job.status in ("queued", "running"):
+            # Running (or just started): the job stops at its next progress call
+            with self._lock:
+                self._cancelled.add(job_id)
+            self.set_fields(job_id, cancel_requested=True)
+        db.session.refresh(job)
+        return serialize_job(job)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Process-wide job runner, bound to the application by create_app
+job_runner = JobRunner()
+
+
+def serialize_job(job):
+    """
+    Dictionary representation of a job, with its JSON fields decoded.
+    """
+    return {
+        "job_id": job.job_id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "params": json.loads(job.params) if job.params else None,
+        "progress": json.loads(job.progress) if job.progress else None,
+        "result": json.loads(job.result) if job.result else None,
+        "result_path": job.result_path,
+        "error": job.error,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def get_job(job_id):
+    """
+    Retrieve a job by ID.
+    :param job_id: The ID of the job.
+    :return: dict: The job, or None if it does not exist.
+    """
+    try:
+        job = db.session.get(Job, job_id)
+        return serialize_job(job) if job else None
+    except Exception as e:
+        logger.error(f"Error fetching job {job_id}: {e}")
+        raise
+
+
+def get_jobs(status=None, job_type_name=None, limit=50):
+    """
+    Retrieve the most recent jobs.
+    :param status: Optional status filter.
+    :param job_type_name: Optional job type filter.
+    :param limit: Maximum number of jobs.
+    :return: list: A list of dictionaries containing the jobs, newest first.
+    """
+    try:
+        query = Job.query
+        if status:
+            query = query.filter(Job.status == status)
+        if job_type_name:
+            query = query.filter(Job.job_type == job_type_name)
+        return [serialize_job(job) for job in query.order_by(Job.job_id.desc()).limit(limit)]
+    except Exception as e:
+        logger.error(f"Error fetching jobs: {e}")
+        raise
+
+
+def save_upload(stream, suffix):
+    """
+    Copy an uploaded request body to the results directory, in chunks, for a job to read later.
+    :return: str: The path of the stored file.
+    """
+    path = os.path.join(job_runner.results_dir, f"upload-{uuid.uuid4().hex}.{suffix}")
+    with open(path, "wb") as upload:
+        shutil.copyfileobj(stream, upload)
+    return path
+
+
+# Job types
+
+
+def _validate_export(params):
+    from services.export_service import EXPORTABLE, resolve_columns
+    from utils.filters import build_filters
+
+    if params.get("resource") not in EXPORTABLE:
+        raise ValueError(f"'resource' must be one of: {', '.join(EXPORTABLE)}.")
+    model = EXPORTABLE[params["resource"]]
+    resolve_columns(model, params.get("columns"))
+    build_filters(model, params.get("filters") or {})
+
+
+@job_type("export", concurrency=2, validate=_validate_export)
+def export_job(params, context):
+    """
+    Write a CSV export to a file. Params: resource, columns (optional list), filters (optional dict).
+    """
+    from services.export_service import EXPORTABLE, iter_csv, resolve_columns
+    from utils.filters import build_filters
+
+    model = EXPORTABLE[params["resource"]]
+    columns = resolve_columns(model, params.get("columns"))
+    filters = build_filters(model, params.get("filters") or {})
+    written = 0
+    with open(context.output_file(f"{params['resource']}.csv"), "w", newline="", encoding="utf-8") as output:
+        for chunk in iter_csv(model, columns, filters):
+            output.write(chunk)
+            written += len(chunk)
+            context.progress({"bytes_written": written})
+    return {"bytes_written": written}
+
+
+def _validate_import(params):
+    from services.import_service import FORMATS, IMPORTABLE
+
+    if params.get("resource") not in IMPORTABLE:
+        raise ValueError(f"'resource' must be one of: {', '.join(IMPORTABLE)}.")
+    if params.get("format", "csv") not in FORMATS:
+        raise ValueError(f"'format' must be one of: {', '.join(FORMATS)}.")
+    if not params.get("upload"):
+        raise ValueError("Imports need an uploaded file.")
+
+
+@job_type("import", concurrency=1, validate=_validate_import)
+def import_job(params, context):
+    """
+    Bulk import an uploaded file. Params: resource, format, batch_size, upload (stored file path).
+    """
+    from services.import_service import import_records
+
+    try:
+        with open(params["upload"], "rb") as stream:
+            return import_records(
+                params["resource"], stream, params.get("format", "csv"),
+                params.get("batch_size") or job_runner.app.config["IMPORT_BATCH_SIZE"], context.progress,
+            )
+    finally:
+        os.remove(params["upload"])
+
+
+@job_type("invoice-batch", concurrency=1)
+def invoice_batch_job(params, context):
+    """
+    Batch invoicing run. Params: dry_run, chunk_size.
+    """
+    from services.billing_service import BILLING_CHUNK_SIZE, run_batch_invoicing
+
+    return run_batch_invoicing(
+        bool(params.get("dry_run")), params.get("chunk_size") or BILLING_CHUNK_SIZE, context.progress
+    )
+
+
+@job_type("search-rebuild", concurrency=1)
+def search_rebuild_job(params, context):
+    """
+    Rebuild the full-text search indexes.
+    """
+    from services.search_service import rebuild_search_indexes
+
+    return rebuild_search_indexes()
+
+
+@job_type("invoice-summary-rebuild", concurrency=1)
+def invoice_summary_rebuild_job(params, context):
+    """
+    Rebuild the monthly revenue summary.
+    """
+    from services.invoice_summary_service import rebuild_invoice_summary
+
+    return {"rows": rebuild_invoice_summary()}
+
+
+def _validate_archive(params):
+    from datetime import date
+
+    if params.get("before") is not None:
+        date.fromisoformat(params["before"])
+
+
+@job_type("archive", concurrency=1, validate=_validate_archive)
+def archive_job(params, context):
+    """
+    Archiving run. Params: before (YYYY-MM-DD, defaults to ARCHIVE_AFTER_DAYS ago), dry_run, chunk_size.
+    """
+    from datetime import date
+    from services.archive_service import ARCHIVE_CHUNK_SIZE, default_cutoff, run_archiving
+
+    cutoff = (date.fromisoformat(params["before"]) if params.get("before")
+              else default_cutoff(job_runner.app.config["ARCHIVE_AFTER_DAYS"]))
+    return run_archiving(
+        cutoff, bool(params.get("dry_run")), params.get("chunk_size") or ARCHIVE_CHUNK_SIZE, context.progress
+    )
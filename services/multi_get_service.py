@@ -0,0 +1,73 @@
+import logging
+
+from models.setting import Setting
+from services.include_service import HIDDEN_COLUMNS, IN_CHUNK_SIZE, INCLUDABLE
+from utils.cache import entity_cache
+
+logger = logging.getLogger(__name__)
+
+# Resources that can be fetched by a list of ids, by table name
+MULTI_GET = {**INCLUDABLE, Setting.__tablename__: Setting}
+
+# Most ids accepted in the query string; longer lists go through POST /<resource>/lookup
+MAX_QUERY_IDS = 200
+MAX_LOOKUP_IDS = 5000
+
+
+def parse_ids(values):
+    """
+    Turn '1,2,3' (or a list of ids) into a list of distinct ints, in order of first appearance.
+    :raises ValueError: If an id is not a positive integer.
+    """
+    if isinstance(values, str):
+        values = [value for value in values.split(",") if value.strip()]
+    ids = []
+    for value in values:
+        if isinstance(value, bool) or not str(value).strip().isdigit():
+            raise ValueError(f"Invalid id: {value!r}")
+        ids.append(int(value))
+    return list(dict.fromkeys(ids))
+
+
+def get_many(resource, ids):
+    """
+    Fetch several records by primary key: cached rows are taken from the entity cache,
+    the others are loaded with one IN query per chunk of ids and then cached.
+    :param resource: Table name (key of MULTI_GET).
+    :param ids: Distinct primary keys, in the order the records should be returned.
+    :return: dict: 'data' with the records found (as dictionaries of column values, in
+             the order of ids), and 'missing' with the ids that do not exist.
+    """
+    model = MULTI_GET[resource]
+    primary_key = model.__table__.primary_key.columns[0]
+    cache = entity_cache(resource)
+    try:
+        found = {}
+        to_load = []
+        for record_id in ids:
+            record = cache.get(record_id)
+            if record is None:
+                to_load.append(record_id)
+            else:
+                found[record_id] = record
+
+        # Read before querying: rows changed while the query runs are not cached
+        generation = cache.generation
+        column = getattr(model, primary_key.name)
+        for offset in range(0, len(to_load), IN_CHUNK_SIZE):
+            for row in model.query.filter(column.in_(to_load[offset:offset + IN_CHUNK_SIZE])):
+                record = {
+                    name: getattr(row, name)
+                    for name in model.__table__.columns.keys()
+                    if name not in HIDDEN_COLUMNS
+                }
+                found[record[primary_key.name]] = record
+                cache.set(record[primary_key.name], record, generation=generation)
+
+        return {
+            "data": [found[record_id] for record_id in ids if record_id in found],
+            "missing": [record_id for record_id in ids if record_id not in found],
+        }
+    except Exception as e:
+        logger.error(f"Error fetching {resource} records {ids[:10]}...: {e}")
+        raise
@@ -0,0 +1,191 @@
+import logging
+import threading
+
+from sqlalchemy import func, or_
+
+from models.employee import Employee
+from models.task import Task
+from utils.database import begin_write, db
+from utils.interval_tree import IntervalTree
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSchedule:
+    """
+    In-memory index of task periods: one interval tree per employee.
+
+    It is loaded from the task table on first use and then kept current by the task
+    service after every commit, so availability and double-booking checks never scan
+    the task table. A task without end_date occupies its start day; cancelled tasks
+    do not occupy anything.
+    """
+
+    def __init__(self):
+        self._trees = {}  # employee_id -> IntervalTree of task_id
+        self._tasks = {}  # task_id -> (employee_id, start_date, end_date)
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            rows = (
+                db.session.query(Task.task_id, Task.employee_id, Task.start_date, Task.end_date, Task.status)
+                .all()
+            )
+            for row in rows:
+                self._add(row.task_id, row.employee_id, row.start_date, row.end_date, row.status)
+            self._loaded = True
+            logger.info(f"Task schedule loaded with {len(self._tasks)} tasks")
+
+    def _add(self, task_id, employee_id, start_date, end_date, status):
+        if status == "cancelled" or employee_id is None or start_date is None:
+            return
+        end_date = end_date or start_date
+        self._trees.setdefault(employee_id, IntervalTree()).add(start_date, end_date, task_id)
+        self._tasks[task_id] = (employee_id, start_date, end_date)
+
+    def _discard(self, task_id):
+        entry = self._tasks.pop(task_id, None)
+        if entry is not None:
+            employee_id, start_date, end_date = entry
+            self._trees[employee_id].remove(start_date, end_date, task_id)
+
+    def update(self, task):
+        """
+        Record the current period of a task (after it was created or updated).
+        :param task: The committed Task instance.
+        """
+        with self._lock:
+            if not self._loaded:
+                return  # The next load reads the committed row anyway
+            self._discard(task.task_id)
+            self._add(task.task_id, task.employee_id, task.start_date, task.end_date, task.status)
+
+    def remove(self, task_id):
+        """
+        Forget a deleted task.
+        :param task_id: The ID of the task.
+        """
+        with self._lock:
+            self._discard(task_id)
+
+    def load(self):
+        """
+        Load the index now rather than on first use.
+        """
+        self._ensure_loaded()
+
+    def reset(self):
+        """
+        Drop the index; it is reloaded from the database on next use.
+        """
+        with self._lock:
+            self._trees.clear()
+            self._tasks.clear()
+            self._loaded = False
+
+    def conflicts(self, employee_id, start_date, end_date=None, exclude_task_id=None):
+        """
+        List the tasks of an employee that overlap a period.
+        :param employee_id: The ID of the employee.
+        :param start_date: First day of the period.
+        :param end_date: Last day of the period (defaults to start_date).
+        :param exclude_task_id: A task to ignore, e.g. the one being updated.
+        :return: list: IDs of the overlapping tasks.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            tree = self._trees.get(employee_id)
+            if tree is None:
+                return []
+            return [
+                task_id for task_id in tree.overlapping(start_date, end_date or start_date)
+                if task_id != exclude_task_id
+            ]
+
+    def is_available(self, employee_id, start_date, end_date):
+        """
+        Check whether an employee has no task overlapping a period.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            tree = self._trees.get(employee_id)
+            return tree is None or not tree.overlaps(start_date, end_date)
+
+
+# Process-wide schedule, shared by the task service and the availability endpoint
+task_schedule = TaskSchedule()
+
+
+def overlapping_tasks(employee_id, start_date, end_date=None, exclude_task_id=None, task_ids=None):
+    """
+    List, from the database, the tasks of an employee that overlap a period (same rules as
+    the schedule: cancelled tasks do not count, a task without end_date lasts one day).
+    :param task_ids: Only consider these tasks.
+    :return: list: IDs of the overlapping tasks.
+    """
+    end_date = end_date or start_date
+    query = db.select(Task.task_id).where(
+        Task.employee_id == employee_id,
+        Task.start_date <= end_date,
+        func.coalesce(Task.end_date, Task.start_date) >= start_date,
+        or_(Task.status.is_(None), Task.status != "cancelled"),
+    )
+    if exclude_task_id is not None:
+        query = query.where(Task.task_id != exclude_task_id)
+    if task_ids is not None:
+        query = query.where(Task.task_id.in_(task_ids))
+    return db.session.scalars(query.order_by(Task.task_id)).all()
+
+
+def find_conflicts(employee_id, start_date, end_date=None, exclude_task_id=None):
+    """
+    List the tasks that a booking would overlap, for a caller about to write it in the
+    current transaction. The in-memory schedule is only a pre-filter, since it may lag
+    behind the other workers: its hits are confirmed in the database, and when it finds
+    none the database is checked under the write lock, which the transaction keeps until
+    it commits, so no other booking can slip in between the check and the insert.
+    :return: list: IDs of the overlapping tasks.
+    """
+    candidates = task_schedule.conflicts(employee_id, start_date, end_date, exclude_task_id=exclude_task_id)
+    if candidates:
+        conflicting = overlapping_tasks(employee_id, start_date, end_date, exclude_task_id, task_ids=candidates)
+        if conflicting:
+            return conflicting
+    begin_write()
+    return overlapping_tasks(employee_id, start_date, end_date, exclude_task_id)
+
+
+def get_available_employees(date_from, date_to, role=None):
+    """
+    Retrieve the employees without any task overlapping a date range.
+    :param date_from: First day of the range (datetime.date).
+    :param date_to: Last day of the range (datetime.date).
+    :param role: Optional role filter (e.g. 'mechanic').
+    :return: list: A list of dictionaries containing the available employees.
+    """
+    try:
+        query = Employee.query
+        if role:
+            query = query.filter(Employee.role == role)
+        return [
+            {
+                "employee_id": employee.employee_id,
+                "name": employee.name,
+                "email": employee.email,
+                "phone": employee.phone,
+                "role": employee.role,
+                "hired_date": employee.hired_date,
+                "created_at": employee.created_at,
+            }
+            for employee in query.order_by(Employee.employee_id)
+            if task_schedule.is_available(employee.employee_id, date_from, date_to)
+        ]
+    except Exception as e:
+        logger.error(f"Error fetching available employees from {date_from} to {date_to}: {e}")
+        raise
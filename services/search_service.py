@@ -0,0 +1,214 @@
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from models.client import Client
+from models.vehicle import Vehicle
+from models.work import Work
+from services.include_service import HIDDEN_COLUMNS
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Full-text indexes: resource -> (model, indexed columns, bm25 weight of each column).
+# Each resource has an FTS5 table named '<resource>_fts' whose rowid is the resource's primary key.
+SEARCH_INDEXES = {
+    "client": (Client, ("name", "email", "address"), (10.0, 5.0, 1.0)),
+    "vehicle": (Vehicle, ("license_plate", "brand", "model"), (10.0, 2.0, 2.0)),
+    "work": (Work, ("description",), (1.0,)),
+}
+
+MAX_PER_PAGE = 100
+
+
+def _primary_key(model):
+    return model.__table__.primary_key.columns[0].name
+
+
+def create_search_index_sql(resource):
+    """
+    DDL for the FTS5 table of a resource. Diacritics are folded so 'joao' matches 'João',
+    and prefix indexes make partial-word queries as cheap as whole-word ones.
+    :param resource: The resource name (a key of SEARCH_INDEXES).
+    :return: list: SQL statements.
+    """
+    model, columns, weights = SEARCH_INDEXES[resource]
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {resource}_fts USING fts5("
+        f"{', '.join(columns)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+        f"INSERT INTO {resource}_fts ({resource}_fts, rank) "
+        f"VALUES ('rank', 'bm25({', '.join(str(weight) for weight in weights)})')",
+    ]
+
+
+def rebuild_search_index_sql(resource):
+    """
+    Set-based statements that regenerate a resource's FTS5 table from its source table.
+    :param resource: The resource name (a key of SEARCH_INDEXES).
+    :return: list: SQL statements.
+    """
+    model, columns, _ = SEARCH_INDEXES[resource]
+    column_list = ", ".join(columns)
+    return [
+        f"DELETE FROM {resource}_fts",
+        f"INSERT INTO {resource}_fts (rowid, {column_list}) "
+        f"SELECT {_primary_key(model)}, {column_list} FROM {model.__tablename__}",
+        f"INSERT INTO {resource}_fts ({resource}_fts) VALUES ('optimize')",
+    ]
+
+
+def rebuild_search_indexes():
+    """
+    Regenerate every full-text index from scratch, in a single transaction.
+    :return: dict: The number of documents indexed per resource.
+    """
+    try:
+        counts = {}
+        for resource in SEARCH_INDEXES:
+            for statement in rebuild_search_index_sql(resource):
+                db.session.execute(text(statement))
+            counts[resource] = db.session.execute(text(f"SELECT count(*) FROM {resource}_fts")).scalar()
+        db.session.commit()
+        return counts
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error rebuilding search indexes: {e}")
+        raise
+
+
+def index_document(resource, entity):
+    """
+    Add or refresh an entity in its full-text index, inside the caller's transaction.
+    The entity must already be flushed so that its primary key is known.
+    :param resource: The resource name (a key of SEARCH_INDEXES).
+    :param entity: The model instance to index.
+    """
+    model, columns, _ = SEARCH_INDEXES[resource]
+    params = {column: getattr(entity, column) for column in columns}
+    params["rowid"] = getattr(entity, _primary_key(model))
+    remove_document(resource, params["rowid"])
+    db.session.execute(
+        text(f"INSERT INTO {resource}_fts (rowid, {', '.join(columns)}) "
+             f"VALUES (:rowid, {', '.join(':' + column for column in columns)})"),
+        params,
+    )
+
+
+def remove_document(resource, resource_id):
+    """
+    Remove an entity from its full-text index, inside the caller's transaction.
+    :param resource: The resource name (a key of SEARCH_INDEXES).
+    :param resource_id: The primary key of the entity.
+    """
+    db.session.execute(text(f"DELETE FROM {resource}_fts WHERE rowid = :rowid"), {"rowid": resource_id})
+
+
+def remove_documents(resource, resource_ids):
+    """
+    Remove several entities from their full-text index, inside the caller's transaction.
+    :param resource: The resource name (a key of SEARCH_INDEXES).
+    :param resource_ids: The primary keys of the entities.
+    """
+    for offset in range(0, len(resource_ids), 500):
+        chunk = list(resource_ids[offset:offset + 500])
+        db.session.execute(
+            text(f"DELETE FROM {resource}_fts WHERE rowid IN ({', '.join(str(int(rowid)) for rowid in chunk)})")
+        )
+
+
+def index_new_documents(resource, rows):
+    """
+    Add freshly inserted rows to their full-text index in one statement, inside the
+    caller's transaction. Unlike index_document, existing entries are not looked up.
+    :param resource: The resource name (a key of SEARCH_INDEXES).
+    :param rows: Mappings holding the primary key and the indexed columns.
+    """
+    model, columns, _ = SEARCH_INDEXES[resource]
+    primary_key = _primary_key(model)
+    params = [dict({column: row[column] for column in columns}, rowid=row[primary_key]) for row in rows]
+    if params:
+        db.session.execute(
+            text(f"INSERT INTO {resource}_fts (rowid, {', '.join(columns)}) "
+                 f"VALUES (:rowid, {', '.join(':' + column for column in columns)})"),
+            params,
+        )
+
+
+def build_match_query(q):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix.
+    Words are quoted, so user input can never be parsed as FTS5 syntax.
+    :param q: The raw search text.
+    :return: str: The FTS5 MATCH expression, or None if the text has no words.
+    """
+    terms = [word.replace('"', '""') for word in q.split()]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def search(q, types=None, page=1, per_page=20):
+    """
+    Ranked full-text search across clients, vehicles and works.
+    :param q: The search text; partial words match.
+    :param types: Optional list of resources to search (defaults to all of them).
+    :param page: The 1-based page number.
+    :param per_page: Results per page (at most MAX_PER_PAGE).
+    :return: dict: The page of results, best match first, with the matched records.
+    """
+    types = [resource for resource in (types or SEARCH_INDEXES) if resource in SEARCH_INDEXES]
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    result = {"query": q, "page": page, "per_page": per_page, "has_more": False, "results": []}
+
+    match = build_match_query(q or "")
+    if not match or not types:
+        return result
+
+    try:
+        # Every index contributes at most its own top (offset + limit + 1) hits, so the
+        # merge never has to rank more rows than the requested page needs. Each index
+        # scores all of its matches (ORDER BY rank LIMIT keeps only a heap of the best).
+        window = page * per_page + 1
+        subqueries = " UNION ALL ".join(
+            f"SELECT * FROM (SELECT '{resource}' AS type, rowid AS id, rank FROM {resource}_fts "
+            f"WHERE {resource}_fts MATCH :match ORDER BY rank LIMIT :window)"
+            for resource in types
+        )
+        hits = db.session.execute(
+            text(f"SELECT type, id, rank FROM ({subqueries}) ORDER BY rank LIMIT :limit OFFSET :offset"),
+            {"match": match, "window": window, "limit": per_page + 1, "offset": (page - 1) * per_page},
+        ).all()
+
+        result["has_more"] = len(hits) > per_page
+        hits = hits[:per_page]
+
+        # Load the matched records with one IN query per resource type
+        records = {}
+        for resource in {hit.type for hit in hits}:
+            model = SEARCH_INDEXES[resource][0]
+            primary_key = getattr(model, _primary_key(model))
+            ids = [hit.id for hit in hits if hit.type == resource]
+            for entity in model.query.filter(primary_key.in_(ids)):
+                records[(resource, getattr(entity, primary_key.key))] = {
+                    column.name: _to_json(getattr(entity, column.name))
+                    for column in model.__table__.columns
+                    if column.name not in HIDDEN_COLUMNS
+                }
+
+        result["results"] = [
+            {"type": hit.type, "id": hit.id, "rank": hit.rank, "data": records[(hit.type, hit.id)]}
+            for hit in hits
+            if (hit.type, hit.id) in records
+        ]
+        return result
+    except Exception as e:
+        logger.error(f"Error searching for '{q}': {e}")
+        raise
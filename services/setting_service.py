@@ -1,8 +1,14 @@
 import logging
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import Conflict, PreconditionFailed
 from datetime import datetime
 
 from models.setting import Setting
 from utils.database import db
+from services.change_service import record_change
+from utils.concurrency import check_version, modified_concurrently
+from utils.cache import entity_cache
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +22,7 @@ def get_all_settings():
         return [
             {
                 "setting_id": setting.setting_id,
+                "version": setting.version,
                 "key_name": setting.key_name,
                 "updated_at": setting.updated_at,
                 "value": setting.value,
@@ -38,6 +45,7 @@ def get_setting(setting_id):
             return None
         return {
             "setting_id": setting.setting_id,
+            "version": setting.version,
             "key_name": setting.key_name,
             "updated_at": setting.updated_at,
             "value": setting.value,
@@ -52,7 +60,8 @@ def create_setting(key_name, updated_at, value):
     :param key_name: The key name of the setting.
     :param updated_at: Datetime the setting was last updated.
     :param value: The value of the setting.
-    :return: dict: A dictionary containing the newly created setting's information or an error message.
+    :return: dict: A dictionary containing the newly created setting's information.
+    :raises Conflict: If a unique value of the setting is already taken.
     """
     try:
         setting = Setting(
@@ -61,43 +70,61 @@ def create_setting(key_name, updated_at, value):
             value=value
         )
         db.session.add(setting)
+        db.session.flush()  # Assign the setting ID
+        record_change("create", setting)  # Feed the change log in the same transaction
         db.session.commit()
         return {
             "setting_id": setting.setting_id,
+            "version": setting.version,
             "key_name": setting.key_name,
             "updated_at": setting.updated_at,
             "value": setting.value,
         }
+    except IntegrityError as e:
+        db.session.rollback()
+        logger.error(f"Error creating setting: {e}")
+        raise Conflict("The setting conflicts with an existing record (a unique value is already taken).")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error creating setting: {e}")
-        return {"error": "Internal Server Error"}
+        raise
 
-def update_setting(setting_id, key_name=None, updated_at=None, value=None):
+def update_setting(setting_id, key_name=None, updated_at=None, value=None, expected_versions=None):
     """
     Update an existing setting.
     :param setting_id: The ID of the setting to update.
     :param key_name: The updated key name of the setting.
     :param updated_at: Datetime the setting was last updated.
     :param value: The updated value of the setting.
+    :param expected_versions: The versions the client read (If-Match), or None to skip the check.
     :return: dict: A dictionary containing the updated setting's information or an error message.
     """
     try:
         setting = Setting.query.get(setting_id)
         if not setting:
             return None
+        check_version(setting, expected_versions, f"Setting {setting_id}")
 
         setting.key_name = key_name if key_name is not None else setting.key_name
         setting.updated_at = datetime.now()
         setting.value = value if value else setting.value
 
+        record_change("update", setting)
         db.session.commit()
+        entity_cache("setting").invalidate(setting_id)
         return {
             "setting_id": setting.setting_id,
+            "version": setting.version,
             "key_name": setting.key_name,
             "updated_at": setting.updated_at,
             "value": setting.value,
         }
+    except PreconditionFailed:
+        db.session.rollback()
+        raise
+    except StaleDataError:
+        db.session.rollback()
+        raise modified_concurrently(f"Setting {setting_id}")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating setting {setting_id}: {e}")
@@ -114,9 +141,30 @@ def delete_setting(setting_id):
         if not setting:
             return None
         db.session.delete(setting)
+        record_change("delete", setting)
         db.session.commit()
+        entity_cache("setting").invalidate(setting_id)
         return {"message": f"Setting {setting_id} deleted successfully"}
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error deleting setting {setting_id}: {e}")
         return {"error": "Internal Server Error"}
+
+# IVA rate used when the 'iva' setting is missing or unreadable
+DEFAULT_IVA_RATE = 0.23
+
+def get_iva_rate():
+    """
+    Read the IVA rate from the 'iva' setting.
+    The value may use a decimal comma ('0,23') and may be a percentage ('23').
+    :return: float: The rate as a fraction (e.g. 0.23).
+    """
+    setting = Setting.query.filter_by(key_name="iva").order_by(Setting.setting_id.desc()).first()
+    if not setting:
+        return DEFAULT_IVA_RATE
+    try:
+        rate = float(setting.value.strip().rstrip("%").replace(",", "."))
+    except ValueError:
+        logger.warning(f"Invalid 'iva' setting {setting.value!r}, using {DEFAULT_IVA_RATE}")
+        return DEFAULT_IVA_RATE
+    return rate / 100 if rate >= 1 else rate
@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import threading
+from datetime import date
+from types import SimpleNamespace
+
+from services.auth_service import apply_revocation, load_revocations
+from services.change_service import TOMBSTONE_ACTIONS, get_changes_after, latest_seq
+from services.employee_service import workload_cache
+from services.job_service import job_runner
+from services.schedule_service import task_schedule
+from services.warmup_service import warm_up
+from utils.cache import clear_entity_caches, entity_cache
+from utils.change_stream import STREAMED_RESOURCES, change_stream
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Changes read from the change log per query
+FOLLOW_BATCH_SIZE = 500
+
+
+def _task_row(change):
+    data = json.loads(change["data"])
+    return SimpleNamespace(
+        task_id=change["record_id"],
+        employee_id=data.get("employee_id"),
+        start_date=date.fromisoformat(data["start_date"]) if data.get("start_date") else None,
+        end_date=date.fromisoformat(data["end_date"]) if data.get("end_date") else None,
+        status=data.get("status"),
+    )
+
+
+def apply_change(change):
+    """
+    Bring the in-memory state of this process up to date with a committed change:
+    the entity cache, the task schedule, the workload report, the token revocation list
+    and the event stream.
+    :param change: dict with seq, resource, record_id, action and data (JSON text).
+    """
+    resource, record_id = change["resource"], change["record_id"]
+    entity_cache(resource).invalidate(record_id)
+    if resource == "task":
+        if change["action"] in TOMBSTONE_ACTIONS:
+            task_schedule.remove(record_id)
+        else:
+            task_schedule.update(_task_row(change))
+    if resource in ("task", "employee"):
+        workload_cache.clear()
+    if resource == "revoked_token":
+        apply_revocation(json.loads(change["data"]))
+    if resource in STREAMED_RESOURCES:
+        change_stream.publish(change)
+
+
+class ChangeFollower:
+    """
+    Tails the change log of a serving process.
+
+    Every process keeps caches (entities, task schedule, workload), a token revocation
+    list and an event stream that the services update after their own commits. Other
+    processes write too (the other flask serve workers, another flask run, CLI commands
+    such as set-password), so every serving process follows the change log: create_app
+    starts it, and init_worker again in each forked worker. The writes committed
+    elsewhere reach the process within a polling interval. Applying a change twice is harmless.
+    """
+
+    def __init__(self):
+        self._since = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, app, interval):
+        """
+        Follow the changes committed from now on, in a background thread (replacing the
+        one already running, if any).
+        :param interval: Seconds between two reads of the change log.
+        """
+        self.stop()
+        with app.app_context():
+            self._since = latest_seq()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app, interval), name="change-follower", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop following and wait for the background thread to exit.
+        """
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self, app, interval):
+        while not self._stop.wait(interval):
+            try:
+                with app.app_context():
+                    self.catch_up()
+            except Exception as e:
+                logger.error(f"Error following the change log after {self._since}: {e}")
+
+    def catch_up(self):
+        """
+        Apply every change committed since the last one applied.
+        """
+        while True:
+            changes = get_changes_after(self._since, None, limit=FOLLOW_BATCH_SIZE, include_internal=True)
+            for change in changes:
+                apply_change(change)
+                self._since = change["seq"]
+            if len(changes) < FOLLOW_BATCH_SIZE:
+                return
+
+
+# Change log follower of this process, started by create_app (and init_worker after a fork)
+change_follower = ChangeFollower()
+
+
+def init_worker(app):
+    """
+    Prepare a freshly forked server worker: drop the database connections and the job
+    runner state inherited from the master process, empty the caches filled before the
+    fork (they may already be stale), start following the change log, reload the token
+    revocation list, and warm up again before the worker accepts its first connection.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)  # The master's pooled connections stay the master's
+    job_runner.after_fork()
+    clear_entity_caches()
+    workload_cache.clear()
+    task_schedule.reset()
+    change_follower.start(app, app.config["SERVER_SYNC_SECONDS"])
+    with app.app_context():
+        load_revocations()  # The master's list misses what other workers revoked since it started
+    if app.config["WARMUP_ENABLED"]:
+        warm_up.reset()
+        warm_up.run(app)
+
+
+def stop_worker(app):
+    """
+    End the event streams of a server worker that stops accepting: their clients reconnect
+    to another worker with their Last-Event-ID, rather than hold this one for the whole
+    graceful timeout.
+    """
+    change_stream.close()
+
+
+def exit_worker(app, timeout):
+    """
+    Prepare a server worker to exit, once its requests are done: stop following the change
+    log and let the jobs it runs finish, for up to timeout seconds. The jobs it had not
+    started yet stay queued; a surviving worker takes them over (recover_jobs).
+    """
+    change_follower.stop()
+    still_running = job_runner.drain(timeout)
+    if still_running:
+        logger.warning(f"{still_running} jobs still running as worker {os.getpid()} exits: they will be marked failed")
+
+
+def recover_jobs(app):
+    """
+    Run in a surviving server worker after another one exited: take over the jobs it left
+    queued, and mark failed the ones it left running.
+    """
+    try:
+        with app.app_context():
+            claimed = job_runner.recover()
+        if claimed:
+            logger.info(f"Worker {os.getpid()} took over {claimed} queued jobs")
+    except Exception as e:
+        logger.error(f"Error taking over the jobs of an exited worker: {e}")
@@ -1,21 +1,53 @@
 import logging
-from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import Conflict, PreconditionFailed
 
 from models.task import Task
+from services.employee_service import workload_cache
+from services.schedule_service import find_conflicts, task_schedule
 from utils.database import db
+from services.archive_service import get_archived, get_archived_one
+from services.change_service import record_change
+from utils.change_stream import change_stream
+from utils.concurrency import check_version, modified_concurrently
+from utils.cache import entity_cache
 
 logger = logging.getLogger(__name__)
 
-def get_all_task():
+def ensure_no_conflict(employee_id, start_date, end_date, task_id=None):
+    """
+    Reject a task period that overlaps another task of the same employee. Call it in
+    the transaction that writes the task: it takes the database write lock.
+    :param employee_id: The ID of the employee.
+    :param start_date: Start date of the task.
+    :param end_date: End date of the task (None for a one-day task).
+    :param task_id: The ID of the task being updated, if any.
+    :raises Conflict: If the employee is already booked in that period.
+    """
+    conflicting = find_conflicts(employee_id, start_date, end_date, exclude_task_id=task_id)
+    if conflicting:
+        raise Conflict(
+            f"Employee {employee_id} is already booked in that period (tasks {', '.join(map(str, conflicting))})."
+        )
+
+def get_all_task(filters=(), archived_filters=None):
     """
     Retrieve all tasks.
+    :param filters: Optional SQLAlchemy filter conditions (see utils.filters.build_filters).
+    :param archived_filters: Filter conditions on the archive table; when given, the matching archived
+                             records are returned too, after the hot ones.
     :return: list: A list of dictionaries containing information about all tasks.
     """
     try:
-        tasks = Task.query.all()
+        tasks = Task.query.filter(*filters).all()
+        if archived_filters is not None:
+            tasks += get_archived(Task, archived_filters)
         return [
             {
                 "task_id": task.task_id,
+                "version": task.version,
                 "description": task.description,
                 "status": task.status,
                 "start_date": task.start_date,
@@ -30,18 +62,22 @@ def get_all_task():
         logger.error(f"Error fetching all tasks: {e}")
         return {"error": "Internal Server Error"}
 
-def get_task(task_id):
+def get_task(task_id, include_archived=False):
     """
     Retrieve a task by ID.
     :param task_id: The ID of the task to retrieve.
+    :param include_archived: Also look in the archive table.
     :return: dict: A dictionary containing the task's information or an error message.
     """
     try:
         task = Task.query.get(task_id)
+        if not task and include_archived:
+            task = get_archived_one(Task, task_id)
         if not task:
             return None
         return {
             "task_id": task.task_id,
+            "version": task.version,
             "description": task.description,
             "status": task.status,
             "start_date": task.start_date,
@@ -54,7 +90,7 @@ def get_task(task_id):
         logger.error(f"Error fetching task {task_id}: {e}")
         return {"error": "Internal Server Error"}
 
-def create_task(description, status, start_date, end_date, work_id, employee_id):
+def create_task(description, status, start_date, end_date, work_id, employee_id, check_conflicts=False):
     """
     Create a new task entry.
     :param description: Description of the task.
@@ -63,25 +99,32 @@ def create_task(description, status, start_date, end_date, work_id, employee_id)
     :param end_date: End date of the task.
     :param work_id: The ID of the associated work.
     :param employee_id: The ID of the associated employee.
-    :return: dict: A dictionary containing the newly created task's information or an error message.
+    :param check_conflicts: Reject the task if the employee is already booked in that period.
+    :return: dict: A dictionary containing the newly created task's information.
+    :raises Conflict: If a unique value of the task is already taken.
     """
     try:
-        # Convert start_date and end_date string to datetime.date object
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
+        if check_conflicts and status != "cancelled":
+            ensure_no_conflict(employee_id, start_date, end_date)
 
         task = Task(
             description=description,
             status=status,
-            start_date=start_date_obj,
-            end_date=end_date_obj,
+            start_date=start_date,
+            end_date=end_date,
             work_id=work_id,
             employee_id=employee_id,
         )
         db.session.add(task)
+        db.session.flush()  # Assign the task ID
+        change = record_change("create", task)  # Feed the change log in the same transaction
         db.session.commit()
+        change_stream.publish(change)
+        workload_cache.clear()
+        task_schedule.update(task)
         return {
             "task_id": task.task_id,
+            "version": task.version,
             "description": task.description,
             "status": task.status,
             "start_date": task.start_date,
@@ -90,12 +133,20 @@ def create_task(description, status, start_date, end_date, work_id, employee_id)
             "work_id": task.work_id,
             "employee_id": task.employee_id,
         }
+    except Conflict:
+        db.session.rollback()  # Releases the write lock taken by the conflict check
+        raise
+    except IntegrityError as e:
+        db.session.rollback()
+        logger.error(f"Error creating task: {e}")
+        raise Conflict("The task conflicts with an existing record (a unique value is already taken).")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error creating task: {e}")
-        return {"error": "Internal Server Error"}
+        raise
 
-def update_task(task_id, description=None, status=None, start_date=None, end_date=None, work_id=None, employee_id=None):
+def update_task(task_id, description=None, status=None, start_date=None, end_date=None, work_id=None, employee_id=None,
+                check_conflicts=False, expected_versions=None):
     """
     Update an existing task.
     :param task_id: The ID of the task to update.
@@ -105,27 +156,34 @@ def update_task(task_id, description=None, status=None, start_date=None, end_dat
     :param end_date: The updated end date.
     :param work_id: The updated work ID.
     :param employee_id: The updated employee ID.
+    :param check_conflicts: Reject the update if the employee is already booked in the new period.
+    :param expected_versions: The versions the client read (If-Match), or None to skip the check.
     :return: dict: A dictionary containing the updated task's information or an error message.
     """
     try:
-        # Convert start_date and end_date string to datetime.date object
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
-
         task = Task.query.get(task_id)
         if not task:
             return None
+        check_version(task, expected_versions, f"Task {task_id}")
 
         task.description = description if description else task.description
         task.status = status if status else task.status
-        task.start_date = start_date_obj if start_date_obj else task.start_date
-        task.end_date = end_date_obj if end_date_obj else task.end_date
+        task.start_date = start_date if start_date else task.start_date
+        task.end_date = end_date if end_date else task.end_date
         task.work_id = work_id if work_id else task.work_id
         task.employee_id = employee_id if employee_id else task.employee_id
+        if check_conflicts and task.status != "cancelled":
+            ensure_no_conflict(task.employee_id, task.start_date, task.end_date, task_id=task.task_id)
 
+        change = record_change("update", task)
         db.session.commit()
+        change_stream.publish(change)
+        entity_cache("task").invalidate(task_id)
+        workload_cache.clear()
+        task_schedule.update(task)
         return {
             "task_id": task.task_id,
+            "version": task.version,
             "description": task.description,
             "status": task.status,
             "start_date": task.start_date,
@@ -134,6 +192,12 @@ def update_task(task_id, description=None, status=None, start_date=None, end_dat
             "work_id": task.work_id,
             "employee_id": task.employee_id,
         }
+    except (Conflict, PreconditionFailed):
+        db.session.rollback()
+        raise
+    except StaleDataError:
+        db.session.rollback()
+        raise modified_concurrently(f"Task {task_id}")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating task {task_id}: {e}")
@@ -150,7 +214,12 @@ def delete_task(task_id):
         if not task:
             return None
         db.session.delete(task)
+        change = record_change("delete", task)
         db.session.commit()
+        change_stream.publish(change)
+        entity_cache("task").invalidate(task_id)
+        workload_cache.clear()
+        task_schedule.remove(task_id)
         return {"message": f"Task {task_id} deleted successfully"}
     except Exception as e:
         db.session.rollback()
@@ -1,7 +1,15 @@
 import logging
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import Conflict, PreconditionFailed
 
 from models.vehicle import Vehicle
+from services.search_service import index_document, remove_document
 from utils.database import db
+from services.change_service import record_change
+from utils.utils import normalize_plate
+from utils.concurrency import check_version, modified_concurrently
+from utils.cache import entity_cache
 
 
 logger = logging.getLogger(__name__)
@@ -16,6 +24,7 @@ def get_all_vehicle():
         return [
             {
                 "vehicle_id": vehicle.vehicle_id,
+                "version": vehicle.version,
                 "brand": vehicle.brand,
                 "model": vehicle.model,
                 "license_plate": vehicle.license_plate,
@@ -41,6 +50,7 @@ def get_vehicle(vehicle_id):
             return None
         return {
             "vehicle_id": vehicle.vehicle_id,
+            "version": vehicle.version,
             "brand": vehicle.brand,
             "model": vehicle.model,
             "license_plate": vehicle.license_plate,
@@ -52,7 +62,22 @@ def get_vehicle(vehicle_id):
         logger.error(f"Error fetching vehicle {vehicle_id}: {e}")
         return {"error": "Internal Server Error"}
 
-def create_vehicle(brand, model, license_plate, year, client_id, created_at):
+def ensure_plate_is_free(license_plate, vehicle_id=None):
+    """
+    Reject a license plate that another vehicle already has in another format
+    ('AA-12-BB' and 'aa12bb' are the same plate).
+    :param license_plate: The license plate as typed.
+    :param vehicle_id: The ID of the vehicle being updated, if any.
+    :raises Conflict: If another vehicle has the same normalized plate.
+    """
+    query = Vehicle.query.filter(Vehicle.plate_key == normalize_plate(license_plate))
+    if vehicle_id is not None:
+        query = query.filter(Vehicle.vehicle_id != vehicle_id)
+    existing = query.first()
+    if existing:
+        raise Conflict(f"License plate {license_plate} is already registered (vehicle {existing.vehicle_id}).")
+
+def create_vehicle(brand, model, license_plate, year, client_id, created_at=None):
     """
     Create a new vehicle.
     :param brand: The brand of the vehicle.
@@ -60,14 +85,17 @@ def create_vehicle(brand, model, license_plate, year, client_id, created_at):
     :param license_plate: The license plate of the vehicle.
     :param year: The manufacturing year of the vehicle.
     :param client_id: The ID of the client who owns the vehicle.
-    :param created_at: Timestamp when the vehicle was created.
-    :return: dict: A dictionary containing the newly created vehicle's information or an error message.
+    :param created_at: Timestamp when the vehicle was created (None: now).
+    :return: dict: A dictionary containing the newly created vehicle's information.
+    :raises Conflict: If another vehicle has the same license plate, in any format.
     """
     try:
+        ensure_plate_is_free(license_plate)
         vehicle = Vehicle(
             brand=brand,
             model=model,
             license_plate=license_plate,
+            plate_key=normalize_plate(license_plate),
             year=year,
             client_id=client_id,
             created_at=created_at,
@@ -75,9 +103,13 @@ def create_vehicle(brand, model, license_plate, year, client_id, created_at):
 
         )
         db.session.add(vehicle)  # Save the new vehicle to the database
+        db.session.flush()  # Assign the vehicle ID
+        index_document("vehicle", vehicle)  # Keep the search index in the same transaction
+        record_change("create", vehicle)  # Feed the change log in the same transaction
         db.session.commit()
         return {
             "vehicle_id": vehicle.vehicle_id,
+            "version": vehicle.version,
             "brand": vehicle.brand,
             "model": vehicle.model,
             "license_plate": vehicle.license_plate,
@@ -85,12 +117,20 @@ def create_vehicle(brand, model, license_plate, year, client_id, created_at):
             "client_id": vehicle.client_id,
             "created_at": vehicle.created_at,
         }
+    except Conflict:
+        db.session.rollback()
+        raise
+    except IntegrityError as e:
+        db.session.rollback()
+        logger.error(f"Error creating vehicle: {e}")
+        raise Conflict("The vehicle conflicts with an existing record (a unique value is already taken).")
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error creating vehicle: {e}")
-        return {"error": "Internal Server Error"}
+        raise
 
 
-def update_vehicle(vehicle_id, brand=None, model=None, license_plate=None, year=None, client_id=None):
+def update_vehicle(vehicle_id, brand=None, model=None, license_plate=None, year=None, client_id=None, expected_versions=None):
     """
     Update an existing vehicle.
     :param vehicle_id: The ID of the vehicle to update.
@@ -99,29 +139,46 @@ def update_vehicle(vehicle_id, brand=None, model=None, license_plate=None, year=
     :param license_plate: The new license plate of the vehicle.
     :param year: The new year of the vehicle.
     :param client_id: The new client ID of the vehicle.
+    :param expected_versions: The versions the client read (If-Match), or None to skip the check.
     :return: dict: A dictionary containing the updated vehicle's information or an error message.
+    :raises Conflict: If another vehicle has the new license plate, in any format.
     """
     try:
         vehicle = Vehicle.query.get(vehicle_id)
         if not vehicle:
             return None
+        check_version(vehicle, expected_versions, f"Vehicle {vehicle_id}")
+
+        if license_plate:
+            ensure_plate_is_free(license_plate, vehicle_id)
 
         # Update the fields if new values are provided
         vehicle.brand = brand if brand else vehicle.brand
         vehicle.model = model if model else vehicle.model
         vehicle.license_plate = license_plate if license_plate else vehicle.license_plate
+        vehicle.plate_key = normalize_plate(vehicle.license_plate)
         vehicle.year = year if year else vehicle.year
         vehicle.client_id = client_id if client_id else vehicle.client_id
+        index_document("vehicle", vehicle)
 
+        record_change("update", vehicle)
         db.session.commit()  # Commit the changes to the database
+        entity_cache("vehicle").invalidate(vehicle_id)
         return {
             "vehicle_id": vehicle.vehicle_id,
+            "version": vehicle.version,
             "brand": vehicle.brand,
             "model": vehicle.model,
             "license_plate": vehicle.license_plate,
             "year": vehicle.year,
             "client_id": vehicle.client_id,
         }
+    except (Conflict, PreconditionFailed):
+        db.session.rollback()
+        raise
+    except StaleDataError:
+        db.session.rollback()
+        raise modified_concurrently(f"Vehicle {vehicle_id}")
     except Exception as e:
         db.session.rollback()  # Rollback in case of an error
         logger.error(f"Error updating vehicle {vehicle_id}: {e}")
@@ -138,8 +195,74 @@ def delete_vehicle(vehicle_id):
         if not vehicle:
             return None
         db.session.delete(vehicle)  # Delete the vehicle
+        remove_document("vehicle", vehicle_id)
+        record_change("delete", vehicle)
         db.session.commit()
+        entity_cache("vehicle").invalidate(vehicle_id)
         return {"message": f"Vehicle {vehicle_id} deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting vehicle {vehicle_id}: {e}")
-        return {"error": "Internal Server Error"}
\ No newline at end of file
+        return {"error": "Internal Server Error"}
+
+
+def get_vehicle_by_plate(license_plate):
+    """
+    Retrieve a vehicle by license plate, whatever its spacing, dashes or case.
+    Uses the unique index on the normalized plate key, so the lookup is O(log n).
+    :param license_plate: The license plate to look up.
+    :return: dict: A dictionary containing the vehicle's information or None if not found.
+    """
+    try:
+        vehicle = Vehicle.query.filter(Vehicle.plate_key == normalize_plate(license_plate)).first()
+        if not vehicle:
+            return None
+        return {
+            "vehicle_id": vehicle.vehicle_id,
+            "version": vehicle.version,
+            "brand": vehicle.brand,
+            "model": vehicle.model,
+            "license_plate": vehicle.license_plate,
+            "year": vehicle.year,
+            "client_id": vehicle.client_id,
+            "created_at": vehicle.created_at,
+        }
+    except Exception as e:
+        logger.error(f"Error fetching vehicle by plate {license_plate}: {e}")
+        raise
+
+def autocomplete_plates(prefix, limit=10):
+    """
+    Retrieve the vehicles whose normalized plate starts with the given prefix.
+    The prefix is turned into a half-open key range, so SQLite answers it with an index range scan.
+    :param prefix: The beginning of the license plate, in any format.
+    :param limit: The maximum number of vehicles to return.
+    :return: list: A list of dictionaries containing vehicle information, ordered by plate.
+    """
+    try:
+        key = normalize_plate(prefix)
+        if not key:
+            return []
+        # 'AA1' -> plate_key >= 'AA1' AND plate_key < 'AA2'
+        upper_bound = key[:-1] + chr(ord(key[-1]) + 1)
+        vehicles = (
+            Vehicle.query
+            .filter(Vehicle.plate_key >= key, Vehicle.plate_key < upper_bound)
+            .order_by(Vehicle.plate_key)
+            .limit(limit)
+        )
+        return [
+            {
+                "vehicle_id": vehicle.vehicle_id,
+                "version": vehicle.version,
+                "brand": vehicle.brand,
+                "model": vehicle.model,
+                "license_plate": vehicle.license_plate,
+                "year": vehicle.year,
+                "client_id": vehicle.client_id,
+                "created_at": vehicle.created_at,
+            }
+            for vehicle in vehicles
+        ]
+    except Exception as e:
+        logger.error(f"Error autocompleting plates for {prefix}: {e}")
+        raise
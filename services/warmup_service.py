@@ -0,0 +1,151 @@
+import calendar
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+
+def ping_database():
+    """
+    Time one round trip to the database.
+    :return: float: The latency in milliseconds.
+    """
+    started = time.perf_counter()
+    db.session.execute(text("SELECT 1"))
+    latency = (time.perf_counter() - started) * 1000
+    db.session.rollback()
+    return latency
+
+
+def _open_connections(app):
+    # Check out several connections at once so that the pool keeps them open afterwards
+    pool = db.engine.pool
+    count = app.config["WARMUP_CONNECTIONS"]
+    if hasattr(pool, "size"):
+        count = min(count, pool.size())
+    with ExitStack() as stack:
+        for _ in range(count):
+            stack.enter_context(db.engine.connect()).execute(text("SELECT 1"))
+    return count
+
+
+def _register_api(app):
+    # Imported here: the API, its services and models are loaded by this step (see api.init_api)
+    from api import register_api
+
+    register_api(app)
+
+
+def _fill_entity_caches(app):
+    # The most recent records of each resource, through the multi-get path (one IN query each)
+    from services.multi_get_service import MULTI_GET, get_many
+
+    loaded = 0
+    for resource, model in MULTI_GET.items():
+        primary_key = model.__table__.primary_key.columns[0]
+        ids = db.session.scalars(
+            db.select(primary_key).order_by(primary_key.desc()).limit(app.config["WARMUP_CACHE_RECORDS"])
+        ).all()
+        loaded += len(get_many(resource, ids)["data"])
+    return loaded
+
+
+def _run_queries(app):
+    # Representative reads: the IVA rate of every invoice, the schedule behind the availability
+    # and double-booking checks, and the workload report of the current month
+    from services.employee_service import get_workload
+    from services.schedule_service import task_schedule
+    from services.setting_service import get_iva_rate
+
+    get_iva_rate()
+    task_schedule.load()
+    today = date.today()
+    get_workload(today.replace(day=1), today.replace(day=calendar.monthrange(today.year, today.month)[1]))
+
+
+# Warm-up steps, in order: (name, function receiving the app)
+WARMUP_STEPS = (
+    ("api", _register_api),
+    ("mappers", lambda app: configure_mappers()),
+    ("connections", _open_connections),
+    ("entity_caches", _fill_entity_caches),
+    ("queries", _run_queries),
+)
+
+
+class WarmUp:
+    """
+    Warm-up of a serving process, and its readiness.
+
+    The first requests after a start would otherwise pay for the mapper configuration,
+    the first database connections and empty caches. The warm-up does that work up front
+    and the process only reports ready (GET /ready) once it is done. A failing step is
+    logged and skipped: readiness then depends on the database check of /ready alone.
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._thread = None
+        self.report = {}
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def start(self, app):
+        """
+        Warm up in a background thread (or mark the process ready at once if WARMUP_ENABLED is off).
+        """
+        self.reset()
+        if not app.config["WARMUP_ENABLED"]:
+            self._done.set()
+            return
+        self._thread = threading.Thread(target=self.run, args=(app,), name="warm-up", daemon=True)
+        self._thread.start()
+
+    def run(self, app):
+        """
+        Run every warm-up step in the calling thread, then mark the process ready.
+        """
+        started = time.perf_counter()
+        report = {"steps": {}}
+        try:
+            for name, step in WARMUP_STEPS:
+                step_started = time.perf_counter()
+                try:
+                    with app.app_context():
+                        result = step(app)
+                    report["steps"][name] = {"ms": round((time.perf_counter() - step_started) * 1000, 1)}
+                    if result is not None:
+                        report["steps"][name]["count"] = result
+                except Exception as e:
+                    logger.error(f"Warm-up step '{name}' failed: {e}")
+                    report["steps"][name] = {"error": str(e)}
+            report["ms"] = round((time.perf_counter() - started) * 1000, 1)
+            logger.info(f"Warm-up done in {report['ms']} ms")
+        finally:
+            self.report = report
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for a background warm-up to finish.
+        :return: bool: Whether the process is ready.
+        """
+        return self._done.wait(timeout)
+
+    def reset(self):
+        self._done.clear()
+        self.report = {}
+
+
+# Warm-up state of this process, started by create_app
+warm_up = WarmUp()
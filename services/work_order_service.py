@@ -0,0 +1,209 @@
+import logging
+from datetime import date
+
+from sqlalchemy import insert, select
+from werkzeug.exceptions import Conflict
+
+from models.employee import Employee
+from models.invoice import Invoice
+from models.invoice_item import Invoice_item
+from models.task import Task
+from models.vehicle import Vehicle
+from models.work import Work
+from services.change_service import record_change, record_changes
+from services.employee_service import workload_cache
+from services.invoice_summary_service import apply_invoices
+from services.schedule_service import find_conflicts, task_schedule
+from services.search_service import index_document
+from services.setting_service import get_iva_rate
+from utils.change_stream import change_stream
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Most tasks (and invoice items) in one work order
+MAX_ORDER_TASKS = 200
+
+
+def _parse_date(value, field, errors, required=True):
+    if value is None:
+        if required:
+            errors.append(f"{field} is required.")
+        return None
+    try:
+        return date.fromisoformat(value) if isinstance(value, str) else value
+    except ValueError:
+        errors.append(f"{field} must be a date (YYYY-MM-DD).")
+        return None
+
+
+def validate_work_order(order):
+    """
+    Check a whole work order before writing anything: dates, the vehicle and employees
+    (one query each), the invoice item task references and the order size.
+    :param order: dict with the work fields, 'tasks' and optional 'invoice_items'.
+    :return: tuple: (work values, list of task values, list of invoice item values).
+    :raises ValueError: With every problem found, if any.
+    """
+    errors = []
+    tasks = order.get("tasks") or []
+    items = order.get("invoice_items") or []
+    if not tasks:
+        errors.append("A work order needs at least one task.")
+    if len(tasks) > MAX_ORDER_TASKS or len(items) > MAX_ORDER_TASKS:
+        errors.append(f"A work order holds at most {MAX_ORDER_TASKS} tasks and invoice items.")
+
+    work = {
+        "cost": order.get("cost"),
+        "description": order.get("description"),
+        "start_date": _parse_date(order.get("start_date"), "start_date", errors),
+        "end_date": _parse_date(order.get("end_date"), "end_date", errors, required=False),
+        "status": order.get("status") or "pending",
+        "vehicle_id": order.get("vehicle_id"),
+    }
+    if not work["description"]:
+        errors.append("description is required.")
+    if work["start_date"] and work["end_date"] and work["end_date"] < work["start_date"]:
+        errors.append("end_date must not be before start_date.")
+    if work["vehicle_id"] is None or db.session.get(Vehicle, work["vehicle_id"]) is None:
+        errors.append(f"Vehicle {work['vehicle_id']} does not exist.")
+
+    task_values = []
+    for index, task in enumerate(tasks):
+        values = {
+            "description": task.get("description"),
+            "status": task.get("status") or "pending",
+            "start_date": _parse_date(task.get("start_date"), f"tasks[{index}].start_date", errors),
+            "end_date": _parse_date(task.get("end_date"), f"tasks[{index}].end_date", errors, required=False),
+            "employee_id": task.get("employee_id"),
+        }
+        if not values["description"]:
+            errors.append(f"tasks[{index}].description is required.")
+        if values["start_date"] and values["end_date"] and values["end_date"] < values["start_date"]:
+            errors.append(f"tasks[{index}].end_date must not be before its start_date.")
+        task_values.append(values)
+    wanted = {values["employee_id"] for values in task_values}
+    found = set(db.session.scalars(select(Employee.employee_id).where(Employee.employee_id.in_(wanted - {None}))))
+    for employee_id in sorted(wanted - found, key=str):
+        errors.append(f"Employee {employee_id} does not exist.")
+
+    item_values = []
+    for index, item in enumerate(items):
+        task_index = item.get("task")
+        if not isinstance(task_index, int) or not 0 <= task_index < len(tasks):
+            errors.append(f"invoice_items[{index}].task must be the index of a task of the order.")
+            continue
+        if item.get("cost") is None:
+            errors.append(f"invoice_items[{index}].cost is required.")
+        item_values.append({
+            "task": task_index,
+            "cost": item.get("cost"),
+            "description": (item.get("description") or tasks[task_index].get("description") or "")[:80],
+        })
+
+    if errors:
+        raise ValueError(" ".join(errors))
+    return work, task_values, item_values
+
+
+def ensure_order_is_free(task_values):
+    """
+    Reject a work order whose tasks double-book an employee, against the existing tasks
+    or against each other. Call it in the transaction that writes the order: it takes the
+    database write lock.
+    :raises Conflict: If an employee is already booked in the period of a task.
+    """
+    booked = {}
+    for index, task in enumerate(task_values):
+        if task["status"] == "cancelled":
+            continue
+        start, end = task["start_date"], task["end_date"] or task["start_date"]
+        conflicting = find_conflicts(task["employee_id"], start, end)
+        if conflicting:
+            raise Conflict(f"tasks[{index}]: employee {task['employee_id']} is already booked in that period "
+                           f"(tasks {', '.join(map(str, conflicting))}).")
+        for other, (other_start, other_end) in booked.get(task["employee_id"], {}).items():
+            if start <= other_end and other_start <= end:
+                raise Conflict(f"tasks[{index}] and tasks[{other}] book employee {task['employee_id']} "
+                               f"in overlapping periods.")
+        booked.setdefault(task["employee_id"], {})[index] = (start, end)
+
+
+def _serialize(model, row):
+    return {name: getattr(row, name) for name in model.__table__.columns.keys()}
+
+
+def create_work_order(order, check_conflicts=False):
+    """
+    Create a work with its tasks and, optionally, an invoice for the vehicle's client with
+    initial items, all in one transaction: either everything is created or nothing is.
+    The tasks and the items are each inserted with one batched statement.
+    :param order: dict with the work fields (cost, description, start_date, end_date, status,
+                  vehicle_id), 'tasks' (description, status, start_date, end_date, employee_id)
+                  and optional 'invoice_items' (task: index in tasks, cost, description).
+    :param check_conflicts: Reject the order if a task double-books an employee.
+    :return: dict: The created work, tasks, invoice (or None) and invoice items. All are recorded
+             in the change feed; only the work and tasks are published to the event stream.
+    :raises ValueError: If the order is invalid (nothing is written).
+    :raises Conflict: If check_conflicts is set and an employee is already booked.
+    """
+    work_values, task_values, item_values = validate_work_order(order)
+    try:
+        if check_conflicts:
+            ensure_order_is_free(task_values)
+        work = Work(**work_values)
+        db.session.add(work)
+        db.session.flush()  # Assign the work ID
+        index_document("work", work)  # Keep the search index in the same transaction
+        work_change = record_change("create", work)
+
+        tasks = db.session.execute(
+            insert(Task).returning(*Task.__table__.columns, sort_by_parameter_order=True),
+            [dict(values, work_id=work.work_id) for values in task_values],
+        ).all()
+        task_changes = record_changes(Task, "create", [task._mapping for task in tasks])
+
+        invoice, items = None, []
+        if item_values:
+            iva = get_iva_rate()
+            total = round(sum(item["cost"] for item in item_values), 2)
+            invoice = db.session.execute(
+                insert(Invoice)
+                .values(client_id=db.session.get(Vehicle, work.vehicle_id).client_id, iva=iva,
+                        total=total, total_with_iva=round(total * (1 + iva), 2))
+                .returning(*Invoice.__table__.columns)
+            ).one()
+            items = db.session.execute(
+                insert(Invoice_item).returning(*Invoice_item.__table__.columns, sort_by_parameter_order=True),
+                [
+                    {"invoice_id": invoice.invoice_id, "task_id": tasks[item["task"]].task_id,
+                     "cost": item["cost"], "description": item["description"]}
+                    for item in item_values
+                ],
+            ).all()
+            apply_invoices([invoice.invoice_id])  # Keep the monthly summary in the same transaction
+            record_changes(Invoice, "create", [invoice._mapping])
+            record_changes(Invoice_item, "create", [item._mapping for item in items])
+
+        db.session.commit()
+    except Conflict:
+        db.session.rollback()
+        raise
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error creating work order: {e}")
+        raise
+
+    workload_cache.clear()
+    for task in tasks:
+        task_schedule.update(task)
+    # Only the work and its tasks go on the event stream (utils.change_stream.STREAMED_RESOURCES);
+    # the invoice and its items are in the change feed only, as for invoice_service.
+    for change in [work_change, *task_changes]:
+        change_stream.publish(change)
+    return {
+        "work": _serialize(Work, work),
+        "tasks": [_serialize(Task, task) for task in tasks],
+        "invoice": _serialize(Invoice, invoice) if invoice else None,
+        "invoice_items": [_serialize(Invoice_item, item) for item in items],
+    }
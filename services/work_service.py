@@ -1,21 +1,35 @@
 import logging
-from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import Conflict, PreconditionFailed
 
 from models.work import Work
+from services.search_service import index_document, remove_document
 from utils.database import db
+from services.archive_service import get_archived, get_archived_one
+from services.change_service import record_change
+from utils.change_stream import change_stream
+from utils.concurrency import check_version, modified_concurrently
+from utils.cache import entity_cache
 
 logger = logging.getLogger(__name__)
 
-def get_all_work():
+def get_all_work(filters=(), archived_filters=None):
     """
     Retrieve all works.
+    :param filters: Optional SQLAlchemy filter conditions (see utils.filters.build_filters).
+    :param archived_filters: Filter conditions on the archive table; when given, the matching archived
+                             records are returned too, after the hot ones.
     :return: list: A list of dictionaries containing information about all works.
     """
     try:
-        works = Work.query.all()
+        works = Work.query.filter(*filters).all()
+        if archived_filters is not None:
+            works += get_archived(Work, archived_filters)
         return [
             {
                 "work_id": work.work_id,
+                "version": work.version,
                 "cost": work.cost,
                 "description": work.description,
                 "start_date": work.start_date,
@@ -30,18 +44,22 @@ def get_all_work():
         logger.error(f"Error fetching all works: {e}")
         return {"error": "Internal Server Error"}
 
-def get_work(work_id):
+def get_work(work_id, include_archived=False):
     """
     Retrieve a work by ID.
     :param work_id: The ID of the work to retrieve.
+    :param include_archived: Also look in the archive table.
     :return: dict: A dictionary containing the work's information or an error message.
     """
     try:
         work = Work.query.get(work_id)
+        if not work and include_archived:
+            work = get_archived_one(Work, work_id)
         if not work:
             return None
         return {
             "work_id": work.work_id,
+            "version": work.version,
             "cost": work.cost,
             "description": work.description,
             "start_date": work.start_date,
@@ -63,25 +81,27 @@ def create_work(cost, description, start_date, end_date, status, vehicle_id):
     :param end_date: End date of the work.
     :param status: Current status of the work.
     :param vehicle_id: The ID of the associated vehicle.
-    :return: dict: A dictionary containing the newly created work's information or an error message.
+    :return: dict: A dictionary containing the newly created work's information.
+    :raises Conflict: If a unique value of the work is already taken.
     """
     try:
-        # Convert start_date and end_date string to datetime.date object
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
-
         work = Work(
             cost=cost,
             description=description,
-            start_date=start_date_obj,
-            end_date=end_date_obj,
+            start_date=start_date,
+            end_date=end_date,
             status=status,
             vehicle_id=vehicle_id,
         )
         db.session.add(work)
+        db.session.flush()  # Assign the work ID
+        index_document("work", work)  # Keep the search index in the same transaction
+        change = record_change("create", work)  # Feed the change log in the same transaction
         db.session.commit()
+        change_stream.publish(change)
         return {
             "work_id": work.work_id,
+            "version": work.version,
             "cost": work.cost,
             "description": work.description,
             "start_date": work.start_date,
@@ -90,12 +110,16 @@ def create_work(cost, description, start_date, end_date, status, vehicle_id):
             "vehicle_id": work.vehicle_id,
             "created_at": work.created_at,
         }
+    except IntegrityError as e:
+        db.session.rollback()
+        logger.error(f"Error creating work: {e}")
+        raise Conflict("The work conflicts with an existing record (a unique value is already taken).")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error creating work: {e}")
-        return {"error": "Internal Server Error"}
+        raise
 
-def update_work(work_id, cost=None, description=None, start_date=None, end_date=None, status=None, vehicle_id=None):
+def update_work(work_id, cost=None, description=None, start_date=None, end_date=None, status=None, vehicle_id=None, expected_versions=None):
     """
     Update an existing work.
     :param work_id: The ID of the work to update.
@@ -105,27 +129,30 @@ def update_work(work_id, cost=None, description=None, start_date=None, end_date=
     :param end_date: The updated end date.
     :param status: The updated status.
     :param vehicle_id: The updated vehicle ID.
+    :param expected_versions: The versions the client read (If-Match), or None to skip the check.
     :return: dict: A dictionary containing the updated work's information or an error message.
     """
     try:
-        # Convert start_date and end_date string to datetime.date object
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
-
         work = Work.query.get(work_id)
         if not work:
             return None
+        check_version(work, expected_versions, f"Work {work_id}")
 
         work.cost = cost if cost is not None else work.cost
         work.description = description if description else work.description
-        work.start_date = start_date_obj if start_date_obj else work.start_date
-        work.end_date = end_date_obj if end_date_obj else work.end_date
+        work.start_date = start_date if start_date else work.start_date
+        work.end_date = end_date if end_date else work.end_date
         work.status = status if status else work.status
         work.vehicle_id = vehicle_id if vehicle_id else work.vehicle_id
+        index_document("work", work)
 
+        change = record_change("update", work)
         db.session.commit()
+        change_stream.publish(change)
+        entity_cache("work").invalidate(work_id)
         return {
             "work_id": work.work_id,
+            "version": work.version,
             "cost": work.cost,
             "description": work.description,
             "start_date": work.start_date,
@@ -134,6 +161,12 @@ def update_work(work_id, cost=None, description=None, start_date=None, end_date=
             "vehicle_id": work.vehicle_id,
             "created_at": work.created_at,
         }
+    except PreconditionFailed:
+        db.session.rollback()
+        raise
+    except StaleDataError:
+        db.session.rollback()
+        raise modified_concurrently(f"Work {work_id}")
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating work {work_id}: {e}")
@@ -150,7 +183,11 @@ def delete_work(work_id):
         if not work:
             return None
         db.session.delete(work)
+        remove_document("work", work_id)
+        change = record_change("delete", work)
         db.session.commit()
+        change_stream.publish(change)
+        entity_cache("work").invalidate(work_id)
         return {"message": f"Work {work_id} deleted successfully"}
     except Exception as e:
         db.session.rollback()
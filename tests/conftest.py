@@ -0,0 +1,60 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The configuration is read when config.py is imported: point it at a copy of the database first
+_workdir = tempfile.mkdtemp(prefix="garage-tests-")
+shutil.copy(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "app.db"),
+            os.path.join(_workdir, "app.db"))
+os.environ.update({
+    "DATABASE_URI": f"sqlite:///{os.path.join(_workdir, 'app.db')}",
+    "JOB_RESULTS_DIR": os.path.join(_workdir, "jobs"),
+    "AUTH_ENABLED": "1",
+    "SECRET_KEY": "tests",
+    "RATE_LIMIT_ENABLED": "0",
+    "WARMUP_ENABLED": "0",
+})
+
+# Employees of the sample database used by the tests
+MANAGER_EMAIL = "ana.costa@example.com"
+MECHANIC_EMAIL = "pedro.martins@example.com"
+PASSWORD = "garage-tests"
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+    from services.auth_service import set_password
+    from services.sync_service import change_follower
+
+    app = create_app()
+    with app.app_context():
+        set_password(MANAGER_EMAIL, PASSWORD)
+        set_password(MECHANIC_EMAIL, PASSWORD)
+    yield app
+    change_follower.stop()
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, email=MANAGER_EMAIL):
+    """
+    Log in an employee of the sample database and return the headers of an authenticated request.
+    """
+    response = client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+    assert response.status_code == 200, response.get_json()
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return login(client)
@@ -0,0 +1,47 @@
+from datetime import date
+
+from sqlalchemy import text
+
+from services.archive_service import run_archiving
+from utils.database import db
+
+# Old enough to be archived by the cutoff below, and nothing from the sample data is
+CUTOFF = date(2000, 6, 1)
+
+
+def work_order(employee_id, day, with_item=False):
+    order = {
+        "description": "Archived order", "status": "cancelled", "vehicle_id": 1,
+        "start_date": day, "end_date": day,
+        "tasks": [{"description": "Archived task", "status": "cancelled", "start_date": day,
+                   "end_date": day, "employee_id": employee_id}],
+    }
+    if with_item:
+        order["invoice_items"] = [{"task": 0, "cost": 10.0}]
+    return order
+
+
+def test_archived_ids_are_not_reused(app, client, auth_headers):
+    response = client.post("/api/work-order", json=work_order(4, "2000-01-03", with_item=True), headers=auth_headers)
+    assert response.status_code == 201, response.get_json()
+    archived = response.get_json()
+    with app.app_context():
+        db.session.execute(text("UPDATE invoice SET issued_at = '2000-01-03 10:00:00' WHERE invoice_id = :id"),
+                           {"id": archived["invoice"]["invoice_id"]})
+        db.session.commit()
+        report = run_archiving(CUTOFF)
+    assert report["work"] == 1 and report["task"] == 1
+    assert report["invoice"] == 1 and report["invoice_item"] == 1
+
+    # The archived rows were the newest of their tables: a new order must not take their IDs
+    response = client.post("/api/work-order", json=work_order(4, "2031-01-03", with_item=True), headers=auth_headers)
+    assert response.status_code == 201, response.get_json()
+    created = response.get_json()
+    assert created["work"]["work_id"] > archived["work"]["work_id"]
+    assert created["tasks"][0]["task_id"] > archived["tasks"][0]["task_id"]
+    assert created["invoice"]["invoice_id"] > archived["invoice"]["invoice_id"]
+    assert created["invoice_items"][0]["item_id"] > archived["invoice_items"][0]["item_id"]
+
+    response = client.get(f"/api/work/{archived['work']['work_id']}?include_archived=1", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()["description"] == "Archived order"
@@ -0,0 +1,33 @@
+from conftest import MECHANIC_EMAIL, PASSWORD, login
+from services.auth_service import set_password
+
+
+def test_request_without_token_is_rejected(client):
+    response = client.get("/api/work/1")
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == 'Bearer realm="api"'
+
+
+def test_logout_revokes_only_that_token(client):
+    headers = login(client)
+    other = login(client)
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+
+    assert client.get("/api/work/1", headers=headers).status_code == 401
+    assert client.get("/api/work/1", headers=other).status_code == 200
+
+
+def test_new_password_revokes_earlier_tokens(app, client):
+    headers = login(client, MECHANIC_EMAIL)
+    assert client.get("/api/work/1", headers=headers).status_code == 200
+    with app.app_context():
+        assert set_password(MECHANIC_EMAIL, PASSWORD)
+
+    assert client.get("/api/work/1", headers=headers).status_code == 401
+    # Logging in again in the same second as the revocation gives a valid token
+    assert client.get("/api/work/1", headers=login(client, MECHANIC_EMAIL)).status_code == 200
+
+
+def test_wrong_password_is_rejected(client):
+    response = client.post("/api/auth/login", json={"email": MECHANIC_EMAIL, "password": "wrong"})
+    assert response.status_code == 401
@@ -0,0 +1,49 @@
+from conftest import MECHANIC_EMAIL, login
+
+
+def batch(client, headers, requests, **options):
+    return client.post("/api/batch", json=dict(options, requests=requests), headers=headers)
+
+
+def test_responses_come_back_in_order(client, auth_headers):
+    response = batch(client, auth_headers, [
+        {"path": "/api/work/1"},
+        {"path": "/api/work/999999"},
+        {"method": "POST", "path": "/api/work/", "body": {
+            "description": "Batch work", "status": "pending", "vehicle_id": 1, "start_date": "2037-11-02",
+        }},
+    ])
+    assert response.status_code == 200
+    first, missing, created = response.get_json()
+    assert (first["status"], first["body"]["work_id"]) == (200, 1)
+    assert missing["status"] == 404
+    assert created["status"] == 201
+    assert client.get(f"/api/work/{created['body']['work_id']}", headers=auth_headers).status_code == 200
+
+
+def test_parallel_and_transaction_batches(client, auth_headers):
+    reads = [{"path": "/api/work/1"}, {"path": "/api/client/1"}, {"path": "/api/vehicle/1"}]
+    sequential = [sub["body"] for sub in batch(client, auth_headers, reads).get_json()]
+    for options in ({"parallel": True}, {"transaction": True}):
+        response = batch(client, auth_headers, reads, **options)
+        assert response.status_code == 200
+        assert [sub["body"] for sub in response.get_json()] == sequential
+
+
+def test_sub_requests_use_the_batch_credentials(client):
+    mechanic = login(client, MECHANIC_EMAIL)
+    forwarded, own = batch(client, mechanic, [
+        {"path": "/api/client/1"},
+        {"path": "/api/client/1", "headers": {"Authorization": "Bearer not-a-token"}},
+    ]).get_json()
+    assert (forwarded["status"], own["status"]) == (200, 401)
+    assert batch(client, {}, [{"path": "/api/client/1"}]).status_code == 401
+
+
+def test_invalid_batches_are_rejected(client, auth_headers):
+    assert batch(client, auth_headers, []).status_code == 400
+    assert batch(client, auth_headers, [{"path": "/api/batch"}]).status_code == 400
+    assert batch(client, auth_headers, [{"path": "/ready"}]).status_code == 400
+    assert batch(client, auth_headers, [{"method": "DELETE", "path": "/api/work/1"}],
+                 transaction=True).status_code == 400
+    assert batch(client, auth_headers, [{"path": "/api/work/1"}] * 51).status_code == 400
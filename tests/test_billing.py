@@ -0,0 +1,37 @@
+from sqlalchemy import text
+
+from models.task import Task
+from services.billing_service import unbilled_tasks
+from utils.database import db
+
+
+def completed_work(cost, statuses):
+    work_id = db.session.execute(text(
+        "INSERT INTO work (description, cost, status, start_date, vehicle_id) "
+        "VALUES ('Billing work', :cost, 'completed', '2037-10-01', 1) RETURNING work_id"
+    ), {"cost": cost}).scalar()
+    for status in statuses:
+        db.session.execute(text(
+            "INSERT INTO task (work_id, employee_id, description, status, start_date) "
+            "VALUES (:work_id, 6, 'Billing task', :status, '2037-10-01')"
+        ), {"work_id": work_id, "status": status})
+    db.session.commit()
+    return work_id
+
+
+def item_costs(work_id):
+    query = unbilled_tasks().where(Task.work_id == work_id).order_by(Task.task_id)
+    return [row.cost for row in db.session.execute(query)]
+
+
+def test_cost_is_split_over_the_billed_tasks(app):
+    with app.app_context():
+        work_id = completed_work(100.0, ["completed", "pending", "completed", "completed"])
+        assert item_costs(work_id) == [33.33, 33.33, 33.34]
+
+
+def test_last_task_takes_the_rounding_remainder(app):
+    with app.app_context():
+        assert item_costs(completed_work(0.05, ["completed"] * 3)) == [0.02, 0.02, 0.01]
+        costs = item_costs(completed_work(10.0, ["completed"] * 7))
+        assert costs[:-1] == [1.43] * 6 and round(sum(costs), 2) == 10.0
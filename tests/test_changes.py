@@ -0,0 +1,80 @@
+from conftest import login
+
+
+def read_feed(client, headers, since=0):
+    changes = []
+    while True:
+        page = client.get(f"/api/changes?since={since}&limit=1000", headers=headers).get_json()
+        changes.extend(page["changes"])
+        since = page["next_since"]
+        if not page["has_more"]:
+            return changes, since
+
+
+def test_feed_never_returns_token_revocations(client, auth_headers):
+    _, since = read_feed(client, auth_headers)
+    assert client.post("/api/auth/logout", headers=login(client)).status_code == 200
+    response = client.post("/api/work/", json={
+        "description": "Feed work", "status": "pending", "vehicle_id": 1, "start_date": "2034-01-02",
+    }, headers=auth_headers)
+    assert response.status_code == 201
+
+    changes, _ = read_feed(client, auth_headers, since)
+    assert [change["resource"] for change in changes] == ["work"]
+    assert changes[0]["record_id"] == response.get_json()["work_id"]
+    everything, _ = read_feed(client, auth_headers)
+    assert "revoked_token" not in {change["resource"] for change in everything}
+
+
+def test_revocations_still_reach_the_other_processes(app, client):
+    from services.sync_service import change_follower
+    from utils.auth import token_auth
+
+    headers = login(client)
+    token = headers["Authorization"].split()[1]
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+
+    # Another process only learns of the revocation through the change log
+    token_auth.clear_revocations()
+    change_follower._since = 0
+    with app.app_context():
+        change_follower.catch_up()
+    assert token_auth.verify(token) is None
+
+
+def test_feed_replays_every_write_in_order(client, auth_headers):
+    since = client.get("/api/changes?limit=1", headers=auth_headers).get_json()["latest_seq"]
+    created = client.post("/api/client/", json={
+        "name": "Feed Client", "email": "feed@example.com", "phone": "910000002", "address": "Rua 2",
+    }, headers=auth_headers).get_json()
+    client_id = created["client_id"]
+    assert client.put(f"/api/client/{client_id}", json={"phone": "910000003"},
+                      headers=auth_headers).status_code == 200
+    assert client.delete(f"/api/client/{client_id}", headers=auth_headers).status_code == 204
+
+    changes, _ = read_feed(client, auth_headers, since)
+    assert [(change["resource"], change["record_id"], change["action"]) for change in changes] == [
+        ("client", client_id, "create"), ("client", client_id, "update"), ("client", client_id, "delete"),
+    ]
+    assert changes[0]["data"]["name"] == "Feed Client"
+    assert changes[1]["data"]["phone"] == "910000003"
+
+
+def test_pages_resume_where_the_last_one_ended(client, auth_headers):
+    everything, latest = read_feed(client, auth_headers)
+    seqs, since, has_more = [], 0, True
+    while has_more:
+        page = client.get(f"/api/changes?since={since}&limit=7", headers=auth_headers).get_json()
+        assert len(page["changes"]) <= 7
+        seqs.extend(change["seq"] for change in page["changes"])
+        since, has_more = page["next_since"], page["has_more"]
+    assert seqs == [change["seq"] for change in everything]
+    assert since == latest
+
+    empty = client.get(f"/api/changes?since={latest}", headers=auth_headers).get_json()
+    assert (empty["changes"], empty["next_since"], empty["has_more"]) == ([], latest, False)
+
+
+def test_invalid_feed_parameters_are_rejected(client, auth_headers):
+    for query in ("since=-1", "limit=0", "limit=1001"):
+        assert client.get(f"/api/changes?{query}", headers=auth_headers).status_code == 400, query
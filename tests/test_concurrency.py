@@ -0,0 +1,43 @@
+def create_work(client, headers):
+    response = client.post("/api/work/", json={
+        "description": "Versioned work", "status": "pending", "vehicle_id": 1, "start_date": "2032-01-05",
+    }, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()["version"] == 1
+    return response.get_json()["work_id"]
+
+
+def test_update_with_current_version(client, auth_headers):
+    work_id = create_work(client, auth_headers)
+    response = client.put(f"/api/work/{work_id}", json={"status": "in_progress"},
+                          headers={**auth_headers, "If-Match": '"1"'})
+    assert response.status_code == 200, response.get_json()
+    assert response.headers["ETag"] == '"2"'
+    assert response.get_json()["version"] == 2
+
+
+def test_update_with_stale_version_fails(client, auth_headers):
+    work_id = create_work(client, auth_headers)
+    client.put(f"/api/work/{work_id}", json={"status": "in_progress"}, headers=auth_headers)
+
+    response = client.put(f"/api/work/{work_id}", json={"status": "completed"},
+                          headers={**auth_headers, "If-Match": '"1"'})
+    assert response.status_code == 412
+    assert client.get(f"/api/work/{work_id}", headers=auth_headers).get_json()["status"] == "in_progress"
+
+
+def test_update_with_any_listed_version(client, auth_headers):
+    work_id = create_work(client, auth_headers)
+    client.put(f"/api/work/{work_id}", json={"status": "in_progress"}, headers=auth_headers)
+
+    response = client.put(f"/api/work/{work_id}", json={"status": "completed"},
+                          headers={**auth_headers, "If-Match": '"1", "2"'})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["version"] == 3
+
+
+def test_weak_tags_never_match(client, auth_headers):
+    work_id = create_work(client, auth_headers)
+    response = client.put(f"/api/work/{work_id}", json={"status": "in_progress"},
+                          headers={**auth_headers, "If-Match": 'W/"1"'})
+    assert response.status_code == 412
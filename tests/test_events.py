@@ -0,0 +1,26 @@
+import threading
+import time
+
+from api.event import stream_changes
+from utils.change_stream import ChangeStream, change_stream
+
+
+def test_stream_ends_after_its_max_duration():
+    started = time.monotonic()
+    events = list(stream_changes(change_stream.position(), [], ["work", "task"], None,
+                                 heartbeat=0.05, max_replay=10, max_seconds=0.3))
+    assert 0.3 <= time.monotonic() - started < 2
+    assert events[0] == "retry: 3000\n\n"
+
+
+def test_close_wakes_the_waiting_readers():
+    stream = ChangeStream()
+    results = []
+    reader = threading.Thread(target=lambda: results.append(stream.read(stream.position(), 10)))
+    reader.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    stream.close()
+    reader.join(2)
+    assert results == [(None, [])]
+    assert time.monotonic() - started < 1
@@ -0,0 +1,59 @@
+import uuid
+
+from conftest import MECHANIC_EMAIL, login
+from models.client import Client
+
+
+def client_body(suffix):
+    return {"name": f"Idempotent {suffix}", "email": f"idempotent.{suffix}@example.com",
+            "phone": "912345678", "address": "Rua das Flores 1"}
+
+
+def test_retry_replays_the_first_response(app, client, auth_headers):
+    suffix = uuid.uuid4().hex[:8]
+    headers = {**auth_headers, "Idempotency-Key": f"client-{suffix}"}
+    first = client.post("/api/client/", json=client_body(suffix), headers=headers)
+    assert first.status_code == 201, first.get_json()
+    assert "Idempotent-Replayed" not in first.headers
+
+    retry = client.post("/api/client/", json=client_body(suffix), headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+
+    with app.app_context():
+        assert Client.query.filter_by(name=f"Idempotent {suffix}").count() == 1
+
+
+def test_key_reused_for_another_body_is_rejected(client, auth_headers):
+    suffix = uuid.uuid4().hex[:8]
+    headers = {**auth_headers, "Idempotency-Key": f"client-{suffix}"}
+    assert client.post("/api/client/", json=client_body(suffix), headers=headers).status_code == 201
+
+    response = client.post("/api/client/", json=client_body(suffix + "x"), headers=headers)
+    assert response.status_code == 422
+
+
+def test_failed_create_is_not_replayed_as_a_success(app, client, auth_headers):
+    suffix = uuid.uuid4().hex[:8]
+    assert client.post("/api/client/", json=client_body(suffix), headers=auth_headers).status_code == 201
+
+    headers = {**auth_headers, "Idempotency-Key": f"duplicate-{suffix}"}
+    first = client.post("/api/client/", json=client_body(suffix), headers=headers)
+    assert first.status_code == 409
+    retry = client.post("/api/client/", json=client_body(suffix), headers=headers)
+    assert retry.status_code == 409
+    assert "Idempotent-Replayed" not in retry.headers
+
+
+def test_keys_are_scoped_to_the_caller(client, auth_headers):
+    suffix = uuid.uuid4().hex[:8]
+    key = {"Idempotency-Key": f"shared-{suffix}"}
+    first = client.post("/api/client/", json=client_body(suffix), headers={**auth_headers, **key})
+    assert first.status_code == 201
+
+    other = client.post("/api/client/", json=client_body(suffix + "b"),
+                        headers={**login(client, MECHANIC_EMAIL), **key})
+    assert other.status_code == 201
+    assert "Idempotent-Replayed" not in other.headers
+    assert other.get_json()["client_id"] != first.get_json()["client_id"]
@@ -0,0 +1,34 @@
+def get(client, headers, path):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_related_records_are_sideloaded(client, auth_headers):
+    task = get(client, auth_headers, "/api/task/1")
+    body = get(client, auth_headers, "/api/task/1?include=employee,work")
+    assert body["data"] == task
+    assert [work["work_id"] for work in body["included"]["work"]] == [task["work_id"]]
+    [employee] = body["included"]["employee"]
+    assert employee["employee_id"] == task["employee_id"]
+    assert "password_hash" not in employee
+
+
+def test_each_related_record_is_loaded_once_for_a_page(client, auth_headers):
+    tasks = get(client, auth_headers, "/api/task/")
+    body = get(client, auth_headers, "/api/task/?include=employee")
+    assert body["data"] == tasks
+    employee_ids = [employee["employee_id"] for employee in body["included"]["employee"]]
+    assert sorted(employee_ids) == sorted({task["employee_id"] for task in tasks})
+
+
+def test_include_extends_a_multi_get(client, auth_headers):
+    body = get(client, auth_headers, "/api/task/?ids=1,999999&include=work")
+    assert body["missing"] == [999999]
+    assert [work["work_id"] for work in body["included"]["work"]] == [body["data"][0]["work_id"]]
+
+
+def test_unknown_relations_are_rejected(client, auth_headers):
+    response = client.get("/api/task/1?include=employee,invoice_secret", headers=auth_headers)
+    assert response.status_code == 400
+    assert "invoice_secret" in response.get_json()["message"]
@@ -0,0 +1,61 @@
+from services.invoice_summary_service import get_invoice_summary, rebuild_invoice_summary
+
+
+def client_totals(client, headers, client_id):
+    response = client.get("/api/invoice/summary?group_by=client", headers=headers)
+    assert response.status_code == 200
+    row = next((row for row in response.get_json() if row["client_id"] == client_id), None)
+    return (row["invoice_count"], row["total"], row["total_with_iva"]) if row else (0, 0.0, 0.0)
+
+
+def added(after, before):
+    return tuple(round(a - b, 2) for a, b in zip(after, before))
+
+
+def new_invoice(client, headers, client_id, total):
+    response = client.post("/api/invoice/", json={
+        "iva": 0.23, "total": total, "total_with_iva": round(total * 1.23, 2), "client_id": client_id,
+    }, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()["invoice_id"]
+
+
+def test_summary_follows_every_invoice_write(app, client, auth_headers):
+    response = client.post("/api/client/", json={
+        "name": "Summary Client", "email": "summary@example.com", "phone": "910000001", "address": "Rua 1",
+    }, headers=auth_headers)
+    client_id = response.get_json()["client_id"]
+    # The sample data may already hold invoices of a deleted client with the same ID
+    before = client_totals(client, auth_headers, client_id)
+
+    first = new_invoice(client, auth_headers, client_id, 100.0)
+    second = new_invoice(client, auth_headers, client_id, 50.0)
+    assert added(client_totals(client, auth_headers, client_id), before) == (2, 150.0, 184.5)
+
+    response = client.put(f"/api/invoice/{first}", json={"total": 80.0, "total_with_iva": 98.4},
+                          headers=auth_headers)
+    assert response.status_code == 200, response.get_json()
+    assert added(client_totals(client, auth_headers, client_id), before) == (2, 130.0, 159.9)
+
+    assert client.delete(f"/api/invoice/{second}", headers=auth_headers).status_code == 204
+    assert added(client_totals(client, auth_headers, client_id), before) == (1, 80.0, 98.4)
+    assert client.delete(f"/api/invoice/{first}", headers=auth_headers).status_code == 204
+    assert client_totals(client, auth_headers, client_id) == before
+
+
+def test_maintained_summary_equals_a_rebuild(app, client, auth_headers):
+    with app.app_context():
+        rebuild_invoice_summary()  # Other tests backdate invoices behind the summary's back
+    invoice_id = new_invoice(client, auth_headers, 1, 40.0)
+    client.put(f"/api/invoice/{invoice_id}", json={"client_id": 2}, headers=auth_headers)
+    response = client.post("/api/work-order", json={
+        "description": "Summary order", "vehicle_id": 1, "start_date": "2037-09-01",
+        "tasks": [{"description": "Summary task", "start_date": "2037-09-01", "employee_id": 6}],
+        "invoice_items": [{"task": 0, "cost": 12.5}],
+    }, headers=auth_headers)
+    assert response.status_code == 201, response.get_json()
+
+    with app.app_context():
+        maintained = get_invoice_summary(group_by="month,client")
+        rebuild_invoice_summary()
+        assert get_invoice_summary(group_by="month,client") == maintained
@@ -0,0 +1,34 @@
+from services.multi_get_service import MAX_QUERY_IDS
+
+
+def test_records_come_in_the_order_asked(client, auth_headers):
+    response = client.get("/api/work/?ids=3,1,999999,3,2", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [work["work_id"] for work in body["data"]] == [3, 1, 2]
+    assert body["missing"] == [999999]
+    assert body["data"][1] == client.get("/api/work/1", headers=auth_headers).get_json()
+
+
+def test_lookup_takes_the_ids_in_the_body(client, auth_headers):
+    response = client.post("/api/vehicle/lookup", json={"ids": [1, 999999]}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [vehicle["vehicle_id"] for vehicle in body["data"]] == [1]
+    assert body["missing"] == [999999]
+    assert "plate_key" not in body["data"][0]
+
+
+def test_cached_records_follow_updates(client, auth_headers):
+    client.get("/api/work/?ids=1", headers=auth_headers)  # Now cached
+    response = client.put("/api/work/1", json={"description": "Multi-get update"}, headers=auth_headers)
+    assert response.status_code == 200, response.get_json()
+    body = client.get("/api/work/?ids=1", headers=auth_headers).get_json()
+    assert body["data"][0]["description"] == "Multi-get update"
+
+
+def test_invalid_id_lists_are_rejected(client, auth_headers):
+    too_many = ",".join(str(record_id) for record_id in range(1, MAX_QUERY_IDS + 2))
+    for ids in ("1,two", "-1", ",", too_many):
+        assert client.get(f"/api/work/?ids={ids}", headers=auth_headers).status_code == 400, ids
+    assert client.post("/api/work/lookup", json={"ids": []}, headers=auth_headers).status_code == 400
@@ -0,0 +1,54 @@
+import json
+
+from flask_restx import Model, fields
+from flask_restx.utils import merge
+
+from api import api, register_api
+from utils.openapi import FINGERPRINT_KEY, apply_openapi_spec, build_openapi_spec, load_openapi_spec, merge_doc
+
+
+def prebuilt(app, tmp_path, monkeypatch, edit=None):
+    register_api(app)
+    path = build_openapi_spec(app, api, str(tmp_path / "openapi.json"))
+    if edit:
+        with open(path) as spec_file:
+            schema = json.load(spec_file)
+        edit(schema)
+        with open(path, "w") as spec_file:
+            json.dump(schema, spec_file)
+    monkeypatch.setitem(app.config, "OPENAPI_SPEC_PATH", path)
+    monkeypatch.delitem(app.extensions, "openapi_spec", raising=False)
+    assert load_openapi_spec(app, api)
+
+
+def test_spec_built_from_the_api_is_used(app, client, tmp_path, monkeypatch):
+    prebuilt(app, tmp_path, monkeypatch)
+    assert apply_openapi_spec(app, api)
+
+    response = client.get("/api/swagger.json")
+    assert response.status_code == 200
+    assert FINGERPRINT_KEY in response.get_json()
+
+
+def test_stale_spec_is_ignored(app, client, tmp_path, monkeypatch):
+    def remove_route(schema):
+        schema["paths"].pop("/work-order")
+        schema[FINGERPRINT_KEY] = "built before /work-order existed"
+
+    prebuilt(app, tmp_path, monkeypatch, edit=remove_route)
+    assert not apply_openapi_spec(app, api)
+
+    response = client.get("/api/swagger.json")
+    assert response.status_code == 200
+    assert "/work-order" in response.get_json()["paths"]
+
+
+def test_merge_doc_matches_flask_restx_without_copying_models():
+    model = Model("MergeDocTest", {"name": fields.String})
+    first = {"params": {"q": {"in": "query"}}, "get": {"expect": [model]}}
+    second = {"params": {"q": {"description": "Search"}}, "get": {"responses": {"200": ("OK", model, {})}}}
+
+    merged = merge_doc(first, second)
+    assert merged == merge(first, second)
+    assert merged["get"]["expect"][0] is model
+    assert merged["params"] is not first["params"]
@@ -0,0 +1,34 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+# A server whose workers hang in worker_init, after writing their pid
+SERVER = """
+import os, sys, time
+from utils.prefork import PreforkServer
+
+def hang(app):
+    with open(sys.argv[1], "a") as pids:
+        pids.write(f"{os.getpid()}\\n")
+    time.sleep(60)
+
+PreforkServer(lambda environ, start_response: [], "127.0.0.1", 0, workers=1, timeout=1,
+              graceful_timeout=0.5, worker_init=hang).run()
+"""
+
+
+def test_master_replaces_a_worker_without_heartbeat(tmp_path):
+    pids = tmp_path / "pids"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    master = subprocess.Popen([sys.executable, "-c", SERVER, str(pids)], cwd=root)
+    try:
+        started, deadline = [], time.monotonic() + 10
+        while len(started) < 2 and time.monotonic() < deadline:
+            time.sleep(0.1)
+            started = pids.read_text().split() if pids.exists() else []
+        assert len(started) >= 2  # The first worker was killed after timeout and replaced
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(10)
@@ -0,0 +1,54 @@
+import re
+from collections import OrderedDict
+from fnmatch import translate
+
+from conftest import MECHANIC_EMAIL, login
+from utils.rate_limit import RateLimiter, TokenBucket, parse_limit, rate_limiter
+
+
+def rule(pattern, limit):
+    return (pattern, re.compile(translate(pattern)), *parse_limit(limit))
+
+
+def test_bucket_refills_at_its_rate():
+    bucket = TokenBucket(capacity=2, rate=0.5)
+    now = bucket.updated
+    assert bucket.take(now) == 0 and bucket.take(now) == 0
+    assert bucket.take(now) == 2.0  # Seconds until the next token
+    assert bucket.take(now + 1) == 1.0
+    assert bucket.take(now + 2) == 0
+    bucket.refill(now + 100)
+    assert bucket.tokens == 2  # Never above capacity
+
+
+def test_first_matching_rule_applies_per_client():
+    limiter = RateLimiter()
+    limiter.rules = [rule("GET /api/task/*", "1/minute"), rule("GET *", "2/minute")]
+    assert limiter.hit("a", "GET", "/api/task/<int:task_id>")[3] == 0
+    assert limiter.hit("a", "GET", "/api/task/<int:task_id>")[3] > 0
+    assert limiter.hit("b", "GET", "/api/task/<int:task_id>")[3] == 0  # Another client, another bucket
+    assert limiter.hit("a", "GET", "/api/work/")[1] == 2
+    assert limiter.hit("a", "POST", "/api/work/") == (None, None, None, 0.0)
+
+
+def test_buckets_are_bounded():
+    limiter = RateLimiter()
+    limiter.rules = [rule("*", "1/minute")]
+    limiter.max_buckets = 3
+    for client in range(10):
+        limiter.hit(str(client), "GET", "/api/work/")
+    assert limiter.snapshot()["bucket_count"] == 3
+
+
+def test_requests_over_the_limit_get_429(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    monkeypatch.setattr(rate_limiter, "rules", [rule("GET /api/client/", "2/minute")])
+    monkeypatch.setattr(rate_limiter, "_route_rules", {})
+    monkeypatch.setattr(rate_limiter, "_buckets", OrderedDict())
+
+    responses = [client.get("/api/client/", headers=auth_headers) for _ in range(2)]
+    assert [response.headers["X-RateLimit-Remaining"] for response in responses] == ["1", "0"]
+    limited = client.get("/api/client/", headers=dict(auth_headers, **{"X-API-Key": "fresh"}))
+    assert limited.status_code == 429  # Unverified headers do not earn a fresh bucket
+    assert int(limited.headers["Retry-After"]) == 30
+    assert client.get("/api/client/", headers=login(client, MECHANIC_EMAIL)).status_code == 200
@@ -0,0 +1,74 @@
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from services.schedule_service import task_schedule
+from utils.database import db
+from utils.interval_tree import IntervalTree
+
+EMPLOYEE_ID = 4
+
+
+def new_task(client, headers, start, end=None, status="pending", check=True):
+    return client.post("/api/task/" + ("?check_conflicts=1" if check else ""), json={
+        "description": "Schedule task", "status": status, "work_id": 1, "employee_id": EMPLOYEE_ID,
+        "start_date": start, "end_date": end,
+    }, headers=headers)
+
+
+def test_interval_tree_matches_a_scan():
+    rng = random.Random(30)
+    tree, intervals = IntervalTree(), {}
+    for key in range(500):
+        start = date(2030, 1, 1) + timedelta(days=rng.randrange(365))
+        intervals[key] = (start, start + timedelta(days=rng.randrange(10)))
+        tree.add(*intervals[key], key)
+    for key in rng.sample(sorted(intervals), 200):
+        assert tree.remove(*intervals.pop(key), key)
+    assert len(tree) == len(intervals) == 300
+
+    for _ in range(200):
+        start = date(2030, 1, 1) + timedelta(days=rng.randrange(365))
+        end = start + timedelta(days=rng.randrange(5))
+        expected = {key for key, (first, last) in intervals.items() if first <= end and last >= start}
+        assert set(tree.overlapping(start, end)) == expected
+        assert tree.overlaps(start, end) == bool(expected)
+
+
+def test_double_booking_is_rejected_on_request(client, auth_headers):
+    booked = new_task(client, auth_headers, "2037-05-04", "2037-05-08")
+    assert booked.status_code == 201, booked.get_json()
+
+    assert new_task(client, auth_headers, "2037-05-08", "2037-05-10").status_code == 409
+    assert new_task(client, auth_headers, "2037-05-06").status_code == 409  # No end date: its start day
+    assert new_task(client, auth_headers, "2037-05-06", check=False).status_code == 201
+    assert new_task(client, auth_headers, "2037-05-09", "2037-05-10").status_code == 201
+    # Cancelled tasks neither conflict nor occupy the employee
+    assert new_task(client, auth_headers, "2037-05-20", status="cancelled").status_code == 201
+    assert new_task(client, auth_headers, "2037-05-20").status_code == 201
+
+
+def test_booking_missing_from_the_schedule_is_still_found(app, client, auth_headers):
+    # Written by another process: this one's in-memory schedule does not know it
+    with app.app_context():
+        task_schedule.load()
+        db.session.execute(text(
+            "INSERT INTO task (work_id, employee_id, description, status, start_date, end_date) "
+            "VALUES (1, :employee_id, 'Other worker task', 'pending', '2037-06-10', '2037-06-12')"
+        ), {"employee_id": EMPLOYEE_ID})
+        db.session.commit()
+
+    assert new_task(client, auth_headers, "2037-06-11").status_code == 409
+
+
+def test_available_employees_exclude_the_booked_ones(client, auth_headers):
+    assert new_task(client, auth_headers, "2037-07-01", "2037-07-03").status_code == 201
+
+    def available(date_from, date_to):
+        response = client.get(f"/api/employee/available?from={date_from}&to={date_to}", headers=auth_headers)
+        assert response.status_code == 200
+        return {employee["employee_id"] for employee in response.get_json()}
+
+    assert EMPLOYEE_ID not in available("2037-07-03", "2037-07-05")
+    assert EMPLOYEE_ID in available("2037-07-04", "2037-07-05")
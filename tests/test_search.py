@@ -0,0 +1,38 @@
+def create_client(client, headers, name, address, email):
+    response = client.post("/api/client/", json={
+        "name": name, "email": email, "phone": "910000000", "address": address,
+    }, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()["client_id"]
+
+
+def search(client, headers, query):
+    response = client.get(f"/api/search?{query}", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_name_matches_rank_before_address_matches(client, auth_headers):
+    by_address = create_client(client, auth_headers, "Search Address Client", "Rua Quintanilha 3", "search.1@example.com")
+    by_name = create_client(client, auth_headers, "Zé Quintanilha", "Rua Direita 1", "search.2@example.com")
+
+    page = search(client, auth_headers, "q=quintan&type=client")
+    assert [result["id"] for result in page["results"]] == [by_name, by_address]
+    assert page["results"][0]["rank"] <= page["results"][1]["rank"]  # bm25: lower is better
+
+
+def test_diacritics_are_folded_and_pages_follow_the_ranking(client, auth_headers):
+    create_client(client, auth_headers, "João Rebordões", "Rua Rebordões 5", "search.3@example.com")
+    create_client(client, auth_headers, "Rebordões Auto", "Avenida Central 9", "search.4@example.com")
+
+    first = search(client, auth_headers, "q=rebordoes&type=client&per_page=1")
+    second = search(client, auth_headers, "q=rebordoes&type=client&per_page=1&page=2")
+    everything = search(client, auth_headers, "q=rebordoes&type=client")
+    assert first["has_more"] and not second["has_more"]
+    assert [page["results"][0]["id"] for page in (first, second)] == [result["id"] for result in everything["results"]]
+
+
+def test_results_hide_internal_columns(client, auth_headers):
+    page = search(client, auth_headers, "q=a&type=vehicle&per_page=5")
+    assert page["results"]
+    assert all("plate_key" not in result["data"] for result in page["results"])
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+from flask import g
+
+from utils.single_flight import SingleFlight, coalesce
+
+
+def run_concurrently(count, target):
+    results = [None] * count
+
+    def run(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def wait_for_waiters(group, key_count=1):
+    # Let the followers reach the in-flight call before the leader finishes
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and len(group._calls) < key_count:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+
+def test_concurrent_calls_share_one_execution():
+    group, release, executions = SingleFlight(), threading.Event(), []
+
+    def compute():
+        executions.append(1)
+        release.wait(2)
+        return {"rows": 3}
+
+    threads, results = run_concurrently(5, lambda: group.do("key", compute, "reads"))
+    wait_for_waiters(group)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert len(executions) == 1
+    assert results == [{"rows": 3}] * 5
+    assert group.snapshot() == {"in_flight": 0, "routes": [{"executions": 1, "coalesced": 4, "name": "reads"}]}
+
+    # Nothing is cached: a later call runs again
+    assert group.do("key", lambda: "fresh") == "fresh"
+
+
+def test_waiters_get_the_leader_error():
+    group, release = SingleFlight(), threading.Event()
+
+    def fail():
+        release.wait(2)
+        raise ValueError("database is locked")
+
+    threads, results = run_concurrently(3, lambda: group.do("key", fail))
+    wait_for_waiters(group)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert [str(result) for result in results] == ["database is locked"] * 3
+    with pytest.raises(KeyError):
+        group.do("key", lambda: {}["missing"])
+
+
+def test_requests_of_different_roles_are_not_shared(app, monkeypatch):
+    import utils.single_flight
+
+    group, release, roles = SingleFlight(), threading.Event(), []
+    monkeypatch.setattr(utils.single_flight, "single_flight", group)
+
+    @coalesce
+    def handler():
+        roles.append(g.auth["role"])
+        release.wait(2)
+        return g.auth["role"]
+
+    def request_as(role, sub):
+        with app.test_request_context("/api/client/?page=1"):
+            g.auth = {"sub": sub, "role": role}
+            return handler()
+
+    callers = [("manager", 2), ("manager", 5), ("mechanic", 3)]
+    threads = []
+    results = {}
+    for role, sub in callers:
+        thread = threading.Thread(target=lambda role=role, sub=sub: results.setdefault(sub, request_as(role, sub)))
+        thread.start()
+        threads.append(thread)
+    wait_for_waiters(group, key_count=2)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert sorted(roles) == ["manager", "mechanic"]  # The two managers shared one execution
+    assert results == {2: "manager", 5: "manager", 3: "mechanic"}
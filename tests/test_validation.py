@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from models.work import Work
+from utils.validation import compile_validator
+
+work_validator = compile_validator(Work, readonly_fields=["work_id", "created_at"])
+
+
+def errors_of(payload, partial=False):
+    with pytest.raises(BadRequest) as raised:
+        work_validator(payload, partial)
+    return raised.value.data["errors"]
+
+
+def test_values_are_typed():
+    values = work_validator({"description": "Brakes", "cost": 120, "start_date": "2037-12-01", "vehicle_id": 1})
+    assert values == {
+        "cost": 120.0, "description": "Brakes", "end_date": None, "start_date": date(2037, 12, 1),
+        "status": None, "vehicle_id": 1,
+    }
+    assert "version" not in values and "work_id" not in values
+
+
+def test_every_error_is_reported():
+    errors = errors_of({"description": "x" * 81, "cost": "12", "start_date": "01/12/2037", "vehicle_id": True})
+    assert set(errors) == {"description", "cost", "start_date", "vehicle_id"}
+    assert errors_of({})["start_date"] == "'start_date' is a required property"
+    assert errors_of(["not", "an", "object"]) == {"": "The request body must be a JSON object"}
+
+
+def test_partial_updates_only_hold_the_given_fields():
+    assert work_validator({"status": "completed", "cost": None}, partial=True) == {"status": "completed"}
+    assert set(errors_of({"end_date": "tomorrow"}, partial=True)) == {"end_date"}
+
+
+def test_api_answers_400_with_the_field_errors(client, auth_headers):
+    response = client.post("/api/work/", json={"description": "Typed work", "start_date": "2037-13-01",
+                                               "vehicle_id": "1"}, headers=auth_headers)
+    assert response.status_code == 400
+    assert set(response.get_json()["errors"]) == {"start_date", "vehicle_id"}
+
+    response = client.put("/api/work/1", json={"cost": "free"}, headers=auth_headers)
+    assert response.status_code == 400
+    assert set(response.get_json()["errors"]) == {"cost"}
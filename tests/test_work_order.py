@@ -0,0 +1,68 @@
+from models.invoice import Invoice
+from models.task import Task
+from models.work import Work
+from utils.database import db
+
+import services.work_order_service
+
+
+def order(description, *task_days, with_item=True):
+    return {
+        "description": description, "vehicle_id": 1, "start_date": task_days[0],
+        "tasks": [{"description": f"{description} task {index}", "start_date": day, "end_date": day,
+                   "employee_id": 4} for index, day in enumerate(task_days)],
+        "invoice_items": [{"task": 0, "cost": 25.0}] if with_item else [],
+    }
+
+
+def row_counts(app):
+    with app.app_context():
+        return {model: db.session.query(model).count() for model in (Work, Task, Invoice)}
+
+
+def test_order_is_created_whole(app, client, auth_headers):
+    response = client.post("/api/work-order", json=order("Whole order", "2033-02-01", "2033-02-02"),
+                           headers=auth_headers)
+    assert response.status_code == 201, response.get_json()
+    created = response.get_json()
+    assert [task["work_id"] for task in created["tasks"]] == [created["work"]["work_id"]] * 2
+    assert created["invoice_items"][0]["task_id"] == created["tasks"][0]["task_id"]
+
+
+def test_invalid_order_writes_nothing(app, client, auth_headers):
+    before = row_counts(app)
+    body = order("Invalid order", "2033-03-01")
+    body["invoice_items"] = [{"task": 5, "cost": 25.0}]
+    response = client.post("/api/work-order", json=body, headers=auth_headers)
+    assert response.status_code == 400
+    assert row_counts(app) == before
+
+
+def test_body_errors_are_keyed_by_path(app, client, auth_headers):
+    before = row_counts(app)
+    body = order("Badly typed order", "2033-03-05")
+    body["tasks"][0]["start_date"] = "05/03/2033"
+    body["invoice_items"] = [{"task": 0, "cost": "25"}]
+    response = client.post("/api/work-order", json=body, headers=auth_headers)
+    assert response.status_code == 400
+    assert set(response.get_json()["errors"]) == {"tasks[0].start_date", "invoice_items[0].cost"}
+    assert row_counts(app) == before
+
+
+def test_double_booking_writes_nothing(app, client, auth_headers):
+    before = row_counts(app)
+    response = client.post("/api/work-order?check_conflicts=1",
+                           json=order("Double booked order", "2033-04-01", "2033-04-01"), headers=auth_headers)
+    assert response.status_code == 409
+    assert row_counts(app) == before
+
+
+def test_failure_after_the_inserts_rolls_everything_back(app, client, auth_headers, monkeypatch):
+    def fail(invoice_ids):
+        raise RuntimeError("summary unavailable")
+
+    monkeypatch.setattr(services.work_order_service, "apply_invoices", fail)
+    before = row_counts(app)
+    response = client.post("/api/work-order", json=order("Rolled back order", "2033-05-01"), headers=auth_headers)
+    assert response.status_code == 500
+    assert row_counts(app) == before
@@ -0,0 +1,52 @@
+from sqlalchemy import text
+
+from services.employee_service import workload_cache
+from utils.database import db
+
+EMPLOYEE_ID = 6
+
+
+def add_task(app, status, start, end=None):
+    # Straight to the table: the API always sets a status
+    with app.app_context():
+        db.session.execute(text(
+            "INSERT INTO task (work_id, employee_id, description, status, start_date, end_date) "
+            "VALUES (1, :employee_id, 'Workload task', :status, :start, :end)"
+        ), {"employee_id": EMPLOYEE_ID, "status": status, "start": start, "end": end})
+        db.session.commit()
+    workload_cache.clear()
+
+
+def workload(client, headers, date_from, date_to):
+    response = client.get(f"/api/employee/workload?from={date_from}&to={date_to}", headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return next(row for row in response.get_json() if row["employee_id"] == EMPLOYEE_ID)
+
+
+def test_days_booked_inside_the_range(app, client, auth_headers):
+    add_task(app, "pending", "2035-01-30", "2035-02-03")  # 2 days in January
+    add_task(app, "completed", "2035-01-10")  # No end date: one day
+    add_task(app, "cancelled", "2035-01-12", "2035-01-20")  # Not booked
+
+    row = workload(client, auth_headers, "2035-01-01", "2035-01-31")
+    assert row["tasks"] == 3
+    assert row["days_booked"] == 3
+    assert (row["open_tasks"], row["finished_tasks"], row["cancelled_tasks"]) == (1, 1, 1)
+
+
+def test_task_without_status_is_open_and_booked(app, client, auth_headers):
+    add_task(app, None, "2036-03-02", "2036-03-04")
+
+    row = workload(client, auth_headers, "2036-03-01", "2036-03-31")
+    assert row["open_tasks"] == 1
+    assert row["days_booked"] == 3
+
+
+def test_new_task_refreshes_the_cached_report(app, client, auth_headers):
+    assert workload(client, auth_headers, "2037-05-01", "2037-05-31")["tasks"] == 0
+    response = client.post("/api/task/", json={
+        "description": "Late booking", "status": "pending", "start_date": "2037-05-10",
+        "end_date": "2037-05-11", "work_id": 1, "employee_id": EMPLOYEE_ID,
+    }, headers=auth_headers)
+    assert response.status_code == 201, response.get_json()
+    assert workload(client, auth_headers, "2037-05-01", "2037-05-31")["days_booked"] == 2
@@ -0,0 +1,195 @@
+import logging
+import secrets
+import threading
+import time
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from utils.cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# API paths served without a token: the login itself and the documentation
+PUBLIC_PATHS = ("/api/auth/login", "/api/docs", "/api/swagger.json")
+
+# Event streams are opened by EventSource, which cannot send headers: the token may come in ?access_token=
+QUERY_TOKEN_PATHS = ("/api/events",)
+
+# Separates the auth tokens from anything else signed with the same keys
+TOKEN_SALT = "auth-token"
+
+
+class TokenAuth:
+    """
+    Stateless bearer-token authentication for the API.
+
+    Employees log in once (services.auth_service.login: one query and one password hash
+    check) and receive a token signed with itsdangerous, holding their id, role, a token
+    id and the issue time (to the microsecond, as revocations are). Every API request then only checks the signature and age of
+    its token, without touching the database: the outcome is kept in an LRU keyed by the
+    token, so a client sending the same token again costs a dictionary lookup.
+
+    AUTH_SECRET_KEYS lists the signing keys, oldest first: tokens are signed with the last
+    one and accepted with any of them, so a key is rotated by appending a new one and
+    dropping the old one once the tokens it signed have expired. Logged out tokens, and
+    every token of an employee whose password changed or who was deleted, are held in a
+    revocation list until they expire; it is loaded from the revoked_token table at start
+    and kept in sync between server workers through the change log.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.token_ttl = 3600
+        self._serializer = None
+        self._verified = ResultCache(maxsize=10000)  # token -> claims of a valid signature
+        self._revoked_ids = {}  # token id -> expiry (epoch seconds)
+        self._revoked_before = {}  # employee id -> (issue times up to this one are revoked, expiry)
+        self._lock = threading.Lock()
+        self.key_count = 0
+        self.verifications = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+
+    def init_app(self, app):
+        """
+        Load the keys from the configuration and check the token of every API request.
+        """
+        self.enabled = app.config["AUTH_ENABLED"]
+        self.token_ttl = app.config["AUTH_TOKEN_TTL_SECONDS"]
+        keys = app.config["AUTH_SECRET_KEYS"]
+        if not keys:
+            logger.warning("No AUTH_SECRET_KEYS or SECRET_KEY set: tokens are signed with a random key "
+                           "and become invalid when the server restarts")
+            keys = [secrets.token_urlsafe(32)]
+        self.key_count = len(keys)
+        self._serializer = URLSafeTimedSerializer(keys, salt=TOKEN_SALT)
+        self._verified = ResultCache(maxsize=app.config["AUTH_CACHE_SIZE"])
+        app.extensions["token_auth"] = self
+        app.before_request(self.check_request)
+        app.after_request(self.add_headers)
+
+    def issue(self, employee_id, role):
+        """
+        Sign a new token for an employee.
+        :return: tuple: (token, token id).
+        """
+        token_id = secrets.token_hex(8)
+        claims = {"sub": employee_id, "role": role, "jti": token_id, "iat": time.time()}
+        return self._serializer.dumps(claims), token_id
+
+    def verify(self, token):
+        """
+        Check a token: signature, age and revocation.
+        :return: dict: The claims (sub, role, jti, iat, exp), or None if the token is not valid.
+        """
+        now = time.time()
+        claims = self._verified.get(token)
+        if claims is None:
+            try:
+                claims, issued_at = self._serializer.loads(token, max_age=self.token_ttl, return_timestamp=True)
+            except (SignatureExpired, BadSignature):
+                return None
+            # The signature's timestamp is in whole seconds: it sets the expiry, but a token
+            # issued later in the second of a revocation must not be taken for an older one
+            claims = {"iat": issued_at.timestamp(), **claims, "exp": issued_at.timestamp() + self.token_ttl}
+            self._verified.set(token, claims)
+        if claims["exp"] <= now or self.is_revoked(claims):
+            return None
+        return claims
+
+    def is_revoked(self, claims):
+        if claims["jti"] in self._revoked_ids:
+            return True
+        revoked_before = self._revoked_before.get(claims["sub"])
+        return revoked_before is not None and claims["iat"] <= revoked_before[0]
+
+    def revoke(self, token_id=None, employee_id=None, revoked_at=None, expires_at=None):
+        """
+        Add an entry to the revocation list: one token, or every token issued to an
+        employee up to revoked_at. Entries are dropped once the tokens they cover have expired.
+        :param revoked_at: Epoch seconds (defaults to now).
+        :param expires_at: Epoch seconds after which the entry is useless.
+        """
+        now = time.time()
+        revoked_at = revoked_at or now
+        expires_at = expires_at or revoked_at + self.token_ttl
+        with self._lock:
+            if token_id:
+                self._revoked_ids[token_id] = expires_at
+            if employee_id is not None:
+                previous = self._revoked_before.get(employee_id)
+                if previous is None or previous[0] < revoked_at:
+                    self._revoked_before[employee_id] = (revoked_at, expires_at)
+            self._revoked_ids = {key: expiry for key, expiry in self._revoked_ids.items() if expiry > now}
+            self._revoked_before = {key: entry for key, entry in self._revoked_before.items() if entry[1] > now}
+
+    def clear_revocations(self):
+        with self._lock:
+            self._revoked_ids = {}
+            self._revoked_before = {}
+
+    @staticmethod
+    def request_token():
+        """
+        The bearer token of the current request, if any.
+        """
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            return token.strip()
+        if request.path.startswith(QUERY_TOKEN_PATHS):
+            return request.args.get("access_token")
+        return None
+
+    def check_request(self):
+        if not self.enabled or not request.path.startswith("/api/") or request.path.startswith(PUBLIC_PATHS):
+            return None
+        started = time.perf_counter()
+        token = self.request_token()
+        claims = self.verify(token) if token else None
+        g.auth_ms = (time.perf_counter() - started) * 1000
+        self.verifications += 1
+        self.total_ms += g.auth_ms
+        if claims is None:
+            self.rejected += 1
+            response = jsonify({
+                "status": "error",
+                "message": "A valid token is required (POST /api/auth/login)." if not token
+                else "The token is invalid, expired or revoked.",
+            })
+            response.status_code = 401
+            response.headers["WWW-Authenticate"] = 'Bearer realm="api"'
+            return response
+        g.auth = claims
+        return None
+
+    @staticmethod
+    def add_headers(response):
+        auth_ms = g.get("auth_ms")
+        if auth_ms is not None:
+            response.headers.add("Server-Timing", f"auth;dur={auth_ms:.3f}")
+        return response
+
+    def snapshot(self):
+        """
+        Settings and verification counters of this process, for the admin endpoint.
+        """
+        with self._lock:
+            revoked_tokens = len(self._revoked_ids)
+            revoked_employees = len(self._revoked_before)
+        return {
+            "enabled": self.enabled,
+            "signing_keys": self.key_count,
+            "token_ttl_seconds": self.token_ttl,
+            "verifications": self.verifications,
+            "rejected": self.rejected,
+            "cache_hits": self._verified.hits,
+            "cache_size": len(self._verified),
+            "average_ms": round(self.total_ms / self.verifications, 4) if self.verifications else 0.0,
+            "revoked_tokens": revoked_tokens,
+            "revoked_employees": revoked_employees,
+        }
+
+
+# Process-wide token authentication, bound to the application by create_app
+token_auth = TokenAuth()
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from flask import request
+from werkzeug.test import EnvironBuilder
+
+from utils.database import db
+
+# Headers of the batch request passed on to every sub-request (credentials)
+FORWARDED_HEADERS = ("Authorization",)
+
+# Response headers not worth returning per sub-request
+SKIPPED_HEADERS = ("Content-Length",)
+
+_executor = None
+
+
+def _parallel_executor(max_workers):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch")
+    return _executor
+
+
+def _environ(sub_request, headers, remote_addr):
+    """
+    WSGI environ of a sub-request; its own headers take precedence over the forwarded ones.
+    """
+    builder = EnvironBuilder(
+        path=sub_request["path"],
+        method=sub_request.get("method", "GET").upper(),
+        json=sub_request.get("body"),
+        headers={**headers, **(sub_request.get("headers") or {})},
+        environ_base={"REMOTE_ADDR": remote_addr},
+    )
+    try:
+        return builder.get_environ()
+    finally:
+        builder.close()
+
+
+def _dispatch(app, environ, shared_context):
+    """
+    Run one sub-request through the full Flask dispatch (before/after request hooks,
+    error handlers, marshalling), and read its whole response inside its context.
+    :param shared_context: Run in the caller's application context (and database session)
+                           instead of a fresh one.
+    :return: dict: status, headers and body of the response.
+    """
+    with (nullcontext() if shared_context else app.app_context()), app.request_context(environ):
+        response = app.full_dispatch_request()
+        body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+        return {
+            "status": response.status_code,
+            "headers": {key: value for key, value in response.headers.items() if key not in SKIPPED_HEADERS},
+            "body": body,
+        }
+
+
+def run_batch(app, sub_requests, parallel=False, transaction=False, max_workers=4):
+    """
+    Execute several API requests in-process and collect their responses, in order.
+    :param app: The Flask application.
+    :param sub_requests: List of dicts with 'path' (including any query string) and optional
+                         'method', 'body' and 'headers'.
+    :param parallel: Run the sub-requests concurrently on a bounded thread pool.
+    :param transaction: Run them sequentially in one read transaction, so that they all see
+                        the same snapshot of the database. Only GET sub-requests are allowed.
+    :param max_workers: Size of the thread pool used by parallel batches.
+    :return: list: One dict (status, headers, body) per sub-request.
+    """
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    environs = [_environ(sub_request, headers, request.remote_addr) for sub_request in sub_requests]
+
+    if parallel:
+        executor = _parallel_executor(max_workers)
+        futures = [executor.submit(_dispatch, app, environ, False) for environ in environs]
+        return [future.result() for future in futures]
+
+    if not transaction:
+        return [_dispatch(app, environ, False) for environ in environs]
+
+    # The sub-requests share this context's session; BEGIN makes SQLite hold one read
+    # snapshot for all of them, and the rollback ends it without writing anything.
+    db.session.rollback()
+    db.session.connection().exec_driver_sql("BEGIN")
+    try:
+        return [_dispatch(app, environ, True) for environ in environs]
+    finally:
+        db.session.rollback()
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Small thread-safe LRU cache for query results.
+    Entries are never refreshed in place: the services that change the underlying
+    tables call clear() (or invalidate()) after committing, and the next read recomputes.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every invalidation, so that a value computed before one is not stored after it
+        self.generation = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def set(self, key, value, generation=None):
+        """
+        Store a value. With generation (read from self.generation before computing it), the
+        value is dropped if the cache was invalidated in the meantime, as it may be stale.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Serialized rows by primary key, one cache per table (see services.multi_get_service)
+ENTITY_CACHE_SIZE = 2048
+_entity_caches = {}
+_entity_caches_lock = threading.Lock()
+
+
+def entity_cache(table):
+    """
+    The entity cache of a table. The services that update or delete its rows call
+    invalidate(<primary key>) after committing.
+    """
+    with _entity_caches_lock:
+        if table not in _entity_caches:
+            _entity_caches[table] = ResultCache(maxsize=ENTITY_CACHE_SIZE)
+        return _entity_caches[table]
+
+
+def clear_entity_caches():
+    """
+    Drop every cached entity (after set-based changes that bypass the services).
+    """
+    with _entity_caches_lock:
+        caches = list(_entity_caches.values())
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,110 @@
+import json
+import threading
+from collections import deque
+
+# Resources whose changes are pushed to the stream; the others (invoices, items, ...) are
+# only in the change feed (GET /changes)
+STREAMED_RESOURCES = ("work", "task")
+
+
+def format_event(change):
+    """
+    The Server-Sent Events message of a change: its change log seq as event id (what
+    the client sends back as Last-Event-ID) and the change as JSON data.
+    """
+    data = json.dumps({
+        "seq": change["seq"],
+        "resource": change["resource"],
+        "record_id": change["record_id"],
+        "action": change["action"],
+        "data": json.loads(change["data"]) if change["data"] else None,
+    })
+    return f"id: {change['seq']}\ndata: {data}\n\n"
+
+
+class ChangeStream:
+    """
+    In-process fan-out of committed changes to Server-Sent Events subscribers.
+
+    Published changes go into one shared ring buffer, each at the next position of a
+    counter; subscribers only keep the position they have read up to, and sleep on a
+    condition variable until a later one is published. An idle subscriber therefore
+    costs a sleeping thread and no work per event, whatever the number of subscribers.
+    Positions, not change sequence numbers, order the buffer: changes are published
+    after their commit, so two of them may be published out of seq order. A change
+    still in the buffer is not published twice (see services.sync_service, which also
+    publishes the changes committed by the other server workers). close() ends every
+    subscription, for a server worker that stops.
+    """
+
+    def __init__(self, size=1024):
+        self._events = deque(maxlen=size)  # (position, change, message)
+        self._seqs = set()  # Change seqs in the buffer
+        self._position = 0  # Position of the latest published change
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def init_app(self, app):
+        """
+        Size the buffer from EVENTS_BUFFER_SIZE.
+        """
+        with self._condition:
+            self._events = deque(self._events, maxlen=app.config.get("EVENTS_BUFFER_SIZE", self._events.maxlen))
+            self._seqs = {change["seq"] for _, change, _ in self._events}
+
+    def position(self):
+        """
+        The current position, to subscribe from (only changes published later are read).
+        """
+        with self._condition:
+            return self._position
+
+    def publish(self, change):
+        """
+        Add a committed change and wake the subscribers. The message is formatted once
+        here rather than by every subscriber.
+        :param change: dict with seq, resource, record_id, action and data (JSON text).
+        """
+        message = format_event(change)
+        with self._condition:
+            if change["seq"] in self._seqs:
+                return
+            if len(self._events) == self._events.maxlen:
+                self._seqs.discard(self._events[0][1]["seq"])
+            self._seqs.add(change["seq"])
+            self._position += 1
+            self._events.append((self._position, change, message))
+            self._condition.notify_all()
+
+    def close(self):
+        """
+        End every subscription: the waiting readers return at once, as if they fell behind,
+        so that their clients reconnect (to another worker) with their Last-Event-ID.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def read(self, position, timeout):
+        """
+        Wait for the changes published after a position.
+        :param position: Position already read up to.
+        :param timeout: Seconds to wait before returning with no changes.
+        :return: tuple: (new position, list of (change, message)), or (None, []) if changes after
+                 the position already left the buffer (the subscriber fell too far behind) or
+                 the stream was closed.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._closed or self._position > position, timeout)
+            if self._closed:
+                return None, []
+            if self._position == position:
+                return position, []
+            if self._events[0][0] > position + 1:
+                return None, []
+            changes = [(change, message) for event_position, change, message in self._events if event_position > position]
+            return self._position, changes
+
+
+# Process-wide stream of the work and task changes (see api.event)
+change_stream = ChangeStream()
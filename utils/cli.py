@@ -0,0 +1,179 @@
+import click
+from flask import current_app
+
+
+@click.command("build-openapi")
+@click.option("--output", default=None, help="Destination file (defaults to OPENAPI_SPEC_PATH).")
+def build_openapi_command(output):
+    """
+    Build the OpenAPI spec ahead of time so it can be served as a static file.
+    """
+    from api import api, register_api
+    from utils.openapi import build_openapi_spec
+
+    register_api(current_app)
+    path = build_openapi_spec(current_app, api, output)
+    click.echo(f"OpenAPI spec written to {path}")
+
+
+@click.command("search-rebuild")
+def search_rebuild_command():
+    """
+    Rebuild the full-text search indexes from the source tables.
+    """
+    from services.search_service import rebuild_search_indexes
+
+    for resource, count in rebuild_search_indexes().items():
+        click.echo(f"{resource}: {count} documents indexed")
+
+
+@click.command("invoice-summary-rebuild")
+def invoice_summary_rebuild_command():
+    """
+    Rebuild the monthly revenue summary from the invoice table.
+    """
+    from services.invoice_summary_service import rebuild_invoice_summary
+
+    click.echo(f"Invoice summary rebuilt: {rebuild_invoice_summary()} rows")
+
+
+@click.command("import-data")
+@click.argument("resource")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", default=None, help="csv or ndjson (defaults to the file extension).")
+@click.option("--batch-size", default=None, type=int, help="Rows per transaction (defaults to IMPORT_BATCH_SIZE).")
+def import_data_command(resource, file, fmt, batch_size):
+    """
+    Bulk import clients or vehicles from a CSV or NDJSON file.
+    """
+    from services.import_service import import_records
+
+    fmt = fmt or ("ndjson" if file.endswith((".ndjson", ".jsonl")) else "csv")
+    batch_size = batch_size or current_app.config["IMPORT_BATCH_SIZE"]
+
+    def progress(report):
+        click.echo(f"{report['processed']} rows processed, {report['imported']} imported, {report['rejected']} rejected")
+
+    with open(file, "rb") as stream:
+        report = import_records(resource, stream, fmt, batch_size, progress)
+    for error in report["errors"]:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f"Imported {report['imported']} of {report['processed']} rows in {report['elapsed_seconds']}s")
+
+
+@click.command("invoice-batch")
+@click.option("--dry-run", is_flag=True, help="Only report what would be invoiced.")
+@click.option("--chunk-size", default=None, type=int, help="Clients invoiced per transaction.")
+def invoice_batch_command(dry_run, chunk_size):
+    """
+    Invoice every completed task that has no invoice item yet, one invoice per client.
+    """
+    from services.billing_service import BILLING_CHUNK_SIZE, run_batch_invoicing
+
+    def progress(report):
+        click.echo(f"{report['invoices']} invoices, {report['items']} items")
+
+    report = run_batch_invoicing(dry_run, chunk_size or BILLING_CHUNK_SIZE, progress)
+    prefix = "Would create" if dry_run else "Created"
+    click.echo(f"{prefix} {report['invoices']} invoices with {report['items']} items: "
+               f"{report['total']} + IVA {report['iva']:.0%} = {report['total_with_iva']}")
+    if report["items_per_second"] is not None:
+        click.echo(f"{report['elapsed_seconds']}s, {report['items_per_second']} items/s")
+
+
+@click.command("archive")
+@click.option("--before", default=None, type=click.DateTime(formats=["%Y-%m-%d"]),
+              help="Cutoff date (defaults to ARCHIVE_AFTER_DAYS ago).")
+@click.option("--dry-run", is_flag=True, help="Only report what would be archived.")
+@click.option("--chunk-size", default=None, type=int, help="Invoices or works moved per transaction.")
+def archive_command(before, dry_run, chunk_size):
+    """
+    Move the finished works and tasks and the old invoices and items to the archive tables.
+    """
+    from services.archive_service import ARCHIVE_CHUNK_SIZE, default_cutoff, run_archiving
+
+    cutoff = before.date() if before else default_cutoff(current_app.config["ARCHIVE_AFTER_DAYS"])
+
+    def progress(report):
+        click.echo(f"{report['invoice']} invoices, {report['work']} works archived")
+
+    report = run_archiving(cutoff, dry_run, chunk_size or ARCHIVE_CHUNK_SIZE, progress)
+    prefix = "Would archive" if dry_run else "Archived"
+    click.echo(f"{prefix} {report['invoice']} invoices ({report['invoice_item']} items) and "
+               f"{report['work']} works ({report['task']} tasks) before {report['cutoff']}")
+
+
+@click.command("serve")
+@click.option("--host", default="127.0.0.1", help="Interface to listen on.")
+@click.option("--port", default=5000, type=int, help="Port to listen on.")
+@click.option("--workers", default=None, type=int, help="Worker processes (defaults to SERVER_WORKERS).")
+@click.option("--max-requests", default=None, type=int,
+              help="Requests served by a worker before it is replaced (defaults to SERVER_MAX_REQUESTS).")
+@click.option("--timeout", default=None, type=float,
+              help="Seconds a connection may stay idle or blocked on socket I/O, and a worker may go without "
+                   "a heartbeat before it is killed and replaced; a busy request is not cut short "
+                   "(defaults to SERVER_TIMEOUT).")
+@click.option("--graceful-timeout", default=None, type=float,
+              help="Seconds stopping workers get to finish their requests (defaults to SERVER_GRACEFUL_TIMEOUT).")
+def serve_command(host, port, workers, max_requests, timeout, graceful_timeout):
+    """
+    Serve the API with pre-forked worker processes sharing one listening socket.
+    SIGHUP replaces the workers gracefully; SIGTERM or Ctrl+C stops the server.
+    """
+    from sqlalchemy import text
+
+    from api import register_api
+    from services.sync_service import change_follower, exit_worker, init_worker, recover_jobs, stop_worker
+    from services.warmup_service import warm_up
+    from utils.database import db
+    from utils.prefork import PreforkServer
+
+    config = current_app.config
+    warm_up.wait()  # Never fork while the warm-up thread holds locks or connections
+    register_api(current_app)  # Imported once by the master and shared by the forked workers
+    change_follower.stop()  # The master serves no requests; each worker starts its own (init_worker)
+    if db.engine.dialect.name == "sqlite":
+        # Write-ahead logging: readers in one worker do not block a writer in another
+        with db.engine.connect() as conn:
+            conn.execute(text("PRAGMA journal_mode=WAL"))
+    PreforkServer(
+        current_app._get_current_object(), host, port,
+        workers=workers or config["SERVER_WORKERS"],
+        max_requests=config["SERVER_MAX_REQUESTS"] if max_requests is None else max_requests,
+        max_requests_jitter=config["SERVER_MAX_REQUESTS_JITTER"],
+        timeout=timeout or config["SERVER_TIMEOUT"],
+        graceful_timeout=config["SERVER_GRACEFUL_TIMEOUT"] if graceful_timeout is None else graceful_timeout,
+        worker_init=init_worker,
+        worker_stop=stop_worker,
+        worker_exit=exit_worker,
+        worker_lost=recover_jobs,
+    ).run()
+
+
+@click.command("set-password")
+@click.argument("email")
+@click.password_option(help="The new password (prompted for when omitted).")
+def set_password_command(email, password):
+    """
+    Set the login password of an employee (POST /api/auth/login). The tokens issued to
+    the employee before are revoked.
+    """
+    from services.auth_service import set_password
+
+    if not set_password(email, password):
+        raise click.ClickException(f"No employee with email {email}.")
+    click.echo(f"Password set for {email}")
+
+
+def register_commands(app):
+    """
+    Register the application's CLI commands (available through 'flask <command>').
+    """
+    app.cli.add_command(build_openapi_command)
+    app.cli.add_command(search_rebuild_command)
+    app.cli.add_command(invoice_summary_rebuild_command)
+    app.cli.add_command(import_data_command)
+    app.cli.add_command(invoice_batch_command)
+    app.cli.add_command(archive_command)
+    app.cli.add_command(serve_command)
+    app.cli.add_command(set_password_command)
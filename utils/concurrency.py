@@ -0,0 +1,59 @@
+from flask import request
+from werkzeug.exceptions import PreconditionFailed
+
+# Swagger documentation of the If-Match header of the PUT routes
+IF_MATCH_PARAM = {"in": "header", "description": "ETag of the version read; the update fails with 412 if it changed"}
+
+
+def etag(version):
+    """
+    The ETag of a record at a row version (see the version column of the models).
+    """
+    return f'"{version}"'
+
+
+def etag_header(record):
+    """
+    Response headers carrying the ETag of a serialized record (none for an error result).
+    """
+    return {"ETag": etag(record["version"])} if "version" in record else {}
+
+
+def if_match_version():
+    """
+    The row versions the client accepts, from the If-Match header of the current request:
+    the update goes ahead if the record is at any of them.
+    :return: frozenset: The versions, or None if there is no If-Match header or it is '*'.
+    :raises PreconditionFailed: If If-Match only holds tags that are not a version of the
+                                record (weak tags never match an If-Match).
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    versions = frozenset(int(tag) for tag in if_match.as_set() if tag.isdigit())
+    if not versions:
+        raise PreconditionFailed("If-Match does not match the current version of the record.")
+    return versions
+
+
+def check_version(entity, expected_versions, label):
+    """
+    Reject an update of a record that changed since the client read it.
+    The UPDATE itself is guarded too: SQLAlchemy adds 'WHERE version = <loaded version>'
+    and raises StaleDataError if another request committed in between.
+    :param entity: The loaded model instance.
+    :param expected_versions: The versions the client accepts (see if_match_version), or None to skip the check.
+    :param label: The record in error messages (e.g. 'Work 12').
+    :raises PreconditionFailed: If the record is at none of those versions.
+    """
+    if expected_versions is not None and entity.version not in expected_versions:
+        raise PreconditionFailed(f"{label} is at version {entity.version}, not "
+                                 f"{' or '.join(map(str, sorted(expected_versions)))}: reload it and retry.")
+
+
+def modified_concurrently(label):
+    """
+    The error for a StaleDataError: the record was updated or deleted by another request
+    between loading it and writing it.
+    """
+    return PreconditionFailed(f"{label} was modified by another request: reload it and retry.")
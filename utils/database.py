@@ -12,3 +12,15 @@ class Base(DeclarativeBase):
 # The 'model_class=Base' argument tells SQLAlchemy that all models will inherit from the Base class
 db = SQLAlchemy(model_class=Base)
 
+
+
+def begin_write():
+    """
+    Take the database write lock at once, instead of at the first write of the transaction,
+    so that what the transaction checks before writing (e.g. that a booking does not overlap
+    another) cannot change in another thread or process until it commits or rolls back.
+    SQLite only (BEGIN IMMEDIATE); a transaction that has already written holds the lock.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == "sqlite" and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
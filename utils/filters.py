@@ -0,0 +1,58 @@
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Float, Integer, Numeric
+
+
+def coerce_value(column, value):
+    """
+    Convert a query-string value to the Python type of a column.
+    """
+    column_type = type(column.type)
+    if column_type == Integer:
+        return int(value)
+    if column_type in (Float, Numeric):
+        return float(value)
+    if column_type == Date:
+        return date.fromisoformat(value)
+    if column_type == DateTime:
+        return datetime.fromisoformat(value)
+    return value
+
+
+def build_filters(model, args):
+    """
+    Build SQLAlchemy filter conditions from query-string arguments.
+
+    Supported arguments, for any column of the model:
+        <column>=<value>         equality (e.g. ?status=completed&client_id=3)
+        <column>_from=<value>    lower bound, inclusive (e.g. ?start_date_from=2025-01-01)
+        <column>_to=<value>      upper bound, inclusive (e.g. ?issued_at_to=2025-01-31T23:59:59)
+    Other arguments are ignored, so they can be combined with paging or column selection.
+
+    :param model: SQLAlchemy model class
+    :param args: Mapping of query-string arguments (e.g. request.args)
+    :return: List of filter conditions
+    :raises ValueError: If a value does not match the column type
+    """
+    columns = model.__table__.columns
+    conditions = []
+    for name, value in args.items():
+        try:
+            if name in columns:
+                conditions.append(columns[name] == coerce_value(columns[name], value))
+            elif name.endswith('_from') and name[:-5] in columns:
+                column = columns[name[:-5]]
+                conditions.append(column >= coerce_value(column, value))
+            elif name.endswith('_to') and name[:-3] in columns:
+                column = columns[name[:-3]]
+                conditions.append(column <= coerce_value(column, value))
+        except ValueError:
+            raise ValueError(f"Invalid value '{value}' for filter '{name}'.")
+    return conditions
+
+
+def wants_archived(args):
+    """
+    Whether a request asks for archived records too (?include_archived=1).
+    """
+    return args.get('include_archived', '').lower() in ('1', 'true', 'yes')
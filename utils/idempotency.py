@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, g, request
+from flask_restx.utils import unpack
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import BadRequest, Conflict, UnprocessableEntity
+
+from models.idempotency_key import IdempotencyKey
+from utils.database import db
+from utils.openapi import merge_doc
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+# Seconds between two purges of expired keys
+PURGE_INTERVAL = 60
+
+# Recorded with a claim, so that the claims of a dead process can be told apart
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+def _sha256(data):
+    return hashlib.sha256(data if isinstance(data, bytes) else data.encode("utf-8")).hexdigest()
+
+
+def _purge_expired(conn, now):
+    """
+    Delete expired keys, at most once per PURGE_INTERVAL per process.
+    """
+    global _last_purge
+    with _purge_lock:
+        if time.monotonic() - _last_purge < PURGE_INTERVAL:
+            return
+        _last_purge = time.monotonic()
+    conn.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < now))
+
+
+def _owner_is_dead(owner):
+    """
+    Whether the process holding a claim is known to be gone (only processes of this host can be checked).
+    """
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def _take_over(conn, stored, now):
+    """
+    Claim a key whose first request never finished: it was claimed over IDEMPOTENCY_LOCK_SECONDS
+    ago, or by a process that has died since. Only one contender wins the conditional update.
+    :return: bool: True if this request now owns the key.
+    """
+    lock_timeout = timedelta(seconds=current_app.config["IDEMPOTENCY_LOCK_SECONDS"])
+    stale = stored.claimed_at is None or stored.claimed_at < now - lock_timeout or _owner_is_dead(stored.owner)
+    if not stale:
+        return False
+    return conn.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.key_hash == stored.key_hash,
+            IdempotencyKey.status.is_(None),
+            IdempotencyKey.claimed_at.is_(None) if stored.claimed_at is None
+            else IdempotencyKey.claimed_at == stored.claimed_at,
+        )
+        .values(claimed_at=now, owner=OWNER)
+    ).rowcount == 1
+
+
+def _claim(key_hash, fingerprint):
+    """
+    Take ownership of a key, or wait for the request that owns it to finish.
+    The pending row is committed on its own connection before the handler runs, so a
+    concurrent duplicate (in any thread or process) finds it and waits instead of
+    executing the request a second time.
+    A pending key whose owner died, or that was claimed more than IDEMPOTENCY_LOCK_SECONDS
+    ago, is taken over rather than left blocking its retries until it expires.
+    :return: The stored IdempotencyKey row to replay, or None if this request owns the key.
+    :raises Conflict: If the first request is still running after IDEMPOTENCY_WAIT_SECONDS.
+    """
+    ttl = timedelta(seconds=current_app.config["IDEMPOTENCY_TTL_SECONDS"])
+    deadline = time.monotonic() + current_app.config["IDEMPOTENCY_WAIT_SECONDS"]
+    while True:
+        now = datetime.now()
+        try:
+            with db.engine.begin() as conn:
+                _purge_expired(conn, now)
+                conn.execute(insert(IdempotencyKey).values(
+                    key_hash=key_hash, fingerprint=fingerprint, expires_at=now + ttl, claimed_at=now, owner=OWNER
+                ))
+            return None
+        except IntegrityError:
+            pass  # Someone else holds the key
+
+        with db.engine.begin() as conn:
+            stored = conn.execute(select(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash)).first()
+            if stored is not None and stored.expires_at < now:
+                conn.execute(delete(IdempotencyKey).where(
+                    IdempotencyKey.key_hash == key_hash, IdempotencyKey.expires_at < now
+                ))
+                continue
+            if stored is not None and stored.status is None and stored.fingerprint == fingerprint:
+                if _take_over(conn, stored, now):
+                    return None
+        if stored is None:
+            continue  # The owner failed and released the key: try to take it
+        if stored.fingerprint != fingerprint:
+            raise UnprocessableEntity(f"This {HEADER} was already used for a different request.")
+        if stored.status is not None:
+            return stored
+        if time.monotonic() > deadline:
+            raise Conflict(f"A request with this {HEADER} is still being processed.")
+        time.sleep(0.05)
+
+
+def _release(key_hash):
+    with db.engine.begin() as conn:
+        conn.execute(delete(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status.is_(None)))
+
+
+def _complete(key_hash, status, body):
+    # A request whose key was taken over while it ran does not overwrite the response stored since
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status.is_(None))
+            .values(status=status, body=json.dumps(body, separators=(",", ":")))
+        )
+
+
+def idempotent(func):
+    """
+    Honour the Idempotency-Key header on a create route.
+
+    The first request with a given key runs normally and its response is stored for
+    IDEMPOTENCY_TTL_SECONDS; retries with the same key and body get that response back
+    (with an Idempotent-Replayed header) without reaching the service layer. Must be
+    placed above marshal_with, so that the marshalled body is stored. Keys are scoped to
+    the authenticated employee. Requests without the header are not affected; failed
+    requests (exceptions and 5xx) are not stored, so the services must raise on failure.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return func(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise BadRequest(f"{HEADER} must be at most {MAX_KEY_LENGTH} characters.")
+
+        # Keys are per caller: two employees sending the same key do not share a response
+        caller = (g.get("auth") or {}).get("sub", "")
+        key_hash = _sha256(f"{request.method} {request.path}\n{caller}\n{key}")
+        stored = _claim(key_hash, _sha256(request.get_data()))
+        if stored is not None:
+            return json.loads(stored.body), stored.status, {"Idempotent-Replayed": "true"}
+
+        try:
+            response = func(*args, **kwargs)
+        except BaseException:
+            _release(key_hash)
+            raise
+        data, status, _ = unpack(response)
+        if isinstance(data, current_app.response_class) or status >= 500:
+            _release(key_hash)
+        else:
+            _complete(key_hash, status, data)
+        return response
+
+    wrapper.__apidoc__ = merge_doc(getattr(func, "__apidoc__", {}), {
+        "params": {HEADER: {
+            "in": "header",
+            "type": "string",
+            "description": "Optional unique key; retries with the same key replay the first response",
+        }},
+    })
+    return wrapper
@@ -0,0 +1,52 @@
+from functools import wraps
+
+from flask import request
+from flask_restx.utils import unpack
+from werkzeug.exceptions import BadRequest
+
+from services.include_service import load_included, relations
+from utils.openapi import merge_doc
+
+
+def sideload(model):
+    """
+    Add ?include= support to a GET route of the given model.
+
+    With ?include=employee,work the response becomes {"data": <usual response>,
+    "included": {"employee": [...], "work": [...]}}, the related records being loaded
+    in one query per resource for the whole page. A response that already is such an
+    envelope (multi-get) gets the "included" key added. Without the parameter the response
+    is unchanged. Must be placed above marshal_with, so that the marshalled records are used.
+    """
+    available = sorted(relations(model))
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            include = request.args.get("include")
+            if not include:
+                return func(*args, **kwargs)
+            names = list(dict.fromkeys(name.strip() for name in include.split(",") if name.strip()))
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                raise BadRequest(
+                    f"Cannot include {', '.join(unknown)}. Available: {', '.join(available) or 'none'}."
+                )
+
+            data, code, headers = unpack(func(*args, **kwargs))
+            if code >= 400:
+                return data, code, headers
+            if isinstance(data, dict) and isinstance(data.get("data"), list):
+                return dict(data, included=load_included(model, data["data"], names)), code, headers
+            records = data if isinstance(data, list) else [data]
+            return {"data": data, "included": load_included(model, records, names)}, code, headers
+
+        wrapper.__apidoc__ = merge_doc(getattr(func, "__apidoc__", {}), {
+            "params": {"include": {
+                "in": "query",
+                "type": "string",
+                "description": f"Comma-separated related resources to sideload ({', '.join(available)})",
+            }},
+        })
+        return wrapper
+    return decorator
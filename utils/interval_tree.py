@@ -0,0 +1,136 @@
+import random
+
+
+class _Node:
+    __slots__ = ("start", "end", "key", "priority", "left", "right", "max_end")
+
+    def __init__(self, start, end, key):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+
+def _update(node):
+    node.max_end = node.end
+    if node.left is not None and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _rotate_right(node):
+    pivot = node.left
+    node.left, pivot.right = pivot.right, node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_left(node):
+    pivot = node.right
+    node.right, pivot.left = pivot.left, node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+class IntervalTree:
+    """
+    Augmented interval tree of closed intervals [start, end], each tagged with a key.
+
+    It is a randomized treap ordered by (start, end, key) where every node also stores the
+    largest end in its subtree. Insertions and removals are O(log n) expected, and an
+    overlap query is O(log n + k) for k results, since subtrees that end before the
+    query starts are skipped. Bounds can be anything comparable (dates, numbers).
+    """
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, start, end, key):
+        """
+        Insert the interval [start, end] tagged with key.
+        """
+        self._root = self._insert(self._root, _Node(start, end, key))
+        self._size += 1
+
+    def remove(self, start, end, key):
+        """
+        Remove the interval [start, end] tagged with key.
+        :return: bool: True if it was found and removed
+        """
+        self._root, removed = self._delete(self._root, (start, end, key))
+        if removed:
+            self._size -= 1
+        return removed
+
+    def overlapping(self, start, end):
+        """
+        Iterate over the keys of the intervals that overlap [start, end], in start order.
+        """
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            # Walk left while the subtree can still contain an overlapping interval
+            while node is not None and node.max_end >= start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.start > end:
+                return  # Every remaining interval starts after the query range
+            if node.end >= start:
+                yield node.key
+            node = node.right
+
+    def overlaps(self, start, end, exclude=None):
+        """
+        Check whether any interval other than the one tagged 'exclude' overlaps [start, end].
+        """
+        return any(key != exclude for key in self.overlapping(start, end))
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if (new.start, new.end, new.key) < (node.start, node.end, node.key):
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = _rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = _rotate_left(node)
+        _update(node)
+        return node
+
+    def _delete(self, node, item):
+        if node is None:
+            return None, False
+        current = (node.start, node.end, node.key)
+        if item < current:
+            node.left, removed = self._delete(node.left, item)
+        elif item > current:
+            node.right, removed = self._delete(node.right, item)
+        else:
+            # Rotate the node down until it is a leaf or has a single child, then unlink it
+            if node.left is None:
+                return node.right, True
+            if node.right is None:
+                return node.left, True
+            if node.left.priority > node.right.priority:
+                node = _rotate_right(node)
+                node.right, removed = self._delete(node.right, item)
+            else:
+                node = _rotate_left(node)
+                node.left, removed = self._delete(node.left, item)
+        _update(node)
+        return node, removed
@@ -0,0 +1,282 @@
+import logging
+import re
+
+from sqlalchemy import text
+
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Rows updated per transaction by data backfills
+BACKFILL_CHUNK_SIZE = 1000
+
+# Ordered list of (migration_id, function) pairs, filled by the @migration decorator below
+MIGRATIONS = []
+
+
+def migration(migration_id):
+    """
+    Register a schema migration. Migrations run once, in declaration order.
+    Each one receives an open connection and may commit intermediate chunks itself.
+    """
+    def decorator(func):
+        MIGRATIONS.append((migration_id, func))
+        return func
+    return decorator
+
+
+def has_column(conn, table, column):
+    """
+    Check whether a table already has a column (e.g. created by db.create_all on a fresh database).
+    """
+    return any(row[1] == column for row in conn.execute(text(f"PRAGMA table_info({table})")))
+
+
+def run_migrations():
+    """
+    Apply every pending migration. Must be called inside an application context.
+    :return: list: The IDs of the migrations applied by this call.
+    """
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migration ("
+            "migration_id TEXT PRIMARY KEY, "
+            "applied_at DATETIME DEFAULT (CURRENT_TIMESTAMP))"
+        ))
+        applied = {row[0] for row in conn.execute(text("SELECT migration_id FROM schema_migration"))}
+
+    newly_applied = []
+    for migration_id, func in MIGRATIONS:
+        if migration_id in applied:
+            continue
+        logger.info(f"Applying migration {migration_id}")
+        with db.engine.connect() as conn:
+            func(conn)
+            conn.execute(text("INSERT INTO schema_migration (migration_id) VALUES (:id)"), {"id": migration_id})
+            conn.commit()
+        newly_applied.append(migration_id)
+    return newly_applied
+
+
+@migration("0001_search_fts")
+def create_search_indexes(conn):
+    """
+    Create the FTS5 full-text indexes over clients, vehicles and works, and fill them.
+    """
+    from services.search_service import SEARCH_INDEXES, create_search_index_sql, rebuild_search_index_sql
+
+    for resource in SEARCH_INDEXES:
+        for statement in create_search_index_sql(resource) + rebuild_search_index_sql(resource):
+            conn.execute(text(statement))
+
+
+@migration("0002_vehicle_plate_key")
+def add_vehicle_plate_key(conn):
+    """
+    Add the normalized, indexed plate key to vehicles and backfill it in chunks,
+    committing each chunk so the table is never locked for long.
+    """
+    from utils.utils import normalize_plate
+
+    if not has_column(conn, "vehicle", "plate_key"):
+        conn.execute(text("ALTER TABLE vehicle ADD COLUMN plate_key VARCHAR(20)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_vehicle_plate_key ON vehicle (plate_key)"))
+    conn.commit()
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT vehicle_id, license_plate FROM vehicle "
+                 "WHERE vehicle_id > :last_id ORDER BY vehicle_id LIMIT :limit"),
+            {"last_id": last_id, "limit": BACKFILL_CHUNK_SIZE},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE vehicle SET plate_key = :plate_key WHERE vehicle_id = :vehicle_id"),
+            [{"vehicle_id": row.vehicle_id, "plate_key": normalize_plate(row.license_plate)} for row in rows],
+        )
+        conn.commit()
+        last_id = rows[-1].vehicle_id
+
+
+@migration("0003_task_employee_dates_index")
+def add_task_employee_dates_index(conn):
+    """
+    Composite index backing the per-employee workload report over date ranges.
+    """
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_task_employee_dates ON task (employee_id, start_date, end_date, status)"
+    ))
+
+
+@migration("0004_invoice_summary")
+def create_invoice_summary(conn):
+    """
+    Create the monthly revenue summary table and fill it from the existing invoices.
+    """
+    from models.invoice_summary import InvoiceSummary
+    from services.invoice_summary_service import summary_select
+    from sqlalchemy import insert
+
+    InvoiceSummary.__table__.create(conn, checkfirst=True)
+    conn.execute(InvoiceSummary.__table__.delete())
+    conn.execute(insert(InvoiceSummary).from_select(
+        ["year", "month", "client_id", "invoice_count", "total", "total_with_iva"], summary_select()
+    ))
+
+
+@migration("0005_invoice_item_task_index")
+def add_invoice_item_task_index(conn):
+    """
+    Index backing the batch invoicing run's lookup of tasks without an invoice item.
+    """
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_invoice_item_task_id ON invoice_item (task_id)"))
+
+
+@migration("0006_job")
+def create_job_table(conn):
+    """
+    Create the table of background jobs.
+    """
+    from models.job import Job
+
+    Job.__table__.create(conn, checkfirst=True)
+
+
+@migration("0007_idempotency_key")
+def create_idempotency_key_table(conn):
+    """
+    Create the store of responses replayed for retried create requests.
+    """
+    from models.idempotency_key import IdempotencyKey
+
+    IdempotencyKey.__table__.create(conn, checkfirst=True)
+
+
+@migration("0008_change_log")
+def create_change_log_table(conn):
+    """
+    Create the change feed table. Existing records predate it: clients start with a full download.
+    """
+    from models.change import Change
+
+    Change.__table__.create(conn, checkfirst=True)
+
+
+@migration("0009_archive_tables")
+def create_archive_tables(conn):
+    """
+    Create the archive tables of works, tasks, invoices and invoice items.
+    """
+    from models.archive import InvoiceArchive, InvoiceItemArchive, TaskArchive, WorkArchive
+
+    for model in (WorkArchive, TaskArchive, InvoiceArchive, InvoiceItemArchive):
+        model.__table__.create(conn, checkfirst=True)
+
+
+@migration("0010_row_version")
+def add_row_version(conn):
+    """
+    Add the row version used for optimistic concurrency to every resource table and to the
+    archive tables (rows keep their version when archived). Existing rows start at version 1.
+    """
+    for table in ("client", "employee", "vehicle", "work", "task", "invoice", "invoice_item", "setting",
+                  "work_archive", "task_archive", "invoice_archive", "invoice_item_archive"):
+        if not has_column(conn, table, "version"):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+@migration("0011_token_auth")
+def add_token_auth(conn):
+    """
+    Add the login password hash of employees (NULL: cannot log in until one is set with
+    'flask set-password') and create the token revocation list.
+    """
+    from models.revoked_token import RevokedToken
+
+    if not has_column(conn, "employee", "password_hash"):
+        conn.execute(text("ALTER TABLE employee ADD COLUMN password_hash VARCHAR(256)"))
+    RevokedToken.__table__.create(conn, checkfirst=True)
+
+
+@migration("0012_vehicle_plate_key_unique")
+def make_vehicle_plate_key_unique(conn):
+    """
+    Make the normalized plate key unique, so that one plate typed in two formats
+    ('AA-12-BB', 'aa12bb') cannot belong to two vehicles. Existing duplicates must be
+    resolved by hand first: the migration stops and lists them.
+    """
+    duplicates = conn.execute(text(
+        "SELECT plate_key, GROUP_CONCAT(vehicle_id) AS vehicle_ids FROM vehicle "
+        "WHERE plate_key IS NOT NULL GROUP BY plate_key HAVING COUNT(*) > 1"
+    )).all()
+    if duplicates:
+        raise RuntimeError("Vehicles sharing a license plate: " + "; ".join(
+            f"{row.plate_key} (vehicles {row.vehicle_ids})" for row in duplicates
+        ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_vehicle_plate_key"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_vehicle_plate_key ON vehicle (plate_key)"))
+
+
+@migration("0013_idempotency_key_claim")
+def add_idempotency_key_claim(conn):
+    """
+    Record when and by which process an idempotency key was claimed, so that the keys of
+    requests that never finished can be taken over. Existing pending keys count as stale.
+    """
+    if not has_column(conn, "idempotency_key", "claimed_at"):
+        conn.execute(text("ALTER TABLE idempotency_key ADD COLUMN claimed_at DATETIME"))
+    if not has_column(conn, "idempotency_key", "owner"):
+        conn.execute(text("ALTER TABLE idempotency_key ADD COLUMN owner VARCHAR(128)"))
+
+
+@migration("0014_autoincrement_ids")
+def use_autoincrement_ids(conn):
+    """
+    Rebuild the tables whose rows are archived with AUTOINCREMENT primary keys. Without it
+    SQLite hands out max(id) + 1, so the ID of an archived row could be given to a new hot
+    row. The sequence starts above the highest ID of the hot and the archive table, and above
+    the IDs still referenced by other rows (e.g. items left behind by a deleted invoice), so
+    that a new row never inherits them.
+    """
+    for table, primary_key, references in (
+        ("work", "work_id", ("task", "task_archive")),
+        ("task", "task_id", ("invoice_item", "invoice_item_archive")),
+        ("invoice", "invoice_id", ("invoice_item", "invoice_item_archive")),
+        ("invoice_item", "item_id", ()),
+    ):
+        create_sql = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {"name": table}).scalar()
+        if "AUTOINCREMENT" not in create_sql.upper():
+            indexes = conn.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"
+            ), {"name": table}).scalars().all()
+            # Either the baseline form ("work_id INTEGER PRIMARY KEY") or the one of db.create_all
+            # ("work_id INTEGER NOT NULL, ..., PRIMARY KEY (work_id)")
+            rebuild_sql = re.sub(rf'^CREATE TABLE\s+"?{table}"?', f"CREATE TABLE {table}_rebuild", create_sql)
+            if re.search(rf"\b{primary_key}\s+INTEGER\s+PRIMARY\s+KEY", rebuild_sql, re.IGNORECASE):
+                rebuild_sql = re.sub(rf"(\b{primary_key}\s+INTEGER\s+PRIMARY\s+KEY)", r"\1 AUTOINCREMENT",
+                                     rebuild_sql, count=1, flags=re.IGNORECASE)
+            else:
+                rebuild_sql = re.sub(rf",\s*PRIMARY\s+KEY\s*\(\s*{primary_key}\s*\)", "", rebuild_sql,
+                                     flags=re.IGNORECASE)
+                rebuild_sql = re.sub(rf"(\b{primary_key}\s+INTEGER(\s+NOT\s+NULL)?)", r"\1 PRIMARY KEY AUTOINCREMENT",
+                                     rebuild_sql, count=1, flags=re.IGNORECASE)
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}_rebuild"))
+            conn.execute(text(rebuild_sql))
+            conn.execute(text(f"INSERT INTO {table}_rebuild SELECT * FROM {table}"))
+            conn.execute(text(f"DROP TABLE {table}"))
+            conn.execute(text(f"ALTER TABLE {table}_rebuild RENAME TO {table}"))
+            for index_sql in indexes:
+                conn.execute(text(index_sql))
+
+        used = [f"(SELECT MAX({primary_key}) FROM {name})" for name in (table, f"{table}_archive", *references)]
+        used.append(f"(SELECT seq FROM sqlite_sequence WHERE name = '{table}')")
+        highest = conn.execute(text(
+            "SELECT MAX(" + ", ".join(f"COALESCE({query}, 0)" for query in used) + ")"
+        )).scalar()
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table})
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                     {"name": table, "seq": highest})
@@ -0,0 +1,58 @@
+from functools import wraps
+
+from flask import request
+from flask_restx import marshal
+from werkzeug.exceptions import BadRequest
+
+from services.multi_get_service import get_many, parse_ids
+from utils.openapi import merge_doc
+
+
+def lookup(resource, ids, limit):
+    """
+    Resolve a list of ids for a lookup route.
+    :param resource: Table name (key of services.multi_get_service.MULTI_GET).
+    :param ids: '1,2,3' or a list of ids.
+    :param limit: Most ids accepted.
+    :return: dict: 'data' (records in request order) and 'missing' (unknown ids).
+    :raises BadRequest: If the list is empty, too long or holds something other than ids.
+    """
+    try:
+        ids = parse_ids(ids)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    if not ids:
+        raise BadRequest("At least one id is required.")
+    if len(ids) > limit:
+        raise BadRequest(f"At most {limit} ids per request.")
+    return get_many(resource, ids)
+
+
+def by_ids(resource, api_model, limit):
+    """
+    Add ?ids=1,2,3 to a list route: the response becomes {"data": [...], "missing": [...]},
+    with the records in the order of the ids (marshalled with api_model and the X-Fields
+    mask) and the ids that do not exist. Without the parameter the route is unchanged.
+    Must be placed above marshal_list_with, which it bypasses for these requests.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            ids = request.args.get("ids")
+            if ids is None:
+                return func(*args, **kwargs)
+            found = lookup(resource, ids, limit)
+            return {
+                "data": marshal(found["data"], api_model, mask=request.headers.get("X-Fields")),
+                "missing": found["missing"],
+            }
+
+        wrapper.__apidoc__ = merge_doc(getattr(func, "__apidoc__", {}), {
+            "params": {"ids": {
+                "in": "query",
+                "type": "string",
+                "description": f"Comma-separated ids to fetch, at most {limit} (response: data + missing ids)",
+            }},
+        })
+        return wrapper
+    return decorator
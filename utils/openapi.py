@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+
+from flask import current_app, request
+
+logger = logging.getLogger(__name__)
+
+# Top-level key of a prebuilt spec holding the fingerprint of the API it was built from
+FINGERPRINT_KEY = "x-api-fingerprint"
+
+
+def _copy_doc(value):
+    # Only the containers are copied: models (dict subclasses), fields and parsers are shared definitions
+    if type(value) is dict:
+        return {key: _copy_doc(item) for key, item in value.items()}
+    if type(value) is list:
+        return [_copy_doc(item) for item in value]
+    return value
+
+
+def merge_doc(first, second):
+    """
+    Merge two Swagger documentation dicts, like flask_restx.utils.merge, without deep
+    copying the models and fields they reference. Flask-RESTx merges the documentation of
+    every decorator of every route this way, and deep copying each model (with its nested
+    models) every time was most of the cost of importing the namespaces.
+
+    :param first: The documentation gathered so far
+    :param second: The documentation to add; its values take precedence
+    :return: dict: The merged documentation
+    """
+    if not isinstance(second, dict):
+        return second
+    result = _copy_doc(first)
+    for key, value in second.items():
+        if type(result.get(key)) is dict:
+            result[key] = merge_doc(result[key], value)
+        else:
+            result[key] = _copy_doc(value)
+    return result
+
+
+def _describe(value):
+    # Models, fields and parsers in the route documentation, for the fingerprint
+    return getattr(value, "name", None) or type(value).__name__
+
+
+def api_fingerprint(api):
+    """
+    A digest of the registered routes, their documentation and the models, which tells
+    whether a prebuilt specification still describes the API. Does not render the spec.
+
+    :param api: Flask-RESTx API instance, with every namespace added
+    :return: str: The SHA-1 hex digest
+    """
+    resources = {}
+    for namespace in api.namespaces:
+        for resource, urls, route_doc, _ in namespace.resources:
+            methods = {method: getattr(getattr(resource, method, None), "__apidoc__", None)
+                       for method in sorted(resource.methods or ())}
+            resources[" ".join(namespace.path + url for url in urls)] = [
+                resource.__name__, getattr(resource, "__apidoc__", None), route_doc, methods,
+            ]
+    models = {name: model._schema for name, model in api.models.items()}
+    digest = json.dumps({"resources": resources, "models": models}, sort_keys=True, default=_describe)
+    return hashlib.sha1(digest.encode("utf-8")).hexdigest()
+
+
+def render_openapi_spec(api):
+    """
+    Render the OpenAPI (Swagger 2.0) specification of the given API as JSON bytes.
+    Must be called inside a request context, since Flask-RESTx resolves URLs with url_for.
+
+    :param api: Flask-RESTx API instance
+    :return: bytes: The specification encoded as UTF-8 JSON
+    """
+    return json.dumps(api.__schema__, sort_keys=True, indent=2).encode("utf-8")
+
+
+def build_openapi_spec(app, api, path=None):
+    """
+    Build the OpenAPI specification ahead of time and write it to disk, with the
+    fingerprint of the API (see api_fingerprint) so that a stale file is never served.
+
+    :param app: Flask application with every namespace registered
+    :param api: Flask-RESTx API instance
+    :param path: Destination file, defaults to the OPENAPI_SPEC_PATH setting
+    :return: str: The path the specification was written to
+    """
+    path = path or app.config["OPENAPI_SPEC_PATH"]
+    # Render from the registered routes, not from a previously loaded file
+    api.__dict__.pop("__schema__", None)
+    api._schema = None
+    with app.test_request_context():
+        schema = dict(api.__schema__, **{FINGERPRINT_KEY: api_fingerprint(api)})
+    body = json.dumps(schema, sort_keys=True, indent=2).encode("utf-8")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as spec_file:
+        spec_file.write(body)
+    return path
+
+
+def load_openapi_spec(app, api):
+    """
+    Read the prebuilt specification, if any. It is only used once the API is registered
+    and its fingerprint checked (see apply_openapi_spec).
+
+    :param app: Flask application
+    :param api: Flask-RESTx API instance
+    :return: bool: True if a prebuilt specification was found
+    """
+    path = app.config.get("OPENAPI_SPEC_PATH")
+    if not path or not os.path.exists(path):
+        return False
+    with open(path, "rb") as spec_file:
+        body = spec_file.read()
+    app.extensions["openapi_prebuilt"] = (json.loads(body), body)
+    return True
+
+
+def apply_openapi_spec(app, api):
+    """
+    Hand the prebuilt specification to Flask-RESTx, so that neither the docs nor payload
+    validation ever assemble the schema at runtime, if it was built from the registered
+    routes and models. A stale file (built before a route or model changed) is ignored
+    and the spec is rendered at runtime instead.
+
+    :param app: Flask application, with the API registered
+    :param api: Flask-RESTx API instance
+    :return: bool: True if the prebuilt specification is used
+    """
+    prebuilt = app.extensions.pop("openapi_prebuilt", None)
+    if prebuilt is None:
+        return False
+    schema, body = prebuilt
+    if schema.get(FINGERPRINT_KEY) != api_fingerprint(api):
+        logger.warning("The prebuilt OpenAPI spec does not match the API, rendering it at runtime. "
+                       "Run 'flask build-openapi'.")
+        return False
+    api._schema = schema
+    app.extensions["openapi_spec"] = (body, hashlib.sha1(body).hexdigest())
+    return True
+
+
+def serve_openapi_spec(api):
+    """
+    Serve the specification as a static JSON document with a strong ETag.
+    Falls back to rendering it once at runtime when no prebuilt file exists.
+
+    :param api: Flask-RESTx API instance
+    :return: Response with the specification, or 304 if the client copy is current
+    """
+    spec = current_app.extensions.get("openapi_spec")
+    if spec is None:
+        logger.warning("No prebuilt OpenAPI spec found, rendering it at runtime. Run 'flask build-openapi'.")
+        body = render_openapi_spec(api)
+        spec = (body, hashlib.sha1(body).hexdigest())
+        current_app.extensions["openapi_spec"] = spec
+
+    body, etag = spec
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # Clients must revalidate, which costs a 304 at most
+    return response.make_conditional(request)
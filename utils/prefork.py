@@ -0,0 +1,285 @@
+import logging
+import os
+import random
+import signal
+import socket
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two checks of the master on its workers
+MASTER_TICK = 0.5
+
+
+class _RequestHandler(WSGIRequestHandler):
+    def run_wsgi(self):
+        self.server.count_request()
+        super().run_wsgi()
+
+
+class _WorkerServer(ThreadedWSGIServer):
+    """
+    The threaded Werkzeug server of one worker, accepting from the socket shared by all
+    workers. It counts the requests served (for recycling) and the connections in
+    progress (for graceful stops).
+    """
+
+    def __init__(self, host, port, app, handler, fd):
+        super().__init__(host, port, app, handler=handler, fd=fd)
+        self.requests = 0
+        self.active = 0
+        self._counter_lock = threading.Lock()
+
+    def count_request(self):
+        with self._counter_lock:
+            self.requests += 1
+
+    def process_request(self, request, client_address):
+        with self._counter_lock:
+            self.active += 1
+        super().process_request(request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self._counter_lock:
+                self.active -= 1
+
+
+class PreforkServer:
+    """
+    Pre-forking HTTP server: a master process opens the listening socket and forks
+    worker processes that all accept from it, so requests are spread over every core.
+
+    Each worker is a threaded Werkzeug server (long-lived event streams do not block it)
+    and is replaced after serving max_requests requests, plus a random jitter so that
+    workers are not all replaced at once. The master replaces workers that exit; on
+    SIGHUP it starts a new set of workers and lets the old ones finish their requests;
+    on SIGTERM or SIGINT it stops them the same way, killing those still busy after
+    graceful_timeout seconds. A stopping worker runs worker_stop first, to end the
+    requests that would otherwise last that long (e.g. event streams). When it reaps a worker, the master tells a surviving one
+    (with SIGUSR1), which runs worker_lost: e.g. to take over what the dead one left.
+
+    Each worker ticks a heartbeat (the modification time of a temporary file shared with
+    the master) every MASTER_TICK from its accept loop; the master kills and replaces a
+    worker whose heartbeat is older than timeout seconds, e.g. one stuck in worker_init
+    or worker_lost, deadlocked, or starved by a request that never releases the GIL.
+    """
+
+    def __init__(self, app, host, port, workers, max_requests=0, max_requests_jitter=0, timeout=30,
+                 graceful_timeout=30, worker_init=None, worker_stop=None, worker_exit=None, worker_lost=None,
+                 backlog=2048):
+        """
+        :param app: The WSGI application, created by the master before forking.
+        :param workers: Number of worker processes.
+        :param max_requests: Requests served by a worker before it is replaced (0: never).
+        :param max_requests_jitter: Up to this many requests added at random to max_requests.
+        :param timeout: Seconds a connection may stay idle or blocked on a read or write, and
+                        a worker may go without a heartbeat before the master kills it. A
+                        request busy computing or waiting on something else is not cut short.
+        :param graceful_timeout: Seconds a stopping worker gets to finish its requests.
+        :param worker_init: Optional callable run with the app in each new worker.
+        :param worker_stop: Optional callable run with the app in a worker as soon as it stops
+                            accepting, before it waits for its requests to finish.
+        :param worker_exit: Optional callable run with the app and the seconds left of
+                            graceful_timeout in a worker about to exit, once its requests are done.
+        :param worker_lost: Optional callable run with the app in a surviving worker after
+                            another worker exited.
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.timeout = timeout
+        self.graceful_timeout = graceful_timeout
+        self.worker_init = worker_init
+        self.worker_stop = worker_stop
+        self.worker_exit = worker_exit
+        self.worker_lost = worker_lost
+        self.backlog = backlog
+        self.socket = None
+        self._children = {}  # pid -> start time
+        self._heartbeats = {}  # pid -> heartbeat file
+        self._heartbeat = None  # In a worker: its heartbeat file
+        self._retiring = set()  # pids asked to stop
+        self._stopping = False
+        self._reloading = False
+        self._alive = True  # In a worker: whether to keep accepting
+        self._peer_lost = False  # In a worker: whether another worker exited since the last worker_lost
+
+    # Master
+
+    def run(self):
+        """
+        Serve until SIGTERM or SIGINT.
+        """
+        self.socket = socket.create_server((self.host, self.port), backlog=self.backlog)
+        # Workers poll the shared socket: a worker that loses the race for a connection
+        # must get EAGAIN rather than block in accept()
+        self.socket.setblocking(False)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)  # Inherited: a worker still starting ignores it
+        logger.info(f"Serving on http://{self.host}:{self.port} with {self.workers} workers (master {os.getpid()})")
+        try:
+            while not self._stopping:
+                self._reap()
+                self._check_heartbeats()
+                if self._reloading:
+                    self._reloading = False
+                    logger.info("Reloading: replacing the workers")
+                    self._retire(list(self._children))
+                while len(self._children) - len(self._retiring) < self.workers:
+                    self._spawn()
+                time.sleep(MASTER_TICK)
+        finally:
+            self._stop_all()
+            self.socket.close()
+            logger.info("Server stopped")
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _request_reload(self, signum, frame):
+        self._reloading = True
+
+    def _spawn(self):
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            max_requests += random.randint(0, self.max_requests_jitter)
+        heartbeat = tempfile.TemporaryFile(prefix="garage-worker-")
+        pid = os.fork()
+        if pid == 0:
+            self._heartbeat = heartbeat
+            for other in self._heartbeats.values():
+                other.close()  # The master's, not this worker's
+            status = 0
+            try:
+                self._run_worker(max_requests)
+            except BaseException as e:
+                logger.error(f"Worker {os.getpid()} failed: {e}")
+                status = 1
+            finally:
+                logging.shutdown()
+                os._exit(status)  # Never return into the master's code
+        self._children[pid] = time.monotonic()
+        self._heartbeats[pid] = heartbeat
+
+    def _reap(self):
+        lost = False
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            self._children.pop(pid, None)
+            if pid in self._heartbeats:
+                self._heartbeats.pop(pid).close()
+            if pid not in self._retiring and os.waitstatus_to_exitcode(status) != 0:
+                logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}")
+            self._retiring.discard(pid)
+            lost = True
+        if lost and self.worker_lost and not self._stopping:
+            self._notify_survivor()
+
+    def _check_heartbeats(self):
+        # File modification times are wall-clock times
+        now = time.time()
+        for pid, heartbeat in list(self._heartbeats.items()):
+            if pid in self._retiring:
+                continue  # Stopping workers are bounded by graceful_timeout instead
+            silent = now - os.fstat(heartbeat.fileno()).st_mtime
+            if silent > self.timeout:
+                logger.error(f"Killing worker {pid}, no heartbeat for {silent:.0f}s")
+                self._retiring.add(pid)  # Replaced at once; reaped on its exit
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def _notify_survivor(self):
+        # The most recently started worker that is not being retired
+        survivors = [pid for pid in self._children if pid not in self._retiring]
+        if survivors:
+            try:
+                os.kill(max(survivors, key=self._children.get), signal.SIGUSR1)
+            except ProcessLookupError:
+                pass
+
+    def _retire(self, pids):
+        for pid in pids:
+            self._retiring.add(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _stop_all(self):
+        self._retire(list(self._children))
+        deadline = time.monotonic() + self.graceful_timeout + MASTER_TICK
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self._children):
+            logger.warning(f"Killing worker {pid}, still busy after {self.graceful_timeout}s")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while self._children:
+            self._children.pop(os.waitpid(-1, 0)[0], None)
+
+    # Worker
+
+    def _stop_accepting(self, signum, frame):
+        self._alive = False
+
+    def _note_peer_lost(self, signum, frame):
+        self._peer_lost = True
+
+    def _tick(self):
+        os.utime(self._heartbeat.fileno())
+
+    def _run_worker(self, max_requests):
+        signal.signal(signal.SIGTERM, self._stop_accepting)
+        signal.signal(signal.SIGHUP, self._stop_accepting)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C reaches the whole group: the master decides
+        signal.signal(signal.SIGUSR1, self._note_peer_lost)
+        self._tick()
+        if self.worker_init:
+            self.worker_init(self.app)
+        self._tick()
+
+        handler = type("RequestHandler", (_RequestHandler,), {"timeout": self.timeout})
+        server = _WorkerServer(self.host, self.port, self.app, handler, self.socket.fileno())
+        self.socket.close()  # The server accepts from its own duplicate of the descriptor
+        server.timeout = MASTER_TICK  # handle_request() returns regularly, to notice a stop
+        logger.info(f"Worker {os.getpid()} started")
+        while self._alive and (not max_requests or server.requests < max_requests):
+            self._tick()
+            server.handle_request()
+            if self._peer_lost and self.worker_lost:
+                self._peer_lost = False
+                self.worker_lost(self.app)
+
+        # Stop accepting and let the requests in progress finish
+        server.socket.close()
+        if self.worker_stop:
+            self.worker_stop(self.app)
+        deadline = time.monotonic() + self.graceful_timeout
+        while server.active and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if self.worker_exit:
+            self.worker_exit(self.app, deadline - time.monotonic())
+        reason = "recycled" if self._alive else "stopped"
+        logger.info(f"Worker {os.getpid()} {reason} after {server.requests} requests")
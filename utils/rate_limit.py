@@ -0,0 +1,182 @@
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import translate
+
+from flask import g, jsonify, request
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(limit):
+    """
+    Parse a limit such as '120/minute' into (capacity, tokens refilled per second).
+    """
+    count, _, period = limit.partition("/")
+    if period not in PERIODS or not count.strip().isdigit():
+        raise ValueError(f"Invalid rate limit '{limit}', expected e.g. '120/minute'.")
+    return int(count), int(count) / PERIODS[period]
+
+
+class TokenBucket:
+    """
+    Bucket of up to 'capacity' tokens refilled continuously at 'rate' tokens per second.
+    Refills are computed lazily when the bucket is used, so idle buckets cost nothing.
+    """
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def take(self, now):
+        """
+        Take one token.
+        :return: float: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Per-client token-bucket rate limiting for the API.
+
+    Rules map 'METHOD /route' glob patterns (matched against the route template, e.g.
+    'GET /api/task/<int:task_id>') to limits; the first matching rule applies, and
+    each client gets one bucket per rule. Buckets live in memory, in an LRU bounded by
+    RATE_LIMIT_MAX_BUCKETS, so limits apply per process. Must be bound after the token
+    authentication (utils.auth), which identifies the caller.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.rules = []  # (pattern, compiled regex, capacity, rate)
+        self.max_buckets = 10000
+        self._buckets = OrderedDict()  # (client, pattern) -> TokenBucket
+        self._route_rules = {}  # 'METHOD rule' -> matching rule, cached per route
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def init_app(self, app):
+        """
+        Load the rules from the configuration and check every API request against them.
+        """
+        self.enabled = app.config["RATE_LIMIT_ENABLED"]
+        self.max_buckets = app.config["RATE_LIMIT_MAX_BUCKETS"]
+        self.rules = [
+            (pattern, re.compile(translate(pattern)), *parse_limit(limit))
+            for pattern, limit in app.config["RATE_LIMITS"].items()
+        ]
+        self._route_rules.clear()
+        self._buckets.clear()
+        app.extensions["rate_limiter"] = self
+        app.before_request(self.check_request)
+        app.after_request(self.add_headers)
+
+    def _rule_for(self, method, route):
+        key = f"{method} {route}"
+        rule = self._route_rules.get(key)
+        if rule is None:
+            rule = next((rule for rule in self.rules if rule[1].match(key)), False)
+            self._route_rules[key] = rule
+        return rule
+
+    @staticmethod
+    def client_id():
+        """
+        Identify the caller: the employee of its verified token, or else its IP address.
+        Unverified headers are never used, since a client could vary them to get fresh buckets.
+        """
+        auth = g.get("auth")
+        if auth is not None:
+            return f"employee:{auth['sub']}"
+        return f"ip:{request.remote_addr}"
+
+    def hit(self, client, method, route):
+        """
+        Count a request against its bucket.
+        :return: tuple: (rule pattern or None, capacity, remaining tokens, seconds to wait or 0).
+        """
+        rule = self._rule_for(method, route)
+        if not rule:
+            return None, None, None, 0.0
+        pattern, _, capacity, rate = rule
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get((client, pattern))
+            if bucket is None:
+                bucket = self._buckets[(client, pattern)] = TokenBucket(capacity, rate)
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end((client, pattern))
+            wait = bucket.take(now)
+            if wait:
+                self.limited += 1
+            return pattern, capacity, int(bucket.tokens), wait
+
+    def check_request(self):
+        if not self.enabled or not request.path.startswith("/api/"):
+            return None
+        # Unknown paths share one route key, so that scanners cannot grow the rule cache
+        route = request.url_rule.rule if request.url_rule else "/api/<unmatched>"
+        pattern, capacity, remaining, wait = self.hit(self.client_id(), request.method, route)
+        if pattern is None:
+            return None
+        g.rate_limit = (capacity, remaining)
+        if wait:
+            response = jsonify({"status": "error", "message": "Too many requests, please slow down."})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(math.ceil(wait))
+            return response
+        return None
+
+    @staticmethod
+    def add_headers(response):
+        rate_limit = g.get("rate_limit")
+        if rate_limit:
+            response.headers["X-RateLimit-Limit"] = str(rate_limit[0])
+            response.headers["X-RateLimit-Remaining"] = str(rate_limit[1])
+        return response
+
+    def snapshot(self, limit=100):
+        """
+        Current rules and the emptiest buckets, for the admin endpoint.
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = []
+            for (client, pattern), bucket in self._buckets.items():
+                bucket.refill(now)
+                buckets.append({
+                    "client": client, "rule": pattern,
+                    "tokens": round(bucket.tokens, 2), "capacity": bucket.capacity,
+                })
+        buckets.sort(key=lambda bucket: bucket["tokens"] / bucket["capacity"])
+        return {
+            "enabled": self.enabled,
+            "limited_requests": self.limited,
+            "bucket_count": len(buckets),
+            "rules": [
+                {"rule": pattern, "capacity": capacity, "per_second": round(rate, 4)}
+                for pattern, _, capacity, rate in self.rules
+            ],
+            "buckets": buckets[:limit],
+        }
+
+
+# Process-wide rate limiter, bound to the application by create_app
+rate_limiter = RateLimiter()
@@ -0,0 +1,101 @@
+import threading
+from functools import wraps
+
+from flask import g, request
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one.
+
+    The first caller for a key runs the function; callers arriving with the same key
+    while it runs wait for it and receive the same result (or exception). It is not a
+    cache: nothing is kept once the call completes, so a caller only ever shares a
+    computation that was still running when it arrived.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> _Call in flight
+        self._lock = threading.Lock()
+        self.stats = {}  # name -> {"executions": int, "coalesced": int}
+
+    def do(self, key, func, name="default"):
+        """
+        Run func() once for all concurrent callers with the same key.
+        :param key: Hashable identity of the call.
+        :param func: The computation to share.
+        :param name: Label the call is counted under in the stats.
+        :return: The result of func().
+        """
+        with self._lock:
+            stats = self.stats.setdefault(name, {"executions": 0, "coalesced": 0})
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                stats["executions"] += 1
+            else:
+                stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def snapshot(self):
+        """
+        Per-name execution and coalescing counts, and the number of calls in flight.
+        """
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "routes": [dict(stats, name=name) for name, stats in sorted(self.stats.items())],
+            }
+
+
+# Process-wide single-flight group for API reads
+single_flight = SingleFlight()
+
+
+def coalesce(func):
+    """
+    Share one execution of a GET handler between concurrent identical requests: same
+    route and arguments, same query string, same authorization level (the role of the
+    verified token) and same X-Fields mask. Tokens are not part of the key: every employee
+    with the same role would get the same response, so they share one execution.
+    Must be placed above marshal_with, so that the marshalled response is shared.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        auth = g.get("auth")
+        scope = auth["role"] if auth is not None else None
+        key = (
+            request.endpoint,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted(request.args.items(multi=True))),
+            request.headers.get("X-Fields"),
+            scope,
+        )
+        return single_flight.do(key, lambda: func(*args, **kwargs), request.endpoint)
+    return wrapper
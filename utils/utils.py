@@ -1,5 +1,5 @@
 # utils/swagger.py
-from flask_restx import fields
+from flask_restx import Model, fields
 from sqlalchemy import Integer, String, Text, Date, DateTime, Boolean, Float, Numeric
 import logging
 
@@ -10,7 +10,8 @@ def generate_swagger_model(api, model, exclude_fields=None, readonly_fields=None
     :param api: Flask-RESTx API instance
     :param model: SQLAlchemy model class
     :param exclude_fields: List of field names to exclude from the Swagger model
-    :param readonly_fields: List of field names to mark as read-only
+    :param readonly_fields: List of field names to mark as read-only (the primary key and the
+                            row version always are)
     :return: Flask-RESTx model
     """
     exclude_fields = exclude_fields or []
@@ -40,13 +41,37 @@ def generate_swagger_model(api, model, exclude_fields=None, readonly_fields=None
             field_type = fields.String
 
         swagger_field = field_type(description=column.comment or column.name)
-        if column.name in readonly_fields or column.primary_key:
+        if column.name in readonly_fields or column.primary_key or column is model.__mapper__.version_id_col:
             swagger_field.readonly = True
 
         swagger_model[column.name] = swagger_field
 
     return api.model(model.__name__, swagger_model)
 
+# Report of a bulk import (services.import_service.import_records), shared by the namespaces
+# with an import endpoint: each one adds it with ns.add_model(import_report_model.name, import_report_model)
+import_report_model = Model('ImportReport', {
+    'resource': fields.String(description='Imported resource'),
+    'processed': fields.Integer(description='Records read from the file'),
+    'imported': fields.Integer(description='Records inserted'),
+    'rejected': fields.Integer(description='Records rejected'),
+    'batches': fields.Integer(description='Transactions committed'),
+    'elapsed_seconds': fields.Float(description='Import duration'),
+    'errors': fields.List(fields.Raw, description='First rejected records: line number and reason'),
+})
+
+def normalize_plate(license_plate):
+    """
+    Normalize a license plate for lookups: uppercase, letters and digits only.
+    'AA-12-BB', 'aa12bb' and 'AA 12 BB' all become 'AA12BB'.
+
+    :param license_plate: The license plate as typed
+    :return: The normalized plate key, or None if there is no plate
+    """
+    if license_plate is None:
+        return None
+    return "".join(char for char in license_plate.upper() if char.isalnum())
+
 def configure_logging():
     """
     Configure the logging system for the application.
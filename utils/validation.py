@@ -0,0 +1,153 @@
+from datetime import date, datetime
+from http import HTTPStatus
+
+from flask_restx import abort
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, String
+
+
+def _to_int(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("is not of type 'integer'")
+    return value
+
+
+def _to_float(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("is not of type 'number'")
+    return float(value)
+
+
+def _to_bool(value):
+    if not isinstance(value, bool):
+        raise ValueError("is not of type 'boolean'")
+    return value
+
+
+def _to_date(value):
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    raise ValueError("is not a 'date' (YYYY-MM-DD)")
+
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    raise ValueError("is not a 'date-time' (YYYY-MM-DDTHH:MM:SS)")
+
+
+def _string(max_length):
+    def to_string(value):
+        if not isinstance(value, str):
+            raise ValueError("is not of type 'string'")
+        if max_length and len(value) > max_length:
+            raise ValueError(f"is longer than {max_length} characters")
+        return value
+    return to_string
+
+
+def _converter(column):
+    column_type = type(column.type)
+    if column_type == Integer:
+        return _to_int
+    if column_type in (Float, Numeric):
+        return _to_float
+    if column_type == Boolean:
+        return _to_bool
+    if column_type == Date:
+        return _to_date
+    if column_type == DateTime:
+        return _to_datetime
+    if isinstance(column.type, String):
+        return _string(column.type.length)
+    return lambda value: value
+
+
+def compile_validator(model, readonly_fields=None, columns=(), lists=None):
+    """
+    Compile the request body validation of a resource from its SQLAlchemy model, once.
+
+    Every writable column (not the primary key, not the row version, not in readonly_fields)
+    gets its converter chosen up front, so that validating a request only runs one
+    function per field present: the values come out typed (ISO dates and date-times
+    become date and datetime objects) and the services need not parse anything. A column
+    is required on create when it is not nullable and has no default. Unknown and
+    read-only fields are ignored, as the Swagger models document them.
+
+    :param model: SQLAlchemy model class
+    :param readonly_fields: List of field names clients cannot write
+    :param columns: Extra sqlalchemy Columns of the body that are not (or not quite) those of
+                    the model, e.g. a list index; one named like a model column replaces it
+    :param lists: {field: (item validator, required, max items)} for lists of nested objects,
+                  each checked by another compiled validator; a required list needs an item
+    :return: validate(payload, partial=False) returning a dict of typed values. On create
+             (partial=False) it holds every writable field, None when not given; on update
+             (partial=True) only the fields given with a value. Aborts with 400 and the
+             errors of every field otherwise. validate.check(payload, partial, prefix, errors)
+             collects the errors instead of aborting, for the validators of enclosing bodies.
+    """
+    readonly_fields = set(readonly_fields or [])
+    version_column = model.__mapper__.version_id_col
+    replaced = {column.name for column in columns}
+    steps = tuple(
+        (
+            column.name,
+            _converter(column),
+            not column.nullable and column.default is None and column.server_default is None,
+        )
+        for column in (*(column for column in model.__table__.columns if column.name not in replaced), *columns)
+        if not column.primary_key and column is not version_column and column.name not in readonly_fields
+    )
+    list_steps = tuple((name, *options) for name, options in (lists or {}).items())
+
+    def check(payload, partial, prefix, errors):
+        if not isinstance(payload, dict):
+            errors[prefix.rstrip(".")] = "must be a JSON object" if prefix else "The request body must be a JSON object"
+            return None
+        values = {}
+        for name, convert, required in steps:
+            value = payload.get(name)
+            if value is None:
+                if partial:
+                    continue
+                if required:
+                    errors[prefix + name] = f"'{name}' is a required property"
+                values[name] = None
+                continue
+            try:
+                values[name] = convert(value)
+            except ValueError as e:
+                errors[prefix + name] = f"{value!r} {e}"
+        for name, item_validator, required, max_items in list_steps:
+            items = payload.get(name)
+            if items is None:
+                if partial:
+                    continue
+                if required:
+                    errors[prefix + name] = f"'{name}' is a required property"
+                values[name] = None
+            elif not isinstance(items, list):
+                errors[prefix + name] = f"{items!r} is not of type 'array'"
+            elif required and not items or len(items) > max_items:
+                errors[prefix + name] = f"must hold between {1 if required else 0} and {max_items} items"
+            else:
+                values[name] = [
+                    item_validator.check(item, False, f"{prefix}{name}[{index}].", errors)
+                    for index, item in enumerate(items)
+                ]
+        return values
+
+    def validate(payload, partial=False):
+        errors = {}
+        values = check(payload, partial, "", errors)
+        if errors:
+            abort(HTTPStatus.BAD_REQUEST, "Input payload validation failed", errors=errors)
+        return values
+
+    validate.check = check
+    return validate